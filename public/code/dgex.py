@@ -1,59 +1,40 @@
-import yfinance as yf
+import logging
+import os
+import sys
+
 import pandas as pd
-from datetime import datetime
+
+# Shared fetch library (cache, freshness catalog, FX) in public/pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import sources
 
 def download_scaled_proxy():
-    # 1. Define Tickers
+    # 1. Define Ticker
     # DGEIX: US Proxy for Global Core Equity (starts Dec 2003)
-    # EURUSD=X: Exchange rate to convert USD assets to EUR
-    fund_ticker = "DGEIX"      
-    currency_ticker = "EURUSD=X"
-    
-    start_date = "1990-01-01" # Note: Data will effectively start in 2003 due to fund inception
-    current_date = datetime.now().strftime("%Y-%m-%d")
+    fund_ticker = "DGEIX"
 
-    print(f"Downloading data for {fund_ticker} and {currency_ticker}...")
+    print(f"Loading data for {fund_ticker}...")
 
-    # 2. Download Data
-    # auto_adjust=True gets the Total Return (dividends reinvested)
-    fund_data = yf.download(fund_ticker, start=start_date, end=current_date, interval="1mo", auto_adjust=True)
-    curr_data = yf.download(currency_ticker, start=start_date, end=current_date, interval="1mo", auto_adjust=False)
-
-    if fund_data.empty or curr_data.empty:
+    # 2. Monthly Total Return closes (month-end), shared with process.py
+    price_usd = sources.get_monthly_yf_data(fund_ticker)
+    if price_usd.empty:
         print("Error: Could not download data. Check tickers or internet connection.")
         return
 
-    # 3. Prepare DataFrames
-    # Extract 'Close' column
-    df_fund = fund_data[['Close']].dropna()
-    df_fund.columns = ['Price_USD']
-    
-    # Resample currency to Month End to align with fund data
-    df_curr = curr_data[['Close']].resample('M').last().dropna()
-    df_curr.columns = ['USD_per_EUR']
-
-    # 4. Align Dates
-    # Force index to be Timestamp at month-end for clean merging
-    df_fund.index = df_fund.index.to_period('M').to_timestamp('M')
-    df_curr.index = df_curr.index.to_period('M').to_timestamp('M')
-
-    merged = pd.merge(df_fund, df_curr, left_index=True, right_index=True, how='inner')
-
-    # 5. Calculate EUR Price and Scale
-    # Convert USD Price to EUR: Price(USD) / Rate(USD/EUR)
-    merged['Price_EUR'] = merged['Price_USD'] / merged['USD_per_EUR']
+    # 3. Convert USD Price to EUR (shared FX matrix), keep months with both
+    merged = pd.DataFrame({
+        'Price_USD': price_usd,
+        'Price_EUR': sources.to_currency(price_usd, 'eur'),
+    }).dropna()
 
     # Scale both to start at 100
-    base_usd = merged['Price_USD'].iloc[0]
-    base_eur = merged['Price_EUR'].iloc[0]
-
-    merged['Scaled_USD'] = (merged['Price_USD'] / base_usd) * 100
-    merged['Scaled_EUR'] = (merged['Price_EUR'] / base_eur) * 100
+    merged['Scaled_USD'] = (merged['Price_USD'] / merged['Price_USD'].iloc[0]) * 100
+    merged['Scaled_EUR'] = (merged['Price_EUR'] / merged['Price_EUR'].iloc[0]) * 100
 
-    # 6. Select ONLY Scaled Columns
+    # Select ONLY Scaled Columns
     final_output = merged[['Scaled_USD', 'Scaled_EUR']]
 
-    # 7. Output
+    # 4. Output
     print(f"\nProcessing complete. {len(final_output)} records.")
     print(f"Data range: {final_output.index[0].date()} to {final_output.index[-1].date()}")
     print("\nFirst 5 rows:")
@@ -64,4 +45,5 @@ def download_scaled_proxy():
     print(f"\nSaved scaled data to {filename}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     download_scaled_proxy()
@@ -1,6 +1,12 @@
-import yfinance as yf
+import logging
+import os
+import sys
+
 import pandas as pd
-import numpy as np
+
+# Shared fetch library (cache, freshness catalog, FX, splice engine) in public/pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import resample, sources, splice
 
 def get_monthly_proxy_data(start_year=1991):
     """
@@ -8,30 +14,19 @@ def get_monthly_proxy_data(start_year=1991):
     returns from known annual history to ensure 1991 start.
     """
     print(f"Fetching monthly proxy data from {start_year}...")
-    
-    # 1. Try Yahoo Download (Monthly)
-    try:
-        df = yf.download("^BCOM", start=f"{start_year}-01-01", interval="1mo", progress=False)
-        # Handle formatting (multi-index columns in recent yfinance versions)
-        if isinstance(df.columns, pd.MultiIndex):
-            prices = df['Close'].iloc[:, 0]
-        else:
-            prices = df['Close']
-            
-        # Calculate Returns
-        monthly_rets = prices.pct_change().dropna()
-        
-        # Check if data actually goes back to start_year
-        if monthly_rets.empty or monthly_rets.index[0].year > start_year + 1:
-            print(f"  > Download too short (starts {monthly_rets.index[0].year}). Generating synthetic history for 1991-2016...")
-            return generate_synthetic_monthly_history(start_year)
-        
-        return monthly_rets
-
-    except Exception as e:
-        print(f"  > Download failed ({e}). Using synthetic history.")
+
+    # 1. Monthly closes (same request as process.py, served from the shared cache)
+    prices = sources.get_yf_closes("^BCOM", start=f"{start_year}-01-01", interval="1mo")
+    monthly_rets = resample.last(prices).pct_change().dropna() if not prices.empty else prices
+
+    # Check if data actually goes back to start_year
+    if monthly_rets.empty or monthly_rets.index[0].year > start_year + 1:
+        reason = "failed" if monthly_rets.empty else f"too short (starts {monthly_rets.index[0].year})"
+        print(f"  > Download {reason}. Generating synthetic history for 1991-2016...")
         return generate_synthetic_monthly_history(start_year)
 
+    return monthly_rets
+
 def generate_synthetic_monthly_history(start_year):
     """
     Creates monthly returns based on BCOM annual historical performance.
@@ -45,93 +40,70 @@ def generate_synthetic_monthly_history(start_year):
         2006: -0.151, 2007: 0.162, 2008: -0.356, 2009: 0.189, 2010: 0.168,
         2011: -0.133, 2012: -0.011, 2013: -0.095, 2014: -0.170, 2015: -0.247
     }
-    
+
     dates = pd.date_range(start=f"{start_year}-01-01", end="2016-04-01", freq='MS')
     synthetic_rets = []
-    
+
     for date in dates:
         year_ret = annual_map.get(date.year, 0.0)
         # Convert annual return to monthly geometric mean: (1+r)^(1/12) - 1
         monthly_ret = (1 + year_ret)**(1/12) - 1
         synthetic_rets.append(monthly_ret)
-        
+
     return pd.Series(data=synthetic_rets, index=dates)
 
 def get_etf_monthly():
     """Fetches actual ETF data (WCOA.L) 2016-Present"""
     print("Fetching ETF data (2016-Present)...")
-    df = yf.download("WCOA.L", start="2016-05-01", interval="1mo", progress=False)
-    
-    if isinstance(df.columns, pd.MultiIndex):
-        prices = df['Close'].iloc[:, 0]
-    else:
-        prices = df['Close']
-        
-    return prices.pct_change().dropna()
-
-def get_fx_monthly(start_year):
-    """Fetches EURUSD monthly rates"""
-    print("Fetching EUR/USD exchange rates...")
-    df = yf.download("EURUSD=X", start=f"{start_year}-01-01", interval="1mo", progress=False)
-    
-    if isinstance(df.columns, pd.MultiIndex):
-        rates = df['Close'].iloc[:, 0]
-    else:
-        rates = df['Close']
-        
-    return rates
+    prices = sources.get_yf_closes("WCOA.L", start="2016-05-01", interval="1mo")
+    if prices.empty:
+        return prices
+    return resample.last(prices).pct_change().dropna()
 
 def run():
     start_year = 1991
     capital = 10000
-    
+
     # 1. Get Data Streams
     proxy_rets = get_monthly_proxy_data(start_year)
     etf_rets = get_etf_monthly()
-    fx_rates = get_fx_monthly(start_year)
-    
+
     # 2. Apply Enhancement to Proxy (1991-2016)
     # 1.5% Annual Alpha -> ~0.124% Monthly
     monthly_alpha = (1.015)**(1/12) - 1
     proxy_rets_enhanced = proxy_rets + monthly_alpha
-    
-    # 3. Stitch Returns
-    # Cut proxy at ETF start
-    etf_start_date = etf_rets.index[0]
-    proxy_rets_enhanced = proxy_rets_enhanced[proxy_rets_enhanced.index < etf_start_date]
-    
-    # Combine
-    combined_rets = pd.concat([proxy_rets_enhanced, etf_rets])
-    
+
+    # 3. Stitch Returns: proxy until the ETF's first return, then the ETF
+    if not etf_rets.empty:
+        proxy_rets_enhanced = proxy_rets_enhanced[proxy_rets_enhanced.index < etf_rets.index[0]]
+        combined_rets = pd.concat([proxy_rets_enhanced, etf_rets])
+    else:
+        combined_rets = proxy_rets_enhanced
+
     # 4. Calculate USD Value
-    # (1 + r).cumprod()
-    usd_curve = capital * (1 + combined_rets).cumprod()
-    
+    usd_curve = splice.to_index(combined_rets, base=capital)
+
     # 5. Create DataFrame & Convert to EUR
     df_out = pd.DataFrame(index=usd_curve.index)
     df_out['USD_Value'] = usd_curve
-    
-    # Align FX rates (resample/ffill to match portfolio dates)
-    aligned_fx = fx_rates.reindex(df_out.index, method='ffill')
-    
-    # If FX data is missing for early 90s (possible), fill with a static estimate or backfill
-    # 1991-1998 EUR didn't exist (use ECU proxy or backfilled ~1.1-1.3 range)
-    # Yahoo often lacks EUR=X before 2003. We fill nan with 1.18 (long term avg) or backfill.
+
+    # Shared month-end FX matrix; before the euro it uses the DEM rate (legacy
+    # leg), any months still missing fall back to the long-term average
+    aligned_fx = sources.usd_per_unit(df_out.index, 'eur')
     if aligned_fx.isnull().any():
-        print("  > Note: Backfilling missing FX rates for pre-Euro era (approximate).")
-        aligned_fx = aligned_fx.fillna(method='bfill').fillna(1.18)
+        print("  > Note: Backfilling missing FX rates (approximate).")
+        aligned_fx = aligned_fx.bfill().fillna(1.18)
 
-    # Convert: USD_Value / (USD per EUR) 
-    # Ticker EURUSD=X is 1 EUR = x USD. So to get EUR: USD / Rate.
+    # Convert: USD_Value / (USD per EUR)
     df_out['EUR_Value'] = df_out['USD_Value'] / aligned_fx
-    
+
     # 6. Save
     output_file = "monthly_data_1991.csv"
-    
+
     # formatting for CSV (round to 2 decimals)
     df_out['USD_Value'] = df_out['USD_Value'].round(2)
     df_out['EUR_Value'] = df_out['EUR_Value'].round(2)
-    
+
     df_out.to_csv(output_file)
     print("="*40)
     print(f"Done. Saved {len(df_out)} monthly rows to '{output_file}'")
@@ -140,4 +112,5 @@ def run():
     print(df_out.tail())
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     run()
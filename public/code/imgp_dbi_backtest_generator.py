@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 """
 iMGP DBi Managed Futures - Complete Backtest Generator
-Standalone script with embedded SG CTA Index data + auto-fetch DBMF from Yahoo Finance
+Embedded SG CTA Index data + DBMF and EUR/USD from the shared fetch library
+(public/pipeline/sources.py, same cache as process.py)
 Output: Date, USD (base 100), EUR (base 100)
 """
 
+import logging
+import os
+import sys
+
 import pandas as pd
 import numpy as np
-import requests
-from io import StringIO
-import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import sources
 
 # ============================================================================
 # EMBEDDED DATA: SG CTA Index (1999-2023)
@@ -250,47 +255,6 @@ SG_CTA_INDEX_DATA = [
     {"date": "2019-04-30", "value": 220320.0}
 ]
 
-# ============================================================================
-# YAHOO FINANCE DATA FETCHER
-# ============================================================================
-
-def fetch_yahoo_finance_data(ticker='DBMF', start_date='2019-05-08'):
-    """Fetch historical data from Yahoo Finance API"""
-    try:
-        start_ts = int(pd.to_datetime(start_date).timestamp())
-        end_ts = int(pd.to_datetime('today').timestamp())
-
-        url = f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
-        params = {
-            'period1': start_ts,
-            'period2': end_ts,
-            'interval': '1d',
-            'events': 'history',
-            'includeAdjustedClose': 'true'
-        }
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(url, params=params, headers=headers, timeout=30)
-
-        if response.status_code == 200:
-            data = response.json()
-            chart = data['chart']['result'][0]
-
-            df = pd.DataFrame({
-                'Date': pd.to_datetime(chart['timestamp'], unit='s'),
-                'Adj Close': chart['indicators']['adjclose'][0]['adjclose']
-            })
-
-            return df.dropna()
-        else:
-            return None
-
-    except Exception as e:
-        print(f"✗ Yahoo Finance error: {e}")
-        return None
-
 # ============================================================================
 # MAIN GENERATOR FUNCTION
 # ============================================================================
@@ -309,94 +273,53 @@ def generate_backtest_data(output_file='imgp_dbi_base100.csv'):
     print("\n[1/4] Loading embedded SG CTA Index data...")
 
     df_proxy = pd.DataFrame(SG_CTA_INDEX_DATA)
-    df_proxy['Date'] = pd.to_datetime(df_proxy['date'])
-    df_proxy['Index_Value_USD'] = df_proxy['value']
+    df_proxy = df_proxy.set_index(pd.to_datetime(df_proxy['date']))['value']
 
     # Filter to pre-DBMF launch
     dbmf_launch = pd.to_datetime('2019-05-08')
-    df_proxy = df_proxy[df_proxy['Date'] < dbmf_launch].copy()
+    df_proxy = df_proxy[df_proxy.index < dbmf_launch]
 
-    print(f"  ✓ {len(df_proxy)} months: {df_proxy['Date'].min().date()} to {df_proxy['Date'].max().date()}")
+    print(f"  ✓ {len(df_proxy)} months: {df_proxy.index.min().date()} to {df_proxy.index.max().date()}")
 
-    # Step 2: Auto-fetch DBMF from Yahoo Finance
+    # Step 2: DBMF month-end closes (shared cache with process.py)
     print("\n[2/4] Fetching DBMF data from Yahoo Finance...")
 
-    df_dbmf_raw = fetch_yahoo_finance_data('DBMF', '2019-05-08')
-
-    if df_dbmf_raw is not None:
-        print(f"  ✓ Fetched {len(df_dbmf_raw)} daily records")
-        print(f"  ✓ Period: {df_dbmf_raw['Date'].min().date()} to {df_dbmf_raw['Date'].max().date()}")
-
-        # Convert to monthly
-        df_dbmf_raw['YearMonth'] = df_dbmf_raw['Date'].dt.to_period('M')
-        df_dbmf_monthly = df_dbmf_raw.groupby('YearMonth').agg({
-            'Date': 'last',
-            'Adj Close': 'last'
-        }).reset_index(drop=True)
-
-        # Scale to match proxy
-        scaling = df_proxy.iloc[-1]['Index_Value_USD'] / df_dbmf_monthly.iloc[0]['Adj Close']
-        df_dbmf_monthly['Index_Value_USD'] = df_dbmf_monthly['Adj Close'] * scaling
-        df_dbmf = df_dbmf_monthly[['Date', 'Index_Value_USD']]
+    dbmf_monthly = sources.get_monthly_yf_data('DBMF', start_date='2019-05-08')
 
-        years = (df_dbmf['Date'].max() - df_dbmf['Date'].min()).days / 365.25
-        print(f"  ✓ {len(df_dbmf)} monthly records ({years:.1f} years of actual data)")
+    if not dbmf_monthly.empty:
+        years = (dbmf_monthly.index.max() - dbmf_monthly.index.min()).days / 365.25
+        print(f"  ✓ {len(dbmf_monthly)} monthly records ({years:.1f} years of actual data)")
 
-        # Combine
-        df_combined = pd.concat([
-            df_proxy[['Date', 'Index_Value_USD']], 
-            df_dbmf
-        ], ignore_index=True)
+        # Scale DBMF to continue from the last proxy value
+        scaling = df_proxy.iloc[-1] / dbmf_monthly.iloc[0]
+        combined_usd = pd.concat([df_proxy, dbmf_monthly * scaling])
+        combined_usd = combined_usd[~combined_usd.index.duplicated(keep='last')]
 
-        print(f"  ✓ Combined: {len(df_combined)} months total")
+        print(f"  ✓ Combined: {len(combined_usd)} months total")
 
     else:
         print("  ⚠ DBMF fetch failed, using proxy only")
-        df_combined = df_proxy[['Date', 'Index_Value_USD']].copy()
+        combined_usd = df_proxy
 
-    df_combined = df_combined.sort_values('Date').reset_index(drop=True)
+    combined_usd = combined_usd.sort_index()
 
-    # Step 3: Fetch EUR/USD rates from ECB
-    print("\n[3/4] Fetching EUR/USD exchange rates from ECB...")
+    # Step 3: EUR view from the shared month-end FX matrix (FRED + Yahoo)
+    print("\n[3/4] Converting to EUR...")
 
     try:
-        start_date = df_combined['Date'].min().strftime('%Y-%m-%d')
-        end_date = df_combined['Date'].max().strftime('%Y-%m-%d')
-
-        ecb_url = "https://data-api.ecb.europa.eu/service/data/EXR/D.USD.EUR.SP00.A"
-        response = requests.get(ecb_url, params={
-            'startPeriod': start_date,
-            'endPeriod': end_date,
-            'format': 'csvdata'
-        }, timeout=30)
-
-        ecb_data = pd.read_csv(StringIO(response.text))
-        ecb_clean = ecb_data[['TIME_PERIOD', 'OBS_VALUE']].copy()
-        ecb_clean.columns = ['Date', 'USDEUR_Rate']
-        ecb_clean['Date'] = pd.to_datetime(ecb_clean['Date'])
-        ecb_clean['USDEUR_Rate'] = pd.to_numeric(ecb_clean['USDEUR_Rate'], errors='coerce')
-        ecb_clean = ecb_clean.dropna()
-
-        df_combined = df_combined.merge(ecb_clean, on='Date', how='left')
-        df_combined['USDEUR_Rate'] = df_combined['USDEUR_Rate'].ffill().bfill()
-        df_combined['Index_Value_EUR'] = df_combined['Index_Value_USD'] / df_combined['USDEUR_Rate']
-
+        combined_eur = sources.to_currency(combined_usd, 'eur').ffill().bfill()
         print("  ✓ EUR conversion complete")
-
     except Exception as e:
         print(f"  ✗ FX error: {e}")
-        df_combined['Index_Value_EUR'] = np.nan
+        combined_eur = combined_usd * np.nan
 
     # Step 4: Rebase to 100 and save
     print("\n[4/4] Rebasing to 100 and saving...")
 
-    first_usd = df_combined.iloc[0]['Index_Value_USD']
-    first_eur = df_combined.iloc[0]['Index_Value_EUR']
-
     output_df = pd.DataFrame({
-        'Date': df_combined['Date'].dt.strftime('%Y-%m-%d'),
-        'USD': (df_combined['Index_Value_USD'] / first_usd * 100).round(2),
-        'EUR': (df_combined['Index_Value_EUR'] / first_eur * 100).round(2)
+        'Date': combined_usd.index.strftime('%Y-%m-%d'),
+        'USD': (combined_usd / combined_usd.iloc[0] * 100).round(2).values,
+        'EUR': (combined_eur / combined_eur.iloc[0] * 100).round(2).values
     })
 
     output_df.to_csv(output_file, index=False)
@@ -425,6 +348,7 @@ def generate_backtest_data(output_file='imgp_dbi_base100.csv'):
 # ============================================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     result = generate_backtest_data()
 
     print("\nFirst 10 rows:")
@@ -1,20 +1,13 @@
-import yfinance as yf
+import logging
+import os
+import sys
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
-def fetch_data(ticker, start_date):
-    """Fetches historical data for a given ticker."""
-    try:
-        t = yf.Ticker(ticker)
-        # Fetch data
-        df = t.history(start=start_date, auto_adjust=True)
-        # Return only Close price if data exists
-        if not df.empty:
-            return df['Close']
-        return pd.Series(dtype='float64')
-    except Exception as e:
-        print(f"Error fetching {ticker}: {e}")
-        return pd.Series(dtype='float64')
+# Shared fetch library (bar store, splice engine) in public/pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import sources, splice
 
 def run_synthetic_backtest():
     start_date = "1991-01-01"
@@ -23,76 +16,54 @@ def run_synthetic_backtest():
     # 1. Primary ETF (Best data, but shortest history)
     # UC14.L = UBS CMCI Composite SF UCITS ETF (USD)
     etf_ticker = "UC14.L"
-    etf_data = fetch_data(etf_ticker, start_date)
-    
+
     # 2. Strategic Index (Medium history, matches strategy)
     # ^CMCIER = UBS Bloomberg CMCI Composite Excess Return
     index_ticker = "^CMCIER"
-    index_data = fetch_data(index_ticker, start_date)
 
     # 3. Long-term Proxy (Longest history, generic commodity exposure)
     # ^SPGSCI = S&P GSCI Index (Standard commodity benchmark)
     proxy_ticker = "^SPGSCI"
-    proxy_data = fetch_data(proxy_ticker, start_date)
 
-    if proxy_data.empty:
+    # Daily adjusted closes from the shared bar store (only new bars are downloaded)
+    closes = sources.get_daily_closes([etf_ticker, index_ticker, proxy_ticker], start_date)
+    if proxy_ticker not in closes.columns:
         print("Critical: Could not fetch proxy data (^SPGSCI). Check internet connection.")
         return
 
     # --- Splicing Logic ---
     print("\nConstructing synthetic history...")
-    
-    # Calculate daily returns for all series first
-    proxy_returns = proxy_data.pct_change()
-    index_returns = index_data.pct_change() if not index_data.empty else pd.Series(dtype='float64')
-    etf_returns = etf_data.pct_change() if not etf_data.empty else pd.Series(dtype='float64')
-
-    # Start with the Proxy returns as the base
-    # We use the proxy's index as the master timeline
-    combined_returns = proxy_returns.copy()
-    
-    # Overwrite with Index data where available (likely 2007+)
-    if not index_returns.empty:
-        # Update only overlapping dates
-        common_dates = combined_returns.index.intersection(index_returns.index)
-        combined_returns.loc[common_dates] = index_returns.loc[common_dates]
-        print(f"  - Spliced UBS CMCI Index data starting {index_data.index[0].date()}")
-    
-    # Overwrite with Actual ETF data where available (2010+)
-    if not etf_returns.empty:
-        common_dates = combined_returns.index.intersection(etf_returns.index)
-        combined_returns.loc[common_dates] = etf_returns.loc[common_dates]
-        print(f"  - Spliced actual ETF data starting {etf_data.index[0].date()}")
-
-    # Clean up (drop NaN at start)
-    combined_returns = combined_returns.dropna()
-    
+
+    # Start with the Proxy returns, overwrite with Index data where available
+    # (likely 2007+), then with actual ETF data (2010+)
+    returns = splice.daily_returns(closes)
+    for ticker, label in [(index_ticker, "UBS CMCI Index"), (etf_ticker, "actual ETF")]:
+        if ticker in closes.columns:
+            print(f"  - Spliced {label} data starting {closes[ticker].first_valid_index().date()}")
+    combined_returns = splice.priority_splice(returns, [proxy_ticker, index_ticker, etf_ticker])
+
     # --- Calculations ---
-    # Construct a Daily Price Series (starting at 100)
-    # We use 100 as a base for easier reading, effectively "Rebasing" the index
-    price_series = 100 * (1 + combined_returns).cumprod()
-    
-    # Resample to Monthly (Taking the last price of each month)
-    monthly_prices = price_series.resample('ME').last()
+    # Monthly Price Series (compounded daily returns, starting at 100)
+    monthly_prices = splice.to_index(splice.monthly_returns(combined_returns))
 
     # --- Output to Console/CSV Format ---
     print("\n--- Monthly Price Data (Date, Price USD) ---")
-    
+
     # Create DataFrame for clean display
     output_df = pd.DataFrame({
         'Date': monthly_prices.index,
         'Price_USD': monthly_prices.values
     })
-    
+
     # Format Date to string (YYYY-MM-DD)
     output_df['Date'] = output_df['Date'].dt.strftime('%Y-%m-%d')
     output_df['Price_USD'] = output_df['Price_USD'].round(2)
-    
+
     # Print first 10 and last 10 rows
     print(output_df.head(10).to_string(index=False))
     print("...")
     print(output_df.tail(10).to_string(index=False))
-    
+
     # Optional: Save to CSV file
     # output_df.to_csv("ubs_cmci_monthly_prices.csv", index=False)
     # print("\nData saved to ubs_cmci_monthly_prices.csv")
@@ -108,4 +79,5 @@ def run_synthetic_backtest():
     plt.show()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     run_synthetic_backtest()
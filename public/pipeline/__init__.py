@@ -0,0 +1 @@
+"""Shared building blocks for the AlphaTrace data pipeline (process.py)."""
@@ -0,0 +1,52 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def month_end_dates(start, end):
+    """Month ends between start and end, plus `end` itself if it falls mid-month."""
+    dates = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq='ME')
+    return dates.union(pd.DatetimeIndex([pd.Timestamp(end)]))
+
+
+def accrual_index(rates, start, fees=0.0, basis=360, base=100.0, dates=None):
+    """
+    Cash accrual indexes for any number of overnight-rate instruments at once.
+
+    `rates` holds annual rates in percent (observation dates x instruments);
+    each observation applies until the next one. Interest compounds on every
+    calendar day (Act/`basis`, per instrument if a list is given) net of the
+    annual `fees`, exactly like a daily cumprod, but in closed form: the
+    calendar is cut into constant-rate segments and each contributes
+    days * log1p(rate / basis).
+
+    Returns the index levels (accrued through each evaluation date inclusive)
+    at `dates`, by default every month end up to the last observation.
+    """
+    rates = rates.sort_index().ffill()
+    start = pd.Timestamp(start)
+    end = rates.index[-1]
+    if dates is None:
+        dates = month_end_dates(start, end)
+    dates = pd.DatetimeIndex(dates)
+    dates = dates[(dates >= start) & (dates <= end)].unique().sort_values()
+
+    # Segment boundaries: rate changes plus the day after every evaluation date
+    one_day = pd.Timedelta(days=1)
+    obs = rates.index[(rates.index > start) & (rates.index <= end)]
+    bounds = pd.DatetimeIndex([start]).union(obs).union(dates + one_day)
+    seg_days = np.diff(bounds.values).astype('timedelta64[D]').astype('float64')
+
+    seg_rates = rates.reindex(rates.index.union(bounds[:-1])).ffill().reindex(bounds[:-1])
+    fees = np.broadcast_to(np.asarray(fees, dtype='float64'), (rates.shape[1],))
+    basis = np.broadcast_to(np.asarray(basis, dtype='float64'), (rates.shape[1],))
+    daily = (seg_rates.to_numpy(dtype='float64') / 100 - fees) / basis
+    log_growth = np.nan_to_num(seg_days[:, None] * np.log1p(daily))
+
+    cum = np.cumsum(log_growth, axis=0)
+    pos = bounds.get_indexer(dates + one_day) - 1
+    levels = base * np.exp(cum[pos])
+    return pd.DataFrame(levels, index=dates, columns=rates.columns)
@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+from contextlib import ExitStack
+
+import pandas as pd
+import yfinance as yf
+
+from pipeline import freshness, locks, quality, throttle
+
+logger = logging.getLogger(__name__)
+
+# Local, git-ignored store of daily bars: one CSV (Date, Close) per ticker.
+CACHE_DIR = os.environ.get(
+    "ALPHATRACE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+# Days re-downloaded before the last stored bar to re-anchor adjusted prices
+OVERLAP_DAYS = 7
+
+_MEMO = {}
+
+
+def _bar_path(ticker):
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+    return os.path.join(CACHE_DIR, "bars", f"{safe}.csv")
+
+
+def _read_bars(ticker):
+    path = _bar_path(ticker)
+    if not os.path.exists(path):
+        return pd.Series(dtype='float64')
+    df = pd.read_csv(path, index_col=0, parse_dates=True)
+    return df['Close'].dropna()
+
+
+def _write_bars(ticker, series, append=False):
+    """Writes (atomically) or appends a ticker's bars; callers hold the ticker's lock."""
+    path = _bar_path(ticker)
+    frame = series.rename('Close').to_frame()
+    frame.index.name = 'Date'
+    if append:
+        frame.to_csv(path, mode='a', header=False)
+    else:
+        with locks.atomic_write(path) as fh:
+            frame.to_csv(fh)
+
+
+def extract_closes(data, tickers):
+    """Close prices per ticker from a yf.download frame (MultiIndex or flat)."""
+    if data is None or data.empty:
+        return pd.DataFrame()
+    if isinstance(data.columns, pd.MultiIndex):
+        if 'Close' in data.columns.get_level_values(0):
+            df = data['Close']
+        else:
+            df = data.iloc[:, [0]]
+    else:
+        df = data[['Close']] if 'Close' in data.columns else data.iloc[:, [0]]
+        df.columns = [tickers[0]]
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def _download(tickers, start):
+    """Closes of one batched download; None while Yahoo's circuit is open."""
+    try:
+        data = throttle.call('yahoo', lambda: yf.download(tickers, start=start, interval="1d",
+                                                          auto_adjust=True, progress=False),
+                             failed=lambda df: df is None or df.empty)
+        return extract_closes(data, tickers)
+    except throttle.CircuitOpen as e:
+        logger.warning(f"  > Skipping {', '.join(tickers)}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"  > Daily download failed for {tickers}: {e}")
+        return pd.DataFrame()
+
+
+def _refresh_locked(missing, checked, start_date, today):
+    """Loads `missing` tickers into _MEMO, downloading what is new; callers hold their locks."""
+    stored = {t: _read_bars(t) for t in missing}
+
+    full = [t for t in missing if stored[t].empty]
+    if full:
+        logger.info(f"  > Downloading full daily history for {', '.join(full)}...")
+        closes = _download(full, start_date)
+        if closes is None:
+            closes = pd.DataFrame()
+        for t in full:
+            if t in closes.columns:
+                series = closes[t].dropna()
+                series = series[series.index < today]
+                if not series.empty:
+                    _write_bars(t, series)
+                    stored[t] = series
+                    freshness.record_check(f"bars:{t}", "yahoo", series.index[-1], "daily")
+
+    # Tickers another process refreshed while this one waited count as fresh
+    catalog = freshness.load_catalog()
+    refreshed = {t for t in missing if catalog.get(f"bars:{t}", {}).get('last_check') != checked[t]}
+    tails = [t for t in missing if t not in full and t not in refreshed and freshness.is_due(f"bars:{t}")]
+    if tails:
+        fetch_from = min(stored[t].index[-1] for t in tails) - pd.Timedelta(days=OVERLAP_DAYS)
+        closes = _download(tails, fetch_from.strftime('%Y-%m-%d'))
+        if closes is None:
+            # Skipped, not checked: stored bars are used and stay due
+            tails = []
+            closes = pd.DataFrame()
+        for t in tails:
+            if t not in closes.columns:
+                continue
+            old = stored[t]
+            new = closes[t].dropna()
+            new = new[new.index < today]
+            common = old.index.intersection(new.index)
+            fresh = new[new.index > old.index[-1]]
+            if fresh.empty or common.empty:
+                continue
+            anchor = common[-1]
+            fresh = fresh * (old.loc[anchor] / new.loc[anchor])
+            _write_bars(t, fresh, append=True)
+            stored[t] = pd.concat([old, fresh])
+            logger.info(f"  > Appended {len(fresh)} new bars to {t}")
+        for t in tails:
+            freshness.record_check(f"bars:{t}", "yahoo", stored[t].index[-1], "daily")
+
+    # Bad ticks are caught (and by default repaired) before anything compounds
+    # them; the stored bars stay as downloaded
+    loaded = {t: stored[t] for t in missing if not stored[t].empty}
+    clean = quality.validate(pd.DataFrame(loaded), 'daily', source='daily bars') if loaded else None
+    for t in missing:
+        _MEMO[t] = clean[t].dropna() if t in loaded and t in clean.columns else stored[t].iloc[:0]
+
+
+def get_daily_closes(tickers, start_date='1991-01-01'):
+    """
+    Daily adjusted closes for `tickers`, outer-joined on trading days.
+
+    Bars come from the append-only store under CACHE_DIR: a ticker is
+    downloaded in full only once, afterwards only the days since its last
+    stored bar are fetched (with a short overlap used to rescale the new
+    chunk onto the stored prices, so dividend re-adjustments don't create
+    false returns at the seam). Today's still-forming bar is never stored.
+    Stored tickers are only checked once their next bar is due (see
+    pipeline/freshness.py). Tickers are locked while they are read or
+    refreshed, so parallel runs download each of them once.
+    """
+    today = pd.Timestamp.today().normalize()
+    freshness.note_reads([f"bars:{t}" for t in tickers])
+    missing = [t for t in tickers if t not in _MEMO]
+    checked = {t: freshness.load_catalog().get(f"bars:{t}", {}).get('last_check') for t in missing}
+    with ExitStack() as held:
+        # One lock per ticker, taken in a fixed order: another process
+        # refreshing any of them finishes first, then its bars are read here
+        for t in sorted(missing):
+            held.enter_context(locks.file_lock(_bar_path(t)))
+        for t in missing:
+            freshness.reload_entry(f"bars:{t}")
+        _refresh_locked(missing, checked, start_date, today)
+
+    frames = {t: _MEMO[t] for t in tickers if not _MEMO[t].empty}
+    if not frames:
+        return pd.DataFrame()
+    return pd.DataFrame(frames).loc[pd.Timestamp(start_date):]
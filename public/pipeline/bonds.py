@@ -0,0 +1,191 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pipeline import freshness, resample
+
+logger = logging.getLogger(__name__)
+
+# OECD 10Y government benchmark yields on FRED (monthly, percent)
+YIELD_SERIES = {
+    "US": "IRLTLT01USM156N",
+    "DE": "IRLTLT01DEM156N",
+    "FR": "IRLTLT01FRM156N",
+    "IT": "IRLTLT01ITM156N",
+    "ES": "IRLTLT01ESM156N",
+    "NL": "IRLTLT01NLM156N",
+    "JP": "IRLTLT01JPM156N",
+    "GB": "IRLTLT01GBM156N",
+}
+
+# Currency each curve's bonds pay in
+YIELD_CURRENCY = {
+    "US": "usd",
+    "DE": "eur",
+    "FR": "eur",
+    "IT": "eur",
+    "ES": "eur",
+    "NL": "eur",
+    "JP": "jpy",
+    "GB": "gbp",
+}
+
+# Short end of each curve: the OECD immediate (overnight) rates, percent,
+# the same series the NTSG cash legs use
+SHORT_RATE_SERIES = {
+    "US": "FEDFUNDS",
+    "DE": "IRSTCI01EZM156N",
+    "FR": "IRSTCI01EZM156N",
+    "IT": "IRSTCI01EZM156N",
+    "ES": "IRSTCI01EZM156N",
+    "NL": "IRSTCI01EZM156N",
+    "JP": "IRSTCI01JPM156N",
+    "GB": "IRSTCI01GBM156N",
+}
+SHORT_MATURITY = 1 / 12
+LONG_MATURITY = 10.0
+# Decay (years) of the Nelson-Siegel slope loading that shapes the curve
+# between the short rate and the 10Y yield
+CURVE_TAU = 2.0
+
+# Typical (average maturity in years, modified duration, convexity) of
+# common index maturity buckets
+STANDARD_LADDER = {
+    "1_3y": (2.0, 1.9, 5.0),
+    "3_7y": (5.0, 4.6, 27.0),
+    "7_10y": (8.5, 7.45, 65.0),
+    "20y_plus": (25.0, 17.0, 380.0),
+}
+
+_SERIES_CACHE = {}
+
+
+def get_monthly_fred(series, fetch_fred):
+    """
+    Month-end panel of FRED series ({column: series_id}), values as published.
+    Each series id is downloaded once per run and shared by every caller.
+    """
+    cols = {}
+    for name, series_id in series.items():
+        if series_id not in _SERIES_CACHE:
+            with freshness.recording() as reads:
+                df = fetch_fred(series_id, series_id)
+            _SERIES_CACHE[series_id] = (
+                resample.last(df[series_id]) if not df.empty else pd.Series(dtype='float64'),
+                reads,
+            )
+        cols[name], reads = _SERIES_CACHE[series_id]
+        freshness.note_reads(reads)
+    return pd.DataFrame(cols)
+
+
+def get_yield_matrix(countries, fetch_fred):
+    """Month-end 10Y yields (decimal) for the given country codes."""
+    return get_monthly_fred({c: YIELD_SERIES[c] for c in countries}, fetch_fred) / 100
+
+
+def get_short_rates(countries, fetch_fred):
+    """Month-end short rates (decimal) for the given country codes."""
+    return get_monthly_fred({c: SHORT_RATE_SERIES[c] for c in countries}, fetch_fred) / 100
+
+
+def _returns(y, D, C, s=None):
+    """Monthly returns of (months x curves x labels) yields; see bond_returns."""
+    prev = np.concatenate([y[:1], y[:-1]])
+    dy = y - prev
+    ret = prev / 12 - D * dy + 0.5 * C * dy ** 2
+    if s is not None:
+        prev_s = np.concatenate([s[:1], s[:-1]])
+        ret = ret + D * np.nan_to_num(prev_s / 12)
+    return ret
+
+
+def bond_returns(yields, durations, convexities=None, slopes=None):
+    """
+    Monthly total returns of constant-maturity bond positions for every
+    (curve, duration) combination in one broadcast.
+
+        r_t = carry + price + roll-down
+            = y_{t-1} / 12 - D * dy + 0.5 * C * dy^2 + D * slope_{t-1} / 12
+
+    `yields` is (months x curves) in decimals; `durations` / `convexities`
+    are {label: value} (convexity defaults to 0, i.e. the first-order model).
+    `slopes` (months x curves, yield change per year of maturity) enables the
+    roll-down term. The first month earns carry on its own yield with no
+    price change. Returns a frame with (curve, label) columns.
+    """
+    labels = list(durations)
+    D = np.array([durations[k] for k in labels], dtype='float64')
+    C = np.array([(convexities or {}).get(k, 0.0) for k in labels], dtype='float64')
+
+    y = yields.to_numpy(dtype='float64')[:, :, None]
+    s = None
+    if slopes is not None:
+        s = slopes.reindex(index=yields.index, columns=yields.columns).to_numpy(dtype='float64')[:, :, None]
+    ret = _returns(y, D, C, s)
+
+    columns = pd.MultiIndex.from_product([yields.columns, labels])
+    return pd.DataFrame(ret.reshape(len(yields), -1), index=yields.index, columns=columns)
+
+
+def _levels(returns, valid, base):
+    """Compounds (months x columns) returns into levels starting at `base` where `valid` first holds."""
+    r = returns.to_numpy(copy=True)
+    has = valid.any(axis=0)
+    r[np.argmax(valid, axis=0)[has], np.flatnonzero(has)] = 0
+    return base * (1 + pd.DataFrame(r, index=returns.index, columns=returns.columns)).cumprod()
+
+
+def total_return_indexes(yields, durations, convexities=None, slopes=None, base=100.0):
+    """
+    Level indexes for every (curve, duration) combination, each starting at
+    `base` in its curve's first month with a yield.
+    """
+    returns = bond_returns(yields, durations, convexities, slopes)
+    return _levels(returns, np.repeat(yields.notna().to_numpy(), len(durations), axis=1), base)
+
+
+def _loading(m, tau=CURVE_TAU):
+    """Nelson-Siegel slope loading (1 - e^(-m/tau)) / (m/tau) and its derivative in m."""
+    x = np.asarray(m, dtype='float64') / tau
+    e = np.exp(-x)
+    return (1 - e) / x, (e * x - (1 - e)) / (x * x * tau)
+
+
+def ladder_curves(long_yields, short_rates=None, ladder=None):
+    """
+    Yield and slope (change per year of maturity) at every bucket's average
+    maturity, as (months x curves x buckets) arrays. Each month's curve runs
+    from the short rate to the 10Y yield along the Nelson-Siegel slope
+    loading, which flattens out past 10 years. Months without a short rate
+    (or no `short_rates` at all) get a flat curve at the 10Y yield.
+    """
+    ladder = STANDARD_LADDER if ladder is None else ladder
+    maturities = np.array([ladder[k][0] for k in ladder], dtype='float64')
+    y = long_yields.to_numpy(dtype='float64')
+    r = y if short_rates is None else short_rates.reindex(
+        index=long_yields.index, columns=long_yields.columns).ffill().to_numpy(dtype='float64')
+    spread = np.where(np.isnan(r), 0.0, r - y)[:, :, None]
+    h, dh = _loading(maturities)
+    h_short, _ = _loading(SHORT_MATURITY)
+    h_long, _ = _loading(LONG_MATURITY)
+    weight, slope = (h - h_long) / (h_short - h_long), dh / (h_short - h_long)
+    return y[:, :, None] + spread * weight, spread * slope
+
+
+def ladder_indexes(long_yields, short_rates=None, ladder=None, base=100.0):
+    """
+    Level indexes of every curve in `long_yields` at every bucket of
+    `ladder` ({bucket: (maturity, duration, convexity)}, default
+    STANDARD_LADDER), with '<curve>_<bucket>' columns. Each bucket earns
+    carry on its own yield and rolls down its own slope (ladder_curves) and
+    reprices off that yield's changes, all in one broadcast.
+    """
+    ladder = STANDARD_LADDER if ladder is None else ladder
+    D = np.array([ladder[k][1] for k in ladder], dtype='float64')
+    C = np.array([ladder[k][2] for k in ladder], dtype='float64')
+    y, s = ladder_curves(long_yields, short_rates, ladder)
+    returns = pd.DataFrame(_returns(y, D, C, s).reshape(len(long_yields), -1), index=long_yields.index,
+                           columns=[f"{curve}_{bucket}" for curve in long_yields.columns for bucket in ladder])
+    return _levels(returns, np.repeat(long_yields.notna().to_numpy(), len(ladder), axis=1), base)
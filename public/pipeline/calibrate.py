@@ -0,0 +1,113 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import bonds
+
+logger = logging.getLogger(__name__)
+
+# Search space of the NTSG 90/60 proxy
+DEFAULT_GRID = {
+    "equity": np.round(np.arange(0.85, 0.951, 0.01), 4),
+    "bond": np.round(np.arange(0.50, 0.701, 0.02), 4),
+    "duration": np.round(np.arange(5.0, 9.01, 0.5), 4),
+}
+DEFAULT_WEIGHT_BOUNDS = {
+    "US": (0.56, 0.80),
+    "EU": (0.08, 0.24),
+    "JP": (0.04, 0.14),
+    "UK": (0.02, 0.12),
+}
+WEIGHT_STEP = 0.02
+
+# Above this many combinations the grid is split across worker processes
+PARALLEL_MIN_COMBOS = 200_000
+
+
+def weight_grid(bounds=None, step=WEIGHT_STEP):
+    """All region weight vectors on a `step` lattice within `bounds` that sum to 1."""
+    bounds = DEFAULT_WEIGHT_BOUNDS if bounds is None else bounds
+    regions = list(bounds)
+    axes = [np.arange(lo, hi + step / 2, step) for lo, hi in (bounds[r] for r in regions[:-1])]
+    mesh = np.array(np.meshgrid(*axes, indexing='ij')).reshape(len(axes), -1).T
+    last = 1 - mesh.sum(axis=1)
+    lo, hi = bounds[regions[-1]]
+    keep = (last >= lo - 1e-9) & (last <= hi + 1e-9)
+    return pd.DataFrame(np.round(np.column_stack([mesh[keep], last[keep]]), 6), columns=regions)
+
+
+def _score_chunk(args):
+    """Tracking error / return gap for one block of weight vectors (all other axes broadcast)."""
+    equity_ret, yields, rates, target, rows, weights, grid, ter = args
+    composite_yield = pd.DataFrame(yields @ weights.T / 100)
+    cash = (rates @ weights.T / 100 / 12)[rows]
+
+    durations = {d: d for d in grid["duration"]}
+    bond = bonds.bond_returns(composite_yield, durations).to_numpy()
+    bond = bond.reshape(len(composite_yield), len(weights), len(durations))[rows]
+
+    e = grid["equity"][None, None, None, :, None]
+    b = grid["bond"][None, None, None, None, :]
+    ret = (e * equity_ret[rows][:, None, None, None, None]
+           + b * bond[:, :, :, None, None]
+           - (e + b - 1) * cash[:, :, None, None, None]
+           - ter / 12)
+    diff = ret - target[:, None, None, None, None]
+    return diff.std(axis=0, ddof=1) * np.sqrt(12), diff.mean(axis=0) * 12
+
+
+def calibrate_ntsg(inputs, target_ret, grid=None, weights=None, ter=0.0, workers=None):
+    """
+    Ranks NTSG proxy parameter combinations by tracking error against the
+    actual fund's monthly returns over their overlap.
+
+    `inputs` is the frame from process.load_ntsg_inputs (equity_ret plus
+    <region>_Yield / <region>_Rate in percent). Every (weights, duration,
+    equity, bond) combination is evaluated in one broadcast; large grids are
+    split by weight vector across `workers` processes.
+    """
+    grid = DEFAULT_GRID if grid is None else {k: np.asarray(v, dtype='float64') for k, v in grid.items()}
+    weights = weight_grid() if weights is None else weights
+    regions = list(weights.columns)
+
+    target_ret = target_ret.dropna()
+    overlap = inputs.index.intersection(target_ret.index)
+    if len(overlap) < 12:
+        raise ValueError(f"Only {len(overlap)} overlapping months with the target series")
+    rows = inputs.index.get_indexer(overlap)
+
+    equity_ret = inputs['equity_ret'].to_numpy(dtype='float64')
+    yields = inputs[[f"{r}_Yield" for r in regions]].to_numpy(dtype='float64')
+    rates = inputs[[f"{r}_Rate" for r in regions]].to_numpy(dtype='float64')
+    target = target_ret.loc[overlap].to_numpy(dtype='float64')
+    w = weights.to_numpy(dtype='float64')
+
+    n_combos = len(w) * len(grid["duration"]) * len(grid["equity"]) * len(grid["bond"])
+    logger.info(f"Calibrating NTSG proxy: {n_combos:,} combinations over {len(overlap)} months...")
+
+    if n_combos >= PARALLEL_MIN_COMBOS and (workers is None or workers > 1):
+        workers = workers or os.cpu_count() or 1
+        chunks = np.array_split(np.arange(len(w)), workers)
+        jobs = [(equity_ret, yields, rates, target, rows, w[c], grid, ter) for c in chunks if len(c)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_score_chunk, jobs))
+        te = np.concatenate([p[0] for p in parts])
+        gap = np.concatenate([p[1] for p in parts])
+    else:
+        te, gap = _score_chunk((equity_ret, yields, rates, target, rows, w, grid, ter))
+
+    wi, di, ei, bi = np.meshgrid(
+        np.arange(len(w)), np.arange(len(grid["duration"])),
+        np.arange(len(grid["equity"])), np.arange(len(grid["bond"])), indexing='ij'
+    )
+    results = pd.DataFrame(w[wi.ravel()], columns=regions)
+    results.insert(0, 'duration', grid["duration"][di.ravel()])
+    results.insert(0, 'bond', grid["bond"][bi.ravel()])
+    results.insert(0, 'equity', grid["equity"][ei.ravel()])
+    results['tracking_error'] = te.ravel()
+    results['return_gap'] = gap.ravel()
+    results['months'] = len(overlap)
+    return results.sort_values('tracking_error', ignore_index=True)
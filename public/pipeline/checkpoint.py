@@ -0,0 +1,122 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from pipeline import bars, freshness, locks
+
+logger = logging.getLogger(__name__)
+
+# One pickle per pipeline node (builder or stage): its output plus the
+# fingerprint of the inputs it was computed from. A rerun restores every
+# node whose fingerprint still matches and recomputes the rest, so an
+# interrupted run resumes where it stopped.
+CHECKPOINT_DIR = os.path.join(bars.CACHE_DIR, "checkpoints")
+# Set by `process.py --no-resume` to recompute (and re-checkpoint) every node
+ENABLED = True
+
+# Code the nodes depend on: any change to these files invalidates every checkpoint
+_PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE_FILES = [os.path.join(os.path.dirname(_PIPELINE_DIR), "process.py"),
+              os.path.join(_PIPELINE_DIR, "*.py")]
+
+_HASHES = {}
+_DIGESTS = {}
+
+
+def _path(node):
+    return os.path.join(CHECKPOINT_DIR, f"{node}.pkl")
+
+
+def file_hash(path):
+    """sha1 of a file's content (None if missing), re-read only when its mtime or size changes."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _HASHES.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, 'rb') as fh:
+            cached = (stamp, hashlib.sha1(fh.read()).hexdigest())
+        _HASHES[path] = cached
+    return cached[1]
+
+
+def code_version():
+    """Hash over the pipeline's source files."""
+    paths = sorted(p for pattern in CODE_FILES for p in glob.glob(pattern))
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(f"{os.path.basename(path)}:{file_hash(path)}\n".encode())
+    return h.hexdigest()
+
+
+def _file_key(path):
+    # Source workbooks are passed as absolute paths (keyed by name so a moved
+    # checkout keeps its checkpoints); outputs are relative to public/ and
+    # keep their directory, as reports/ repeats the published names
+    return os.path.basename(path) if os.path.isabs(path) else os.path.normpath(path)
+
+
+def fingerprint(reads, files=(), inputs=None):
+    """
+    What a node's output depends on: the code version, the content of the
+    local `files` it reads, the check stamp of every fetched series it read
+    (`reads`, from freshness.recording) and the digests of its upstream
+    nodes (`inputs`).
+    """
+    return {
+        'code': code_version(),
+        'files': {_file_key(p): file_hash(p) for p in sorted(files)},
+        'reads': {k: freshness.check_stamp(k) for k in sorted(reads)},
+        'inputs': inputs or {},
+    }
+
+
+def _digest(fp):
+    return hashlib.sha1(json.dumps(fp, sort_keys=True).encode()).hexdigest()
+
+
+def digest(node):
+    """Digest of the node's fingerprint in this run (None if it has no valid output)."""
+    return _DIGESTS.get(node)
+
+
+def restore(node, files=(), inputs=None):
+    """
+    The node's checkpointed output if its fingerprint still holds and none
+    of the series it read is due for a check; otherwise None.
+    """
+    _DIGESTS.pop(node, None)
+    path = _path(node)
+    if not ENABLED or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as fh:
+            saved = pickle.load(fh)
+    except Exception as e:
+        logger.warning(f"  > Unreadable checkpoint for {node}: {e}")
+        return None
+    fp = saved['fingerprint']
+    if fp != fingerprint(fp['reads'], files, inputs) or any(freshness.is_due(k) for k in fp['reads']):
+        return None
+    _DIGESTS[node] = _digest(fp)
+    logger.info(f"Restored {node} from checkpoint")
+    return saved['value']
+
+
+def store(node, value, reads, files=(), inputs=None):
+    """Checkpoints the node's output (computed after `reads` were fetched) and returns its digest."""
+    fp = fingerprint(reads, files, inputs)
+    with locks.atomic_write(_path(node), 'wb') as fh:
+        pickle.dump({'fingerprint': fp, 'value': value}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    _DIGESTS[node] = _digest(fp)
+    return _DIGESTS[node]
+
+
+def discard(node):
+    """Marks the node as having no valid output in this run."""
+    _DIGESTS.pop(node, None)
@@ -0,0 +1,110 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Standard windows published with the dataset (months of returns, None = full history)
+STANDARD_WINDOWS = {
+    "3y": 36,
+    "5y": 60,
+    "10y": 120,
+    "max": None,
+}
+
+
+def _prefix(a):
+    """Cumulative sums along the first axis with a leading row of zeros."""
+    return np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+
+
+class CorrelationIndex:
+    """
+    Prefix sums of x, x^2, xy and the pair counts over a (months x assets)
+    return matrix, each pair's sums taken over the months where both
+    returns exist.
+
+    Built once in O(months x assets^2); afterwards the full correlation matrix
+    for any date window is an O(assets^2) difference of two prefix rows.
+    Each pair uses the months the window shares with both assets' histories,
+    so late-starting assets still correlate over the months they share, and
+    gaps (e.g. a workbook column ending before the market-data columns) are
+    left out rather than counted as flat months; like DataFrame.corr.
+    """
+
+    def __init__(self, returns, min_periods=12):
+        self.index = returns.index
+        self.columns = returns.columns
+        self.min_periods = min_periods
+
+        r = returns.to_numpy(dtype='float64')
+        valid = ~np.isnan(r)
+        x = np.where(valid, r, 0.0)
+        v = valid.astype('float64')
+
+        # [t, i, j]: sums of asset i over the months where asset j is present too
+        self.n = _prefix(v[:, :, None] * v[:, None, :])
+        self.sx = _prefix(x[:, :, None] * v[:, None, :])
+        self.sxx = _prefix((x * x)[:, :, None] * v[:, None, :])
+        self.sxy = _prefix(x[:, :, None] * x[:, None, :])
+
+    def _rows(self, start, end):
+        lo = 0 if start is None else int(self.index.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.index) if end is None else int(self.index.searchsorted(pd.Timestamp(end), side='right'))
+        return lo, hi
+
+    def window_rows(self, lo, hi):
+        """Correlation matrix over return rows [lo, hi) as a numpy array."""
+        n = self.n[hi] - self.n[lo]
+        sx = self.sx[hi] - self.sx[lo]
+        sy = sx.T
+        sxx = self.sxx[hi] - self.sxx[lo]
+        syy = sxx.T
+        sxy = self.sxy[hi] - self.sxy[lo]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            den = np.sqrt(var_x * var_y)
+            corr = np.where(den > 0, cov / den, 0.0)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[n < self.min_periods] = np.nan
+        np.fill_diagonal(corr, np.where(n.diagonal() >= self.min_periods, 1.0, np.nan))
+        return corr
+
+    def window(self, start=None, end=None):
+        """Correlation matrix for the dates between start and end (inclusive)."""
+        lo, hi = self._rows(start, end)
+        return pd.DataFrame(self.window_rows(lo, hi), index=self.columns, columns=self.columns)
+
+    def trailing(self, months=None):
+        """Correlation matrix over the last `months` returns (None = full history)."""
+        hi = len(self.index)
+        lo = 0 if months is None else max(hi - months, 0)
+        return pd.DataFrame(self.window_rows(lo, hi), index=self.columns, columns=self.columns)
+
+
+def write_correlation_windows(panel, output_file, windows=None, decimals=4):
+    """Precomputes the standard trailing correlation windows for a level panel."""
+    windows = STANDARD_WINDOWS if windows is None else windows
+    returns = panel / panel.shift(1) - 1
+    corr_index = CorrelationIndex(returns)
+
+    end = panel.index[-1]
+    out = {"assets": list(panel.columns), "windows": {}}
+    for name, months in windows.items():
+        matrix = corr_index.trailing(months).round(decimals)
+        start = panel.index[0] if months is None else panel.index[max(len(panel) - months - 1, 0)]
+        out["windows"][name] = {
+            "start": start.strftime('%Y-%m-01'),
+            "end": end.strftime('%Y-%m-01'),
+            "matrix": matrix.astype(object).where(matrix.notna(), None).values.tolist(),
+        }
+
+    with open(output_file, 'w') as f:
+        json.dump(out, f, separators=(',', ':'))
+    logger.info(f"Correlation windows {list(windows)} for {panel.shape[1]} assets -> {output_file}")
+    return corr_index
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the watched directory
+POLL_SECONDS = 1.0
+# A file must have stopped changing for this long before it is picked up
+# (workbooks are often saved in several writes)
+SETTLE_SECONDS = 0.5
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class SourceWatcher:
+    """Polls a directory and reports files added, changed or removed since the last call."""
+
+    def __init__(self, directory, suffixes=('.xlsx', '.csv')):
+        self.directory = directory
+        self.suffixes = suffixes
+        self.seen = self._scan()
+
+    def _scan(self):
+        stats = {}
+        for name in os.listdir(self.directory):
+            if name.startswith('~$') or not name.endswith(self.suffixes):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            stats[name] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def changes(self):
+        current = self._scan()
+        changed = {n for n in current.keys() | self.seen.keys() if current.get(n) != self.seen.get(n)}
+        if changed:
+            # Wait for writers to finish, then take what is on disk then
+            time.sleep(SETTLE_SECONDS)
+            current = self._scan()
+        self.seen = current
+        return sorted(changed)
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') in ('', '/status'):
+            body, code = json.dumps(self.server.get_status(), default=str).encode(), 200
+        elif self.path == '/health':
+            body, code = b'{"ok":true}', 200
+        else:
+            body, code = b'{"error":"not found"}', 404
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"status {self.address_string()} {format % args}")
+
+
+def serve_status(get_status, host='127.0.0.1', port=8765):
+    """Serves get_status() as JSON on http://host:port/status from a background thread."""
+    server = ThreadingHTTPServer((host, port), _StatusHandler)
+    server.get_status = get_status
+    threading.Thread(target=server.serve_forever, name='status-server', daemon=True).start()
+    logger.info(f"Status endpoint on http://{host}:{server.server_address[1]}/status")
+    return server
+
+
+def run(full_build, incremental_build, watch_dir, interval=3600, host='127.0.0.1', port=8765,
+        max_cycles=None):
+    """
+    Refresh loop: one full build at start-up and then every `interval`
+    seconds; in between, files changed in `watch_dir` are passed to
+    incremental_build(changed_files). Builds return a dict of stats that is
+    published on the status endpoint together with the daemon's state.
+    `max_cycles` stops the loop after that many builds (for tests).
+    """
+    status = {
+        'state': 'starting', 'started': _utcnow(), 'builds': 0, 'interval': interval,
+        'watching': watch_dir, 'last_build': None, 'last_error': None, 'next_full_build': None,
+    }
+    lock = threading.Lock()
+
+    def get_status():
+        with lock:
+            return dict(status)
+
+    def build(kind, fn, *args):
+        with lock:
+            status['state'] = f'building ({kind})'
+        started = time.perf_counter()
+        try:
+            stats = fn(*args) or {}
+            error = None
+        except Exception as e:
+            logger.exception(f"Daemon {kind} build failed")
+            stats, error = {}, f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started
+        with lock:
+            status['builds'] += 1
+            status['state'] = 'idle'
+            status['last_build'] = {'kind': kind, 'finished': _utcnow(), 'seconds': round(seconds, 3), **stats}
+            if error:
+                status['last_error'] = {'at': _utcnow(), 'error': error}
+        logger.info(f"Daemon {kind} build done in {seconds:.2f}s")
+
+    server = serve_status(get_status, host, port) if port is not None else None
+    watcher = SourceWatcher(watch_dir)
+    try:
+        while True:
+            build('full', full_build)
+            next_full = time.monotonic() + interval
+            with lock:
+                status['next_full_build'] = datetime.fromtimestamp(
+                    time.time() + interval, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            if max_cycles is not None and status['builds'] >= max_cycles:
+                return status
+            while time.monotonic() < next_full:
+                time.sleep(POLL_SECONDS)
+                changed = watcher.changes()
+                if changed:
+                    logger.info(f"Daemon: {', '.join(changed)} changed")
+                    build('incremental', incremental_build, changed)
+                    if max_cycles is not None and status['builds'] >= max_cycles:
+                        return status
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped.")
+    finally:
+        if server is not None:
+            server.shutdown()
+    return status
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Values are compared / hashed at this many significant digits, so the
+# round trip through xlsx text doesn't register as a revision
+SIGNIFICANT_DIGITS = 15
+
+
+def load_published(json_path):
+    """
+    The published dataset ({headers, rows} with 'YYYY-MM-01' dates) as a
+    frame indexed by date string; empty if there is none yet.
+    """
+    if not os.path.exists(json_path):
+        return pd.DataFrame()
+    with open(json_path) as fh:
+        data = json.load(fh)
+    frame = pd.DataFrame(data['rows'], columns=data['headers'])
+    return frame.set_index('Date').apply(pd.to_numeric, errors='coerce').astype('float64')
+
+
+def to_published(panel):
+    """Panel as the client sees it: 'YYYY-MM-01' date strings, float values."""
+    out = panel.astype('float64')
+    out.index = pd.Index(pd.DatetimeIndex(panel.index).strftime('%Y-%m-01'), name='Date')
+    return out
+
+
+def _canonical(values):
+    """Values rounded to SIGNIFICANT_DIGITS as text (NaN -> 'null')."""
+    s = pd.Series(values)
+    return np.where(s.isna(), 'null', s.map(lambda v: f"{v:.{SIGNIFICANT_DIGITS}g}"))
+
+
+def column_versions(frame):
+    """Content hash (12 hex chars) of every column over its dates and values."""
+    dates = "|".join(frame.index).encode()
+    versions = {}
+    for col in frame.columns:
+        h = hashlib.sha1(dates)
+        h.update("|".join(_canonical(frame[col].to_numpy())).encode())
+        versions[col] = h.hexdigest()[:12]
+    return versions
+
+
+def dataset_version(versions):
+    """Version of the whole dataset from its (ordered) column versions."""
+    h = hashlib.sha1(json.dumps(list(versions.items())).encode())
+    return h.hexdigest()[:12]
+
+
+def build_delta(previous, current):
+    """
+    Changes from `previous` to `current` (both in published form): full rows
+    for dates the previous version didn't have, and per-column revisions
+    [[date, value], ...] for historical cells whose value changed (including
+    every value of a new column). Only columns whose version moved are
+    scanned cell by cell.
+    """
+    old_versions = column_versions(previous) if not previous.empty else {}
+    new_versions = column_versions(current)
+    new_dates = current.index.difference(previous.index, sort=False) if not previous.empty else current.index
+    common_dates = current.index.intersection(previous.index, sort=False) if not previous.empty else pd.Index([])
+
+    revisions = {}
+    changed = [c for c in current.columns if old_versions.get(c) != new_versions[c]]
+    if len(common_dates) and changed:
+        new_vals = current.loc[common_dates, changed].to_numpy()
+        old_vals = previous.reindex(index=common_dates, columns=changed).to_numpy()
+        new_txt = np.column_stack([_canonical(new_vals[:, j]) for j in range(len(changed))])
+        old_txt = np.column_stack([_canonical(old_vals[:, j]) for j in range(len(changed))])
+        diff = new_txt != old_txt
+        for j, col in enumerate(changed):
+            rows = np.flatnonzero(diff[:, j])
+            if len(rows):
+                revisions[col] = [[common_dates[i], None if np.isnan(new_vals[i, j]) else float(new_vals[i, j])]
+                                  for i in rows]
+
+    headers = ['Date'] + list(current.columns)
+    appended = current.loc[new_dates]
+    rows = [[d] + [None if np.isnan(v) else float(v) for v in vals]
+            for d, vals in zip(appended.index, appended.to_numpy())]
+    return {
+        'base': dataset_version(old_versions) if old_versions else None,
+        'version': dataset_version(new_versions),
+        'headers': headers,
+        'added_columns': [c for c in current.columns if c not in old_versions],
+        'removed_columns': [c for c in old_versions if c not in new_versions],
+        'rows': rows,
+        'revisions': revisions,
+    }
+
+
+def build_manifest(current, delta=None, delta_file=None):
+    """Per-column versions and coverage of the dataset, plus the delta it ships with."""
+    versions = column_versions(current)
+    columns = {}
+    for col in current.columns:
+        valid = current[col].dropna()
+        columns[col] = {
+            'version': versions[col],
+            'first': valid.index[0] if len(valid) else None,
+            'last': valid.index[-1] if len(valid) else None,
+            'count': int(len(valid)),
+        }
+    manifest = {
+        'version': dataset_version(versions),
+        'generated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'rows': int(len(current)),
+        'columns': columns,
+    }
+    if delta is not None:
+        manifest['delta'] = {'base': delta['base'], 'file': delta_file}
+    return manifest
+
+
+def publish_delta(panel, published_json, manifest_file, delta_file):
+    """
+    Compares the new panel with the published dataset and writes the delta
+    artifact and the manifest next to it. Returns the delta.
+    """
+    current = to_published(panel)
+    previous = load_published(published_json)
+    delta = build_delta(previous, current)
+    manifest = build_manifest(current, delta, os.path.basename(delta_file))
+
+    with open(delta_file, 'w') as fh:
+        json.dump(delta, fh, separators=(',', ':'))
+    with open(manifest_file, 'w') as fh:
+        json.dump(manifest, fh, separators=(',', ':'))
+
+    if delta['base'] == delta['version']:
+        logger.info(f"Dataset unchanged (version {delta['version']})")
+    else:
+        revised = sum(len(v) for v in delta['revisions'].values())
+        logger.info(f"Dataset {delta['base']} -> {delta['version']}: {len(delta['rows'])} new rows, "
+                    f"{revised} revised values in {len(delta['revisions'])} columns, "
+                    f"delta {os.path.getsize(delta_file) / 1e3:.1f} KB")
+    return delta
@@ -0,0 +1,160 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pipeline import ragged
+
+logger = logging.getLogger(__name__)
+
+
+def _segment_starts(keys):
+    """Start offsets of the runs of equal values in a sorted 1-D key array."""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def compute_drawdowns(panel):
+    """
+    Running peak, drawdown depth, drawdown episodes and underwater stats for
+    every column of a (dates x assets) level panel, or a RaggedPanel, in one
+    vectorized pass over the observations.
+
+    Mirrors drawdownsFromIndex / timeToRecoverFromIndex / timeUnderwaterStats
+    in src/lib/finance.ts: a new peak requires a strictly higher value, an
+    episode starts at the previous peak and recovers at the next new peak.
+    Works on the ragged layout (pipeline/ragged.py), so pre-inception and
+    post-delisting padding is never scanned; NaN gaps inside a column are
+    skipped.
+
+    Returns (drawdowns, episodes_frame, underwater_frame), the drawdowns as a
+    RaggedPanel on the input's layout (to_panel() for the rectangle).
+    """
+    layout = panel if isinstance(panel, ragged.RaggedPanel) else ragged.RaggedPanel.from_panel(panel)
+    values = layout.values
+    offsets = layout.offsets
+    n_rows, n_cols = layout.shape
+    col = layout.column_ids()
+    row = layout.rows()
+    valid = ~np.isnan(values)
+    nonempty = layout.lengths > 0
+    heads = offsets[:-1][nonempty]
+    first = np.zeros(len(values), dtype=bool)
+    first[heads] = True
+
+    # Running peak, restarting at every column (NaN gaps carry the peak)
+    peak = layout.accumulate(np.fmax)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drawdown = values / peak - 1
+    drawdown[~valid] = np.nan
+
+    prev_peak = np.r_[np.nan, peak[:-1]]
+    prev_peak[first] = np.nan
+    new_peak = valid & ~(values <= prev_peak)  # NaN prev_peak counts as a new peak
+    underwater = valid & (values < prev_peak)
+
+    # Segment id per value: the buffer is column-major, so every (column, peak) run is contiguous
+    peak_count = np.cumsum(new_peak)
+    base = np.zeros(n_cols, dtype=np.int64)
+    base[nonempty] = peak_count[heads] - 1
+    peak_id = peak_count - np.repeat(base, layout.lengths)
+    keys = col * (n_rows + 1) + peak_id
+    flat_dd = np.where(valid, drawdown, np.inf)
+    starts = _segment_starts(keys) if len(keys) else np.empty(0, dtype=np.int64)
+    seg_ends = np.r_[starts[1:], keys.size]
+    seg_col = col[starts]
+
+    seg_min = np.minimum.reduceat(flat_dd, starts) if len(starts) else np.empty(0)
+    seg_has_uw = np.logical_or.reduceat(underwater, starts) if len(starts) else np.empty(0, dtype=bool)
+    seg_of = np.repeat(np.arange(starts.size), seg_ends - starts)
+    trough_hits = np.flatnonzero(flat_dd == seg_min[seg_of])
+    _, first_hit = np.unique(seg_of[trough_hits], return_index=True)
+    seg_trough = np.full(starts.size, -1)
+    seg_trough[np.unique(seg_of[trough_hits])] = trough_hits[first_hit]
+
+    is_episode = seg_has_uw & (keys[starts] % (n_rows + 1) > 0)
+    next_same_col = np.r_[seg_col[1:] == seg_col[:-1], False]
+    recovered = is_episode & next_same_col
+
+    # Last observation per column closes ongoing episodes
+    last_valid = layout.starts + layout.lengths - 1
+
+    ep = np.flatnonzero(is_episode)
+    dates = layout.index
+    start_row = row[starts[ep]]
+    trough_row = row[seg_trough[ep]]
+    recovery_row = np.where(
+        recovered[ep], row[np.minimum(seg_ends[ep], len(row) - 1)], last_valid[seg_col[ep]]
+    )
+    start_period = dates[start_row].to_period('M')
+    recovery_period = dates[recovery_row].to_period('M')
+    months = (recovery_period.year - start_period.year) * 12 + (recovery_period.month - start_period.month)
+
+    episodes = pd.DataFrame({
+        'asset': layout.columns[seg_col[ep]],
+        'start': dates[start_row],
+        'trough': dates[trough_row],
+        'recovery': dates[recovery_row],
+        'depth': -seg_min[ep],
+        'months': np.asarray(months),
+        'ongoing': ~recovered[ep],
+    })
+
+    # Longest run of consecutive underwater months per column (reset on v >= peak).
+    # The underwater count only grows along the buffer and each column opens
+    # with a reset, so one running max serves every column.
+    run = np.cumsum(underwater)
+    streak = run - np.maximum.accumulate(np.where(valid & ~underwater, run, 0)) if len(run) else run
+    longest = np.zeros(n_cols, dtype=np.int64)
+    n_obs = np.zeros(n_cols, dtype=np.int64)
+    n_under = np.zeros(n_cols, dtype=np.int64)
+    if nonempty.any():
+        longest[nonempty] = np.maximum.reduceat(streak, heads)
+        n_obs[nonempty] = np.add.reduceat(valid, heads)
+        n_under[nonempty] = np.add.reduceat(underwater, heads)
+    underwater_stats = pd.DataFrame({
+        'pct_months': np.where(n_obs > 1, n_under / np.maximum(n_obs - 1, 1), 0.0),
+        'longest_streak_months': longest,
+    }, index=layout.columns)
+
+    return layout.with_values(drawdown), episodes, underwater_stats
+
+
+def write_drawdown_table(panel, output_file, decimals=6):
+    """
+    Writes the drawdown side table as columnar JSON next to the main dataset,
+    the drawdown series in the ragged layout of writers.write_ragged:
+    {"dates", "columns": [{"name", "start", "values"}], "episodes", "underwater"}.
+    Dates use the same month keys as alphatrace_data.json (YYYY-MM-01).
+    `panel` may be a RaggedPanel.
+    """
+    drawdown, episodes, underwater = compute_drawdowns(panel)
+
+    values = np.round(drawdown.values, decimals)
+    ep = episodes.copy()
+    for col in ['start', 'trough', 'recovery']:
+        ep[col] = ep[col].dt.strftime('%Y-%m-01')
+    ep['depth'] = ep['depth'].round(decimals)
+
+    table = {
+        'dates': list(drawdown.index.strftime('%Y-%m-01')),
+        'columns': [
+            {'name': str(name), 'start': int(drawdown.starts[j]),
+             'values': [None if np.isnan(v) else float(v)
+                        for v in values[drawdown.offsets[j]:drawdown.offsets[j + 1]]]}
+            for j, name in enumerate(drawdown.columns)
+        ],
+        'episodes': {
+            'headers': list(ep.columns),
+            'rows': ep.astype(object).values.tolist(),
+        },
+        'underwater': {
+            asset: {'pctMonths': round(float(r.pct_months), decimals),
+                    'longestStreakMonths': int(r.longest_streak_months)}
+            for asset, r in underwater.iterrows()
+        },
+    }
+    with open(output_file, 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+    logger.info(f"Drawdown table: {len(episodes)} episodes across {panel.shape[1]} assets -> {output_file}")
+    return drawdown, episodes, underwater
@@ -0,0 +1,78 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def current_ter(schedule):
+    """Latest annual TER of a [(since, ter), ...] schedule."""
+    return schedule[-1][1]
+
+
+def with_inceptions(schedules, inceptions):
+    """
+    Schedules with each asset's history before its inception ({asset: date},
+    e.g. splice.inceptions()) left without a fee: the step in force at the
+    inception starts there and earlier steps are dropped.
+    """
+    out = dict(schedules)
+    for asset, inception in inceptions.items():
+        steps = schedules.get(asset)
+        if not steps or inception is None:
+            continue
+        inception = pd.Timestamp(inception)
+        dated = [(pd.Timestamp(since) if since is not None else pd.Timestamp.min, ter) for since, ter in steps]
+        live = [(since, ter) for since, ter in dated if since > inception]
+        before = [ter for since, ter in dated if since <= inception]
+        out[asset] = ([(inception, before[-1])] if before else []) + live
+    return out
+
+
+def compile_schedules(schedules):
+    """
+    Step table (step dates x assets) of annual TERs from dated step functions
+    {asset: [(since, ter), ...]}. A `since` of None means "from the start of
+    history"; before an asset's first dated step it pays no fee (e.g. proxy
+    history before the fund's inception).
+    """
+    rows = [
+        (asset, pd.Timestamp(since) if since is not None else pd.Timestamp.min, ter)
+        for asset, steps in schedules.items() for since, ter in steps
+    ]
+    steps = pd.DataFrame(rows, columns=['asset', 'since', 'ter'])
+    return steps.pivot_table(index='since', columns='asset', values='ter', aggfunc='last').sort_index()
+
+
+def fee_matrix(schedules, index, assets):
+    """
+    Monthly fees (annual TER / 12) as a (dates x columns) array: `assets`
+    names the schedule of each column (None or unknown names pay nothing).
+    """
+    steps = compile_schedules(schedules)
+    index = pd.DatetimeIndex(index)
+    table = steps.reindex(steps.index.union(index)).ffill().reindex(index)
+    return table.reindex(columns=pd.Index(assets, dtype=object)).fillna(0).to_numpy(dtype='float64') / 12
+
+
+def net_of_fees(levels, fees):
+    """
+    Deducts a (dates x columns) monthly fee matrix from every column's returns
+    in one broadcast and rebuilds the levels from each column's first value.
+
+    Returns are taken between consecutive observations of a column, so rows a
+    column doesn't have (from the outer join with other assets) are neither
+    charged nor filled; its first observation keeps its level.
+    """
+    x = levels.to_numpy(dtype='float64')
+    valid = ~np.isnan(x)
+    prev = levels.ffill().shift(1).to_numpy(dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        adj_rets = x / prev - 1 - fees
+    growth = np.where(valid & ~np.isnan(adj_rets), 1 + adj_rets, 1.0)
+    first = levels.bfill().iloc[0].to_numpy(dtype='float64') if len(levels) else np.zeros(levels.shape[1])
+    net = np.where(valid, first * np.cumprod(growth, axis=0), np.nan)
+    # Columns without any fee are passed through untouched
+    net = np.where(np.any(fees != 0, axis=0), net, x)
+    return pd.DataFrame(net, index=levels.index, columns=levels.columns)
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from pipeline import locks
+
+logger = logging.getLogger(__name__)
+
+# Publication cadences: spacing of observations, delay until an observation
+# is available, and the minimum wait between two checks of a series
+CADENCES = {
+    "daily": {"step": pd.offsets.BDay(1), "lag": pd.Timedelta(days=1), "recheck": pd.Timedelta(hours=12)},
+    "weekly": {"step": pd.DateOffset(weeks=1), "lag": pd.Timedelta(days=2), "recheck": pd.Timedelta(days=1)},
+    "monthly": {"step": pd.DateOffset(months=1), "lag": pd.Timedelta(days=14), "recheck": pd.Timedelta(days=1)},
+    "quarterly": {"step": pd.DateOffset(months=3), "lag": pd.Timedelta(days=30), "recheck": pd.Timedelta(days=3)},
+}
+# Checks that bring nothing new double the wait, up to 2 ** MAX_BACKOFF
+# (holidays, publication delays, discontinued series)
+MAX_BACKOFF = 5
+
+# Set by `process.py --refresh` to fetch every series regardless of schedule
+# (once per run: series checked since _STARTED count as fresh)
+FORCE_REFRESH = False
+
+_CATALOG = None
+# Keys updated by this process since the catalog was last saved
+_DIRTY = set()
+# Guards the catalog against threads refreshing series concurrently
+_LOCK = threading.RLock()
+# Per-thread stack of key sets being filled by recording()
+_RECORDERS = threading.local()
+
+
+def _cache_dir():
+    from pipeline import bars
+    return bars.CACHE_DIR
+
+
+def _catalog_path():
+    return os.path.join(_cache_dir(), "catalog.json")
+
+
+def _series_path(key):
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+    return os.path.join(_cache_dir(), "series", f"{safe}.csv")
+
+
+def _now():
+    return pd.Timestamp.now(tz='UTC').tz_localize(None)
+
+
+_STARTED = _now().floor('s')
+
+
+def _read_catalog():
+    path = _catalog_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def load_catalog():
+    """Catalog {key: entry} of every tracked series, read once per run."""
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = _read_catalog()
+    return _CATALOG
+
+
+def save_catalog():
+    """
+    Writes this process's updated entries into the catalog on disk. Other
+    processes may have saved theirs meanwhile, so the file is re-read and
+    merged under its lock and replaced atomically.
+    """
+    path = _catalog_path()
+    catalog = load_catalog()
+    with _LOCK, locks.file_lock(path):
+        on_disk = _read_catalog()
+        on_disk.update({k: catalog[k] for k in _DIRTY if k in catalog})
+        with locks.atomic_write(path) as fh:
+            json.dump(on_disk, fh, indent=1, sort_keys=True)
+        _DIRTY.clear()
+        for key, entry in on_disk.items():
+            catalog.setdefault(key, entry)
+
+
+def reload_entry(key):
+    """Picks up `key`'s entry as another process last saved it (if newer)."""
+    entry = _read_catalog().get(key)
+    catalog = load_catalog()
+    if entry is not None and entry.get('last_check', '') > catalog.get(key, {}).get('last_check', ''):
+        catalog[key] = entry
+
+
+@contextmanager
+def recording():
+    """
+    Collects the keys of every series this thread reads within the block
+    (see pipeline/checkpoint.py); blocks may be nested.
+    """
+    stack = _RECORDERS.__dict__.setdefault('stack', [])
+    keys = set()
+    stack.append(keys)
+    try:
+        yield keys
+    finally:
+        stack.pop()
+
+
+def note_reads(keys):
+    """Adds `keys` to every recording() block open in this thread (memo hits call this too)."""
+    for recorder in getattr(_RECORDERS, 'stack', ()):
+        recorder.update(keys)
+
+
+def check_stamp(key):
+    """Time `key` was last checked (None if never): changes whenever its data may have."""
+    return load_catalog().get(key, {}).get('last_check')
+
+
+def infer_cadence(index):
+    """Publication cadence from the median spacing of observation dates."""
+    if len(index) < 3:
+        return "daily"
+    days = pd.Series(pd.DatetimeIndex(index)).diff().dt.days.median()
+    if days <= 4:
+        return "daily"
+    if days <= 10:
+        return "weekly"
+    if days <= 45:
+        return "monthly"
+    return "quarterly"
+
+
+def next_due(entry):
+    """Earliest time the series is worth checking again."""
+    spec = CADENCES[entry['cadence']]
+    wait = spec['recheck'] * 2 ** min(entry.get('misses', 0), MAX_BACKOFF)
+    due = pd.Timestamp(entry['last_check']) + wait
+    if entry.get('last_obs') and entry.get('track_obs', True):
+        due = max(due, pd.Timestamp(entry['last_obs']) + spec['step'] + spec['lag'])
+    return due
+
+
+def is_due(key, now=None):
+    """True if `key` was never checked or its next observation should be out."""
+    entry = load_catalog().get(key)
+    if entry is None:
+        return True
+    if FORCE_REFRESH:
+        return pd.Timestamp(entry['last_check']) < _STARTED
+    return (now or _now()) >= next_due(entry)
+
+
+def record_check(key, source, last_obs, cadence, track_obs=True, now=None):
+    """Updates a series' entry after a check; a check without a newer observation counts as a miss."""
+    catalog = load_catalog()
+    now = now or _now()
+    last_obs = pd.Timestamp(last_obs).strftime('%Y-%m-%d') if last_obs is not None else None
+    with _LOCK:
+        entry = catalog.get(key, {})
+        got_new = last_obs is not None and (entry.get('last_obs') is None or last_obs > entry['last_obs'])
+        entry.update({
+            'source': source,
+            'cadence': cadence,
+            'track_obs': track_obs,
+            'last_check': now.strftime('%Y-%m-%dT%H:%M:%S'),
+            'misses': 0 if got_new else entry.get('misses', 0) + 1,
+        })
+        if got_new:
+            entry['last_obs'] = last_obs
+            entry['last_update'] = entry['last_check']
+        catalog[key] = entry
+        _DIRTY.add(key)
+        save_catalog()
+    return entry
+
+
+def _read_series(key):
+    path = _series_path(key)
+    if not os.path.exists(path):
+        return pd.Series(dtype='float64')
+    return pd.read_csv(path, index_col=0, parse_dates=True).iloc[:, 0]
+
+
+def _write_series(key, series):
+    frame = series.rename('Value').to_frame()
+    frame.index.name = 'Date'
+    with locks.atomic_write(_series_path(key)) as fh:
+        frame.to_csv(fh)
+
+
+def cached_series(key, fetch, source=None, cadence=None, track_obs=True):
+    """
+    A series from the local copy when it isn't due yet, otherwise from
+    `fetch()` (which returns a Series; empty on failure, in which case the
+    local copy is used, or None when the source is being skipped, e.g. while
+    its circuit is open, in which case the local copy is used without
+    counting a check). `cadence` defaults to the one inferred from the data;
+    `track_obs=False` is for series whose last label isn't an observation
+    date (e.g. month-end labelled bars of the running month).
+
+    Refreshes are single-flight across processes: the first process to find
+    the series due fetches it under the series' lock, the others wait for
+    the lock and then read what it stored (even with FORCE_REFRESH).
+    """
+    note_reads([key])
+    cached = _read_series(key)
+    if not cached.empty and not is_due(key):
+        return cached
+
+    checked = load_catalog().get(key, {}).get('last_check')
+    with locks.file_lock(_series_path(key)):
+        reload_entry(key)
+        cached = _read_series(key)
+        refreshed = load_catalog().get(key, {}).get('last_check') != checked
+        if not cached.empty and (refreshed or not is_due(key)):
+            return cached
+
+        fresh = fetch()
+        if fresh is None:
+            return cached
+        series = fresh if not fresh.empty else cached
+        if series.empty:
+            return series
+        if not fresh.empty:
+            _write_series(key, fresh)
+        record_check(key, source or key.split(':')[0], series.index[-1],
+                     cadence or infer_cadence(series.index), track_obs)
+    return series
+
+
+def track_local(key, series, source, cadence="monthly"):
+    """Catalogs a local source (e.g. a workbook) and warns once it is overdue."""
+    if series.empty:
+        return
+    entry = record_check(key, source, series.index[-1], cadence)
+    if _now() >= pd.Timestamp(entry['last_obs']) + 2 * CADENCES[cadence]['step'] + CADENCES[cadence]['lag']:
+        logger.warning(f"  {key} is stale: last observation {entry['last_obs']}")
+
+
+def report():
+    """Catalog as a frame with the next due time of every series."""
+    catalog = load_catalog()
+    if not catalog:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(catalog, orient='index')
+    frame['next_due'] = [next_due(e).strftime('%Y-%m-%dT%H:%M:%S') for e in catalog.values()]
+    frame['due'] = [is_due(k) for k in catalog]
+    return frame.sort_index()
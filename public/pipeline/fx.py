@@ -0,0 +1,128 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pipeline import freshness, resample
+
+logger = logging.getLogger(__name__)
+
+# FX sources per currency, quoted as USD per unit of the currency unless marked inverse.
+#   fred:   primary FRED daily series
+#   legacy: (FRED id, factor) pre-euro leg, USD per unit = factor / value (DEM per USD)
+#   yf:     Yahoo ticker used to fill the most recent months FRED has not published yet
+FX_SOURCES = {
+    "eur": {"fred": "DEXUSEU", "legacy": ("EXGEUS", 1.95583), "yf": "EURUSD=X"},
+    "gbp": {"fred": "DEXUSUK", "yf": "GBPUSD=X"},
+    "chf": {"fred": "DEXSZUS", "fred_inverse": True, "yf": "CHF=X", "yf_inverse": True},
+    "jpy": {"fred": "DEXJPUS", "fred_inverse": True, "yf": "JPY=X", "yf_inverse": True},
+}
+
+_FX_CACHE = {}
+
+
+def _fetch_usd_per_unit(ccy, fetch_fred, fetch_yf, yf_start):
+    src = FX_SOURCES[ccy]
+    series = pd.Series(dtype='float64')
+
+    df = fetch_fred(src["fred"], "Rate")
+    if not df.empty:
+        series = df["Rate"]
+        if src.get("fred_inverse"):
+            series = 1 / series
+
+    if "legacy" in src:
+        legacy_id, factor = src["legacy"]
+        legacy = fetch_fred(legacy_id, "Rate")
+        if not legacy.empty:
+            series = series.combine_first(factor / legacy["Rate"])
+
+    recent = fetch_yf(src["yf"], start_date=yf_start)
+    if not recent.empty:
+        if src.get("yf_inverse"):
+            recent = 1 / recent
+        series = series.combine_first(recent)
+
+    if series.empty:
+        logger.warning(f"  > No FX data for {ccy.upper()}")
+        return series
+    return resample.last(series)
+
+
+def get_fx_matrix(currencies, fetch_fred, fetch_yf, yf_start="2025-01-01"):
+    """
+    Month-end matrix of USD per unit of each currency (the 'usd' column is 1.0).
+    Fetched once per currency set and cached for the rest of the run.
+    """
+    key = (tuple(currencies), yf_start)
+    if key not in _FX_CACHE:
+        logger.info(f"Building FX matrix for {', '.join(c.upper() for c in currencies)}...")
+        cols = {}
+        with freshness.recording() as reads:
+            for ccy in currencies:
+                if ccy == "usd":
+                    continue
+                cols[ccy] = _fetch_usd_per_unit(ccy, fetch_fred, fetch_yf, yf_start)
+        matrix = pd.DataFrame(cols).sort_index().ffill()
+        matrix.insert(0, "usd", 1.0)
+        _FX_CACHE[key] = (matrix[list(currencies)], reads)
+    matrix, reads = _FX_CACHE[key]
+    freshness.note_reads(reads)
+    return matrix
+
+
+def align_fx(fx_matrix, index):
+    """
+    Aligns the month-end FX matrix onto a panel index. Dates are bucketed to
+    their month end first, so a last-business-day row (e.g. MSCI 1999-01-29)
+    picks up that month's closing rate; missing months carry the last rate.
+    """
+    month_end = resample.month_end(index)
+    full_idx = month_end.union(fx_matrix.index).sort_values()
+    aligned = fx_matrix.reindex(full_idx).ffill().reindex(month_end)
+    aligned.index = index
+    return aligned
+
+
+def split_currency(col, currencies):
+    """Splits 'asset_ccy' into (asset, ccy); unsuffixed columns are USD."""
+    for ccy in currencies:
+        if col.endswith(f"_{ccy}"):
+            return col[: -len(ccy) - 1], ccy
+    return col, "usd"
+
+
+def convert_panel(panel, fx_matrix):
+    """
+    Expresses every column of `panel` in every currency of `fx_matrix`.
+
+    The native currency of each column comes from its suffix (unsuffixed =
+    USD). All views are produced by one broadcast into a preallocated
+    (months x assets x currencies) block; native columns, and any view a
+    builder already supplies in `panel`, are kept as-is.
+    Returns a new frame: the original columns first, then the derived views.
+    """
+    currencies = list(fx_matrix.columns)
+    fx = align_fx(fx_matrix, panel.index).to_numpy(dtype='float64')
+    values = panel.to_numpy(dtype='float64')
+
+    native = [split_currency(col, currencies) for col in panel.columns]
+    native_idx = np.array([currencies.index(ccy) for _, ccy in native])
+
+    usd = values * fx[:, native_idx]
+    block = np.empty(values.shape + (len(currencies),))
+    np.divide(usd[:, :, None], fx[:, None, :], out=block)
+
+    existing = set(panel.columns)
+    out_cols, out_src = list(panel.columns), [values]
+    for a in range(len(panel.columns)):
+        base, ccy = native[a]
+        for k, view_ccy in enumerate(currencies):
+            name = f"{base}_{view_ccy}"
+            if view_ccy == ccy or name in existing:
+                continue
+            existing.add(name)
+            out_cols.append(name)
+            out_src.append(block[:, a, k:k + 1])
+
+    return pd.DataFrame(np.hstack(out_src), index=panel.index, columns=out_cols)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from pipeline import bars, locks
+from pipeline import precision as storage
+
+logger = logging.getLogger(__name__)
+
+# Append-only store of every run's output:
+#   objects/<hh>/<sha1>.bin  one column chunk (dates + values), stored once
+#   runs/<run_id>.json       the chunk hashes of each column for that run and
+#                            the storage precision its chunks are encoded at
+#   runs.jsonl               one line per run, in order
+HISTORY_DIR = os.path.join(bars.CACHE_DIR, "history")
+
+# Columns are cut into calendar blocks of this many years, so a new month or
+# a revision of recent data only produces a new chunk for the latest block
+CHUNK_YEARS = 10
+
+_BLOBS = {}
+_RUNS = {}
+
+
+def _object_path(key, store):
+    return os.path.join(store, "objects", key[:2], f"{key}.bin")
+
+
+def _encode(part, precision='float64'):
+    """
+    Chunk bytes: int64 dates (ns) followed by the values at the storage
+    precision (float64, float32, or a 'bp' anchor and int32 codes).
+    """
+    return part.index.asi8.tobytes() + storage.encode_block(part.to_numpy(dtype='float64'), precision)
+
+
+# Bytes per row of a chunk (date + value), and the fixed part ('bp' anchor)
+_ROW_BYTES = {'float64': 16, 'float32': 12, 'bp': 12}
+_FIXED_BYTES = {'float64': 0, 'float32': 0, 'bp': 8}
+
+
+def _decode(blob, precision='float64'):
+    """(dates as int64 ns, float64 values) arrays of a chunk."""
+    n = (len(blob) - _FIXED_BYTES[precision]) // _ROW_BYTES[precision]
+    dates = np.frombuffer(blob, dtype=np.int64, count=n)
+    return dates, storage.decode_block(blob[8 * n:], n, 1, precision)[:, 0]
+
+
+def _read_blob(key, store, precision='float64'):
+    if key not in _BLOBS:
+        with open(_object_path(key, store), 'rb') as fh:
+            _BLOBS[key] = _decode(fh.read(), precision)
+    return _BLOBS[key]
+
+
+def column_chunks(series, precision='float64'):
+    """(key, bytes) of a column's observations per CHUNK_YEARS calendar block."""
+    s = series.dropna()
+    if s.empty:
+        return []
+    s.index = pd.DatetimeIndex(s.index).as_unit('ns')
+    out = []
+    for _, part in s.groupby(s.index.year // CHUNK_YEARS):
+        blob = _encode(part, precision)
+        out.append((hashlib.sha1(blob).hexdigest(), blob))
+    return out
+
+
+def record_run(panel, store=None, note=None, precision=None):
+    """
+    Stores the panel as a new run, its chunks encoded at the storage
+    `precision` (default: precision.STORAGE). Chunks already in the store
+    (from any earlier run or column) are not written again, so storage
+    grows with the revisions, not the number of runs. Returns the run id.
+    """
+    store = store or HISTORY_DIR
+    precision = storage.STORAGE if precision is None else precision
+    created = datetime.now(timezone.utc)
+    run_id = created.strftime('%Y%m%dT%H%M%S%fZ')
+    columns = {}
+    new_chunks = new_bytes = total = 0
+    for col in panel.columns:
+        keys = []
+        for key, blob in column_chunks(panel[col], precision):
+            path = _object_path(key, store)
+            if not os.path.exists(path):
+                with locks.atomic_write(path, 'wb') as fh:
+                    fh.write(blob)
+                new_chunks += 1
+                new_bytes += len(blob)
+            keys.append(key)
+            total += 1
+        columns[str(col)] = keys
+
+    run = {'run': run_id, 'created': created.strftime('%Y-%m-%dT%H:%M:%S.%fZ'), 'note': note,
+           'precision': precision, 'columns': columns}
+    with locks.atomic_write(os.path.join(store, "runs", f"{run_id}.json")) as fh:
+        json.dump(run, fh)
+    index_path = os.path.join(store, "runs.jsonl")
+    with locks.file_lock(index_path), open(index_path, 'a') as fh:
+        fh.write(json.dumps({'run': run_id, 'created': run['created'], 'note': note}) + "\n")
+    logger.info(f"History run {run_id}: {new_chunks} new of {total} {precision} chunks ({new_bytes / 1e3:.1f} KB)")
+    return run_id
+
+
+def list_runs(store=None):
+    """Every recorded run (run, created, note), oldest first."""
+    path = os.path.join(store or HISTORY_DIR, "runs.jsonl")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['run', 'created', 'note'])
+    with open(path) as fh:
+        runs = pd.DataFrame([json.loads(line) for line in fh if line.strip()])
+    runs['created'] = pd.to_datetime(runs['created']).dt.tz_localize(None)
+    return runs
+
+
+def _load_run(run_id, store):
+    if run_id not in _RUNS:
+        with open(os.path.join(store, "runs", f"{run_id}.json")) as fh:
+            _RUNS[run_id] = json.load(fh)
+    return _RUNS[run_id]
+
+
+def run_precision(run, store=None):
+    """Storage precision a run's chunks were encoded at (runs from before the option: float64)."""
+    return _load_run(run, store or HISTORY_DIR).get('precision', 'float64')
+
+
+def as_of(when=None, run=None, store=None, columns=None):
+    """
+    The dataset exactly as produced by a previous run: `run` picks a run id,
+    otherwise the last run at or before `when` (UTC; default: the latest).
+    Chunks are memoised, so repeated and neighbouring queries mostly hit
+    memory, and the frame is assembled with one scatter into a preallocated
+    (dates x columns) block.
+    """
+    store = store or HISTORY_DIR
+    if run is None:
+        runs = list_runs(store)
+        if when is not None:
+            runs = runs[runs['created'] <= pd.Timestamp(when)]
+        if runs.empty:
+            raise LookupError(f"No dataset run recorded as of {when}")
+        run = runs['run'].iloc[-1]
+
+    manifest = _load_run(run, store)
+    names = list(manifest['columns']) if columns is None else [c for c in columns if c in manifest['columns']]
+    precision = manifest.get('precision', 'float64')
+    parts = [[_read_blob(k, store, precision) for k in manifest['columns'][col]] for col in names]
+    dates = [np.concatenate([d for d, _ in p]) if p else np.empty(0, np.int64) for p in parts]
+    values = [np.concatenate([v for _, v in p]) if p else np.empty(0) for p in parts]
+    index = np.unique(np.concatenate(dates)) if dates else np.empty(0, np.int64)
+
+    block = np.full((len(index), len(names)), np.nan)
+    for j, (d, v) in enumerate(zip(dates, values)):
+        block[np.searchsorted(index, d), j] = v
+    return pd.DataFrame(block, index=pd.DatetimeIndex(index.view('datetime64[ns]')), columns=names)
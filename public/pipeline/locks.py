@@ -0,0 +1,73 @@
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes stay atomic
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Longest wait for another process's lock (e.g. a slow download) before
+# giving up with TimeoutError
+LOCK_TIMEOUT = 300.0
+# Interval between attempts to take a busy lock
+POLL_SECONDS = 0.05
+
+
+@contextmanager
+def file_lock(path, shared=False, timeout=LOCK_TIMEOUT):
+    """
+    Advisory lock on `path` (held on '<path>.lock', so the data file itself
+    can be replaced while locked). Exclusive by default; `shared` locks only
+    exclude exclusive holders. Waits up to `timeout` seconds.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        mode = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            try:
+                fcntl.flock(fd, mode)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {path}")
+                if not waited:
+                    logger.debug(f"  > Waiting for lock on {os.path.basename(path)}...")
+                    waited = True
+                time.sleep(POLL_SECONDS)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """
+    Opens a temporary file next to `path` and renames it over `path` once
+    the block completes, so readers see either the old or the new file,
+    never a partial one. On error the temporary file is removed.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as fh:
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,212 @@
+import io
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Storage precision of published values:
+#   float64  full precision, for analytics
+#   float32  ~7 significant digits; text outputs carry the shortest decimal
+#            that reads back as the same float32, so every format agrees
+#   bp       int32 returns in basis points x 100 (1e-6) against the previously
+#            rebuilt level, plus each column's first level; the rebuild is
+#            bit-exact, and the error never exceeds half a step per point;
+#            text outputs carry the rebuilt levels at TEXT_DIGITS
+PRECISIONS = ('float64', 'float32', 'bp')
+# Set by `process.py --precision`
+STORAGE = 'float64'
+
+RETURN_SCALE = 1_000_000
+MISSING = np.iinfo(np.int32).min
+_MAX_CODE = np.iinfo(np.int32).max
+# Significant digits of 'bp' levels in text outputs (xlsx, CSV, JSON): the
+# rebuild is within half a step (5e-7) of the value, and 7 digits add at most
+# as much again, where full float64 text would carry ~17 digits of noise
+TEXT_DIGITS = 7
+
+
+def _check(precision):
+    precision = STORAGE if precision is None else precision
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown storage precision {precision!r} (expected one of {PRECISIONS})")
+    return precision
+
+
+def float32_values(values):
+    """float64 of the shortest decimal of each value's float32 (what text formats carry)."""
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64)
+
+
+def significant_values(values, digits):
+    """float64 of each value rounded to `digits` significant decimal digits."""
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = digits - 1 - np.floor(np.log10(np.abs(values)))
+    exponent = np.nan_to_num(exponent, nan=0.0, posinf=0.0, neginf=0.0)
+    # Dividing the rounded integer by an exact power of ten gives the float
+    # nearest the decimal, i.e. what parsing its text gives back
+    scale = 10.0 ** np.abs(exponent)
+    return np.where(exponent >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+
+
+class ReturnCodec:
+    """
+    Streaming 'bp' codec for a (rows x columns) block fed chunk by chunk.
+    Each code is the return from the previously *rebuilt* level, so rounding
+    errors don't accumulate; a column's first observation is its anchor
+    (code 0) and missing values are MISSING. The encoder rebuilds each level
+    as prev * (1 + code / RETURN_SCALE), so decoding is one cumprod of those
+    factors from the anchor and reproduces the encoder's levels bit for bit.
+    """
+
+    def __init__(self, columns, anchors=None):
+        self.prev = np.full(columns, np.nan)
+        self.anchors = np.full(columns, np.nan) if anchors is None else np.asarray(anchors, dtype='float64')
+
+    def _starts(self, ok):
+        """(rows, columns) of the first observation of each column not started in an earlier chunk."""
+        cols = np.flatnonzero(ok.any(axis=0) & np.isnan(self.prev))
+        return (ok[:, cols].argmax(axis=0) if cols.size else cols), cols
+
+    def encode(self, values):
+        values = np.asarray(values, dtype='float64')
+        ok = ~np.isnan(values)
+        rows, cols = self._starts(ok)
+        self.anchors[cols] = values[rows, cols]
+        cont = ok.copy()
+        cont[rows, cols] = False
+        # Each code is taken against the level rebuilt from the codes before
+        # it, so rows run in order (each one vectorized across the columns)
+        prev = np.where(np.isnan(self.prev), self.anchors, self.prev)
+        codes = np.empty(values.shape, dtype=np.int32)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for i, row in enumerate(values):
+                # NaN steps only fall on missing cells, which become MISSING below
+                codes[i] = np.clip(np.rint((row / prev - 1) * RETURN_SCALE), MISSING + 1, _MAX_CODE)
+                np.multiply(prev, 1 + codes[i] / RETURN_SCALE, out=prev, where=cont[i])
+        codes[~cont] = MISSING
+        codes[rows, cols] = 0
+        self.prev = prev
+        return codes
+
+    def decode(self, codes):
+        codes = np.asarray(codes, dtype=np.int32)
+        ok = codes != MISSING
+        factors = codes / RETURN_SCALE
+        factors += 1
+        factors[~ok] = 1.0
+        rows, cols = self._starts(ok)
+        factors[rows, cols] = self.anchors[cols]
+        levels = np.multiply.accumulate(np.vstack([np.where(np.isnan(self.prev), 1.0, self.prev), factors]), axis=0)
+        self.prev = np.where(np.isnan(self.prev) & ~ok.any(axis=0), np.nan, levels[-1])
+        return np.where(ok, levels[1:], np.nan)
+
+
+def quantizer(precision=None, columns=1):
+    """
+    Callable mapping consecutive (rows x columns) chunks to the float64
+    values a reader gets back at `precision` (state carries across chunks).
+    """
+    precision = _check(precision)
+    if precision == 'float64':
+        return lambda values: np.asarray(values, dtype='float64')
+    if precision == 'float32':
+        return float32_values
+    encoder, decoder = ReturnCodec(columns), ReturnCodec(columns)
+    decoder.anchors = encoder.anchors
+    return lambda values: decoder.decode(encoder.encode(values))
+
+
+def quantize(panel, precision=None):
+    """The panel with its values as stored at `precision` (idempotent)."""
+    precision = _check(precision)
+    if precision == 'float64':
+        return panel.astype('float64')
+    values = quantizer(precision, panel.shape[1])(panel.to_numpy(dtype='float64'))
+    return pd.DataFrame(values, index=panel.index, columns=panel.columns)
+
+
+def text_values(values, precision=None):
+    """Stored values as text outputs carry them: 'bp' levels at TEXT_DIGITS, others unchanged."""
+    if _check(precision) == 'bp':
+        return significant_values(values, TEXT_DIGITS)
+    return np.asarray(values, dtype='float64')
+
+
+def as_text(panel, precision=None):
+    """The stored panel with its values as text outputs carry them (see text_values)."""
+    return pd.DataFrame(text_values(panel.to_numpy(dtype='float64'), precision), index=panel.index,
+                        columns=panel.columns)
+
+
+def encode_block(values, precision=None):
+    """
+    Column-major little-endian bytes of a (rows x columns) block: float64,
+    float32, or for 'bp' the float64 anchors followed by the int32 codes.
+    """
+    precision = _check(precision)
+    values = np.asarray(values, dtype='float64')
+    values = values[:, None] if values.ndim == 1 else values
+    if precision == 'float64':
+        return np.asfortranarray(values, dtype='<f8').tobytes(order='F')
+    if precision == 'float32':
+        return np.asfortranarray(values, dtype='<f4').tobytes(order='F')
+    codec = ReturnCodec(values.shape[1])
+    codes = codec.encode(values)
+    return codec.anchors.astype('<f8').tobytes() + np.asfortranarray(codes, dtype='<i4').tobytes(order='F')
+
+
+def decode_block(raw, rows, columns, precision=None):
+    """Inverse of encode_block: the (rows x columns) float64 values."""
+    precision = _check(precision)
+    if precision == 'float64':
+        return np.frombuffer(raw, dtype='<f8').reshape((rows, columns), order='F').astype('float64')
+    if precision == 'float32':
+        return float32_values(np.frombuffer(raw, dtype='<f4').reshape((rows, columns), order='F'))
+    anchors = np.frombuffer(raw[:8 * columns], dtype='<f8')
+    codes = np.frombuffer(raw[8 * columns:], dtype='<i4').reshape((rows, columns), order='F')
+    return ReturnCodec(columns, anchors.copy()).decode(codes)
+
+
+def benchmark(panel, repeat=3):
+    """
+    Size, encode and load time of the panel's binary block and CSV text at
+    every precision, against the relative error it introduces (vs the
+    panel's values). Returns one row per precision.
+    """
+    values = panel.to_numpy(dtype='float64')
+    present = ~np.isnan(values)
+    rows = []
+    for precision in PRECISIONS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            stored = quantize(panel, precision)
+            raw = encode_block(stored.to_numpy(), precision)
+        encode_s = (time.perf_counter() - started) / repeat
+        started = time.perf_counter()
+        for _ in range(repeat):
+            loaded = decode_block(raw, *values.shape, precision)
+        load_s = (time.perf_counter() - started) / repeat
+        text = io.StringIO()
+        as_text(stored, precision).to_csv(text)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            error = np.abs(loaded[present] / values[present] - 1)
+        rows.append({
+            'precision': precision, 'bytes': len(raw), 'csv_bytes': len(text.getvalue()),
+            'encode_ms': encode_s * 1e3, 'load_ms': load_s * 1e3,
+            'max_rel_error': float(np.nanmax(error)) if error.size else 0.0,
+            'median_rel_error': float(np.nanmedian(error)) if error.size else 0.0,
+            'exact_rebuild': bool(np.array_equal(loaded, stored.to_numpy(), equal_nan=True)),
+        })
+    result = pd.DataFrame(rows).set_index('precision')
+    base = result.loc['float64']
+    for precision, r in result.iterrows():
+        logger.info(f"  {precision:>7}: {r['bytes'] / 1e3:8.1f} KB binary ({r['bytes'] / base['bytes']:.0%}), "
+                    f"{r['csv_bytes'] / 1e3:8.1f} KB CSV ({r['csv_bytes'] / base['csv_bytes']:.0%}), "
+                    f"load {r['load_ms']:.2f} ms, encode {r['encode_ms']:.1f} ms, "
+                    f"max error {r['max_rel_error']:.2e} (median {r['median_rel_error']:.2e}), "
+                    f"exact rebuild {r['exact_rebuild']}")
+    return result
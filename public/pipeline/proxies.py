@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import bars, locks
+
+logger = logging.getLogger(__name__)
+
+# Candidates need this many months in common with the target to be ranked
+MIN_OVERLAP = 36
+
+# Above this many candidate pairs the moment pass is split across worker processes
+PARALLEL_MIN_PAIRS = 5_000
+
+# Sufficient statistics per (target, candidate set), keyed by a digest of the data
+_MOMENTS = {}
+
+_MOMENT_FIELDS = ['n', 't', 'a', 'b', 'tt', 'aa', 'bb', 'ta', 'tb', 'ab']
+
+
+def _moments_path(key):
+    return os.path.join(bars.CACHE_DIR, "proxies", f"{key}.npy")
+
+
+def _digest(target, candidates):
+    h = hashlib.sha1()
+    h.update(target.to_numpy(dtype='float64').tobytes())
+    h.update(candidates.to_numpy(dtype='float64').tobytes())
+    h.update("|".join(map(str, candidates.columns)).encode())
+    h.update(candidates.index.asi8.tobytes())
+    return h.hexdigest()
+
+
+def candidate_pairs(n):
+    """Index pairs (i, j), i <= j, of n candidates; (i, i) is the candidate on its own."""
+    i, j = np.triu_indices(n)
+    return np.column_stack([i, j])
+
+
+def _pair_moments(args):
+    """Sums, squares and cross products of (target, a, b) over each pair's common months."""
+    t, R, pairs = args
+    a = R[:, pairs[:, 0]]
+    b = R[:, pairs[:, 1]]
+    m = ~np.isnan(t)[:, None] & ~np.isnan(a) & ~np.isnan(b)
+    t0 = np.where(m, t[:, None], 0.0)
+    a0 = np.where(m, a, 0.0)
+    b0 = np.where(m, b, 0.0)
+    return np.stack([
+        m.sum(axis=0), t0.sum(axis=0), a0.sum(axis=0), b0.sum(axis=0),
+        (t0 * t0).sum(axis=0), (a0 * a0).sum(axis=0), (b0 * b0).sum(axis=0),
+        (t0 * a0).sum(axis=0), (t0 * b0).sum(axis=0), (a0 * b0).sum(axis=0),
+    ], axis=1)
+
+
+def pair_moments(target, candidates, workers=None):
+    """
+    (pairs x 10) sufficient statistics of every candidate pair against the
+    target. Results are memoised in-process and stored under CACHE_DIR, so a
+    repeated search over unchanged data skips the pass entirely.
+    """
+    key = _digest(target, candidates)
+    if key in _MOMENTS:
+        return _MOMENTS[key]
+    path = _moments_path(key)
+    if os.path.exists(path):
+        _MOMENTS[key] = np.load(path)
+        return _MOMENTS[key]
+
+    t = target.to_numpy(dtype='float64')
+    R = candidates.to_numpy(dtype='float64')
+    pairs = candidate_pairs(R.shape[1])
+    if len(pairs) >= PARALLEL_MIN_PAIRS and (workers is None or workers > 1):
+        workers = workers or os.cpu_count() or 1
+        chunks = [c for c in np.array_split(np.arange(len(pairs)), workers) if len(c)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_pair_moments, [(t, R, pairs[c]) for c in chunks]))
+        moments = np.concatenate(parts)
+    else:
+        moments = _pair_moments((t, R, pairs))
+
+    with locks.atomic_write(path, 'wb') as fh:
+        np.save(fh, moments)
+    _MOMENTS[key] = moments
+    return moments
+
+
+def score_pairs(moments):
+    """
+    Fits and scores every blend w * a + (1 - w) * b from its moments.
+
+    The weight is the least-squares one, i.e. the minimiser of the tracking
+    error Var(t - b - w (a - b)), clipped to [0, 1]. Also returns the
+    correlation and beta of the target on the blend and the annualised
+    return gap (proxy - target).
+    """
+    M = dict(zip(_MOMENT_FIELDS, moments.T))
+    n = M['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        def cov(sx, sy, sxy):
+            return sxy - sx * sy / n
+
+        c_uu = cov(M['t'] - M['b'], M['t'] - M['b'], M['tt'] - 2 * M['tb'] + M['bb'])
+        c_vv = cov(M['a'] - M['b'], M['a'] - M['b'], M['aa'] - 2 * M['ab'] + M['bb'])
+        c_uv = cov(M['t'] - M['b'], M['a'] - M['b'], M['ta'] - M['tb'] - M['ab'] + M['bb'])
+        w = np.where(c_vv > 1e-14, np.clip(c_uv / c_vv, 0.0, 1.0), 1.0)
+
+        te = np.sqrt(np.maximum(c_uu - 2 * w * c_uv + w * w * c_vv, 0) / (n - 1)) * np.sqrt(12)
+        c_tt = cov(M['t'], M['t'], M['tt'])
+        c_tb = cov(M['t'], M['b'], M['tb'])
+        c_bb = cov(M['b'], M['b'], M['bb'])
+        c_tv = cov(M['t'], M['a'] - M['b'], M['ta'] - M['tb'])
+        c_bv = cov(M['b'], M['a'] - M['b'], M['ab'] - M['bb'])
+        c_tp = c_tb + w * c_tv
+        c_pp = c_bb + 2 * w * c_bv + w * w * c_vv
+        corr = c_tp / np.sqrt(c_tt * c_pp)
+        beta = c_tp / c_pp
+        gap = (w * (M['a'] - M['b']) + M['b'] - M['t']) / n * 12
+
+    return pd.DataFrame({
+        'weight': w, 'months': n.astype('int64'), 'tracking_error': te,
+        'correlation': corr, 'beta': beta, 'return_gap': gap,
+    })
+
+
+def search_proxies(target, candidates, min_overlap=MIN_OVERLAP, workers=None):
+    """
+    Ranks every candidate proxy and every two-candidate blend for `target`.
+
+    `target` (Series) and `candidates` (DataFrame) are month-end returns.
+    Returns one row per candidate / blend with its least-squares weight,
+    first month of history ('start') and fit statistics, sorted by tracking
+    error; combinations with fewer than `min_overlap` common months are dropped.
+    """
+    candidates = candidates.drop(columns=[target.name], errors='ignore')
+    index = candidates.index.union(target.dropna().index)
+    target = target.reindex(index)
+    candidates = candidates.reindex(index)
+
+    scores = score_pairs(pair_moments(target, candidates, workers))
+    pairs = candidate_pairs(candidates.shape[1])
+    names = np.asarray(candidates.columns, dtype=object)
+    starts = np.array([candidates[c].first_valid_index() or pd.NaT for c in candidates.columns],
+                      dtype='datetime64[ns]')
+
+    single = pairs[:, 0] == pairs[:, 1]
+    w = scores['weight'].to_numpy()
+    # Blends whose fitted weight is a corner are just the single candidate again
+    keep = single | ((w > 1e-6) & (w < 1 - 1e-6))
+    scores['proxy'] = np.where(single, names[pairs[:, 0]], names[pairs[:, 0]] + ' + ' + names[pairs[:, 1]])
+    scores['a'] = names[pairs[:, 0]]
+    scores['b'] = np.where(single, None, names[pairs[:, 1]])
+    scores['start'] = np.maximum(starts[pairs[:, 0]], starts[pairs[:, 1]])
+    scores = scores[keep & (scores['months'] >= min_overlap)]
+
+    cols = ['proxy', 'a', 'b', 'weight', 'start', 'months', 'tracking_error', 'correlation', 'beta', 'return_gap']
+    return scores[cols].sort_values('tracking_error', ignore_index=True)
+
+
+def blend_returns(candidates, row):
+    """Monthly returns of a ranked proxy row (single candidate or blend)."""
+    if row['b'] is None or pd.isna(row['b']):
+        return candidates[row['a']]
+    return row['weight'] * candidates[row['a']] + (1 - row['weight']) * candidates[row['b']]
+
+
+def propose_chain(results, target_name, target_start):
+    """
+    Backfill chain for a target from its ranked candidates: walking back from
+    the target's first month, each step takes the best-scoring proxy whose
+    history starts earlier than the current link. Returns a date_splice-style
+    schedule [(proxy, from_date), ..., (target_name, target_start)].
+    """
+    chain = [(target_name, pd.Timestamp(target_start))]
+    current = pd.Timestamp(target_start)
+    while True:
+        earlier = results[results['start'] < current]
+        if earlier.empty:
+            break
+        best = earlier.iloc[0]
+        chain.insert(0, (best['proxy'], pd.Timestamp(best['start'])))
+        current = pd.Timestamp(best['start'])
+    return chain
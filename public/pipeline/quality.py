@@ -0,0 +1,357 @@
+import logging
+import os
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from pipeline import resample, splice
+
+logger = logging.getLogger(__name__)
+
+# What to do with each kind of issue:
+#   flag:       report only
+#   repair:     points are re-filled log-linearly from their neighbours (a
+#               jump is removed by rescaling the history before it, as for
+#               an unadjusted split)
+#   quarantine: the whole series is withheld from the output
+# Checks:
+#   nonpositive  zero or negative print
+#   spike        |robust z| outlier undone by the next return (bad tick)
+#   jump         |robust z| outlier that is not undone (crash, split artifact)
+#   stale        run of identical prices
+#   gap          run of missing points on the expected calendar
+#   splice_jump  level jump at a proxy/actual splice (flag only)
+POLICY = {
+    "nonpositive": "repair",
+    "spike": "repair",
+    "jump": "flag",
+    "stale": "flag",
+    "gap": "flag",
+    "splice_jump": "flag",
+}
+ACTIONS = ("flag", "repair", "quarantine")
+
+# z-score beyond which a log return is an outlier. Returns are scaled by
+# their RMS over the previous SCALE_WINDOW points (so calm and turbulent
+# regimes of one series are judged separately), but at least SCALE_FLOOR
+# times the series' overall volatility (so decades of pegged prices don't
+# turn every later move into an outlier); the first points of a series are
+# scaled by its overall volatility
+Z_THRESHOLD = {"daily": 10.0, "monthly": 8.0}
+SCALE_WINDOW = {"daily": 63, "monthly": 36}
+SCALE_FLOOR = 0.25
+# A spike's next return undoes at least 1 - SPIKE_NET of it
+SPIKE_NET = 0.25
+# Identical prices in a row, and missing calendar points in a row, that are reported
+STALE_RUN = {"daily": 5, "monthly": 3}
+GAP_MIN = {"daily": 5, "monthly": 1}
+# Returns needed in the window before z-scores are computed
+MIN_OBS = 20
+# Level jump at a splice date that is reported
+SPLICE_JUMP = 0.05
+
+# Issues found during the run, one frame per validate() call (see write_report)
+_ISSUES = []
+
+
+def clear_issues(source=None):
+    """Forgets the issues found by a previous run (or only those of one `source`)."""
+    _ISSUES[:] = [f for f in _ISSUES if source is not None and f['source'].iat[0] != source]
+
+
+@contextmanager
+def recording_issues():
+    """Yields a list that receives the issue frames found within the block (e.g. by a builder's daily bars)."""
+    before = {id(f) for f in _ISSUES}
+    frames = []
+    try:
+        yield frames
+    finally:
+        frames.extend(f for f in _ISSUES if id(f) not in before)
+
+
+def add_issues(frames):
+    """Re-registers issue frames captured by recording_issues (e.g. from a checkpoint)."""
+    _ISSUES.extend(frames)
+
+
+def _calendar(levels, freq):
+    """Levels on the expected calendar: business days, or month ends (last value per month)."""
+    if freq == "monthly":
+        return resample.last(levels)
+    levels = levels.sort_index()
+    index = pd.DatetimeIndex(levels.index).normalize()
+    levels = levels.groupby(index).last()
+    return levels.reindex(pd.bdate_range(index.min(), index.max()).union(levels.index))
+
+
+# The helpers below work on (series x dates) arrays, so every accumulation
+# runs along contiguous memory.
+
+def _last_true(mask):
+    """Position of the last True at or before each date (-1 if none), per series."""
+    pos = np.arange(mask.shape[1], dtype=np.int32)
+    return np.maximum.accumulate(np.where(mask, pos, np.int32(-1)), axis=1)
+
+
+def _next_true(mask):
+    """Position of the first True at or after each date (n if none), per series."""
+    n = mask.shape[1]
+    pos = np.arange(n, dtype=np.int32)
+    return np.minimum.accumulate(np.where(mask, pos, np.int32(n))[:, ::-1], axis=1)[:, ::-1]
+
+
+def _run_lengths(mask):
+    """Length of the run of True ending at each date (0 where False), per series."""
+    pos = np.arange(1, mask.shape[1] + 1, dtype=np.int32)
+    return np.where(mask, pos - np.maximum.accumulate(np.where(mask, np.int32(0), pos), axis=1), 0)
+
+
+def _run_ends(mask):
+    end = mask.copy()
+    end[:, :-1] &= ~mask[:, 1:]
+    return end
+
+
+def _flagged_runs(mask, flagged_ends):
+    """Dates of the runs of `mask` whose last date is in `flagged_ends`."""
+    if not flagged_ends.any():
+        return flagged_ends
+    next_end = _next_true(_run_ends(mask))
+    padded = np.hstack([flagged_ends, np.zeros((len(mask), 1), bool)])
+    return mask & np.take_along_axis(padded, next_end, axis=1)
+
+
+def _take(values, pos, fill):
+    """values[i, pos[i, j]] with `fill` where pos is out of range (-1 or n)."""
+    n = values.shape[1]
+    out = np.take_along_axis(values, np.clip(pos, 0, n - 1), axis=1)
+    return np.where((pos >= 0) & (pos < n), out, fill)
+
+
+def _trailing_scale(r, window):
+    """RMS of the returns in the `window` points before each point (NaN with fewer than MIN_OBS)."""
+    known = ~np.isnan(r)
+    sq = np.cumsum(np.where(known, r * r, 0.0), axis=1)
+    count = np.cumsum(known, axis=1, dtype=np.int32)
+    # Sums over [i - window, i - 1] from the running sums up to i - 1
+    pad = np.zeros((len(r), window + 1))
+    sq = np.hstack([pad, sq])
+    count = np.hstack([pad.astype(np.int32), count])
+    n = r.shape[1]
+    total = sq[:, window:window + n] - sq[:, :n]
+    obs = count[:, window:window + n] - count[:, :n]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(obs >= min(MIN_OBS, window), np.sqrt(np.maximum(total, 0) / obs), np.nan)
+
+
+def _scan(cal, freq):
+    """{check: masks and values} of every check on calendar-aligned levels, as (series x dates) arrays."""
+    x = np.ascontiguousarray(cal.to_numpy(dtype='float64').T)
+    n = x.shape[1]
+    pos = np.arange(n, dtype=np.int32)
+    valid = ~np.isnan(x)
+    last_valid = _last_true(valid)
+    inside = (last_valid >= 0) & (_next_true(valid) < n)
+
+    nonpositive = valid & (x <= 0)
+    good = valid & ~nonpositive
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logx = np.log(np.where(good, x, np.nan))
+
+    # Log return of each good point against the previous good point
+    last_good = _last_true(good)
+    prev = np.hstack([np.full((len(x), 1), -1, np.int32), last_good[:, :-1]])
+    r = np.where(good, logx - _take(logx, prev, np.nan), np.nan)
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # series without returns
+        overall = np.nanstd(r, axis=1)[:, None]
+        trailing = _trailing_scale(r, SCALE_WINDOW[freq])
+        # Until the window has MIN_OBS returns the overall volatility is used
+        scale = np.where(np.isnan(trailing), overall, np.fmax(trailing, SCALE_FLOOR * overall))
+        scale = np.where(scale > 0, scale, np.nan)
+        z = r / scale
+        outlier = np.abs(z) > Z_THRESHOLD[freq]
+
+    # A spike is an outlier followed (at the next good point) by a return as
+    # large on the same scale, in the opposite direction, bringing the level
+    # (nearly) back; outliers are rare, so only they are looked at
+    oi, oj = np.nonzero(outlier)
+    after = np.minimum(oj + 1, n - 1)
+    nj = np.where(oj + 1 < n, _next_true(good)[oi, after], n) if len(oi) else oj
+    has_next = nj < n
+    nj = np.minimum(nj, n - 1)
+    r_o, r_n = r[oi, oj], r[oi, nj]
+    is_spike = has_next & (np.abs(r_n) > Z_THRESHOLD[freq] * scale[oi, oj]) & \
+        (np.sign(r_o) != np.sign(r_n)) & (np.abs(r_o + r_n) < SPIKE_NET * np.abs(r_o))
+    spike = np.zeros_like(outlier)
+    spike[oi[is_spike], oj[is_spike]] = True
+    # The return back from a spike is not a jump of its own
+    jump = outlier & ~spike
+    jump[oi[is_spike], nj[is_spike]] = False
+
+    # Stale: the carried price equals the previous one; a run counts the
+    # observations in it (holidays inside a run don't break it)
+    carried = _take(x, last_valid, np.nan)
+    same = inside & np.hstack([np.zeros((len(x), 1), bool), carried[:, 1:] == carried[:, :-1]])
+    same_len = _run_lengths(same)
+    counted = np.cumsum(valid, axis=1, dtype=np.int32)
+    obs = counted - np.take_along_axis(counted, pos - same_len, axis=1) + 1
+    stale_end = _run_ends(same) & (obs >= STALE_RUN[freq])
+
+    missing = inside & ~valid
+    gap_len = _run_lengths(missing)
+    gap_end = _run_ends(missing) & (gap_len >= GAP_MIN[freq])
+
+    # (reported dates, value per date, run length per date, affected dates)
+    return {
+        'nonpositive': (nonpositive, x, None, nonpositive),
+        'spike': (spike, z, None, spike),
+        'jump': (jump, r, None, jump),
+        'stale': (stale_end, obs, same_len, _flagged_runs(same, stale_end) & valid),
+        'gap': (gap_end, gap_len, gap_len, _flagged_runs(missing, gap_end)),
+    }
+
+
+def _issue_frame(cal, masks):
+    frames = []
+    for check, (mask, values, lengths, _) in masks.items():
+        cols, rows = np.nonzero(mask)
+        if not len(rows):
+            continue
+        # A stale run starts at the price that is then repeated
+        first = rows - lengths[cols, rows] + (check == 'gap') if lengths is not None else rows
+        frames.append(pd.DataFrame({
+            'series': cal.columns[cols],
+            'check': check,
+            'start': cal.index[first],
+            'end': cal.index[rows],
+            'value': values[cols, rows].astype('float64'),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['series', 'check', 'start', 'end', 'value'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def scan(levels, freq="daily"):
+    """
+    Issues of every series in a level frame (dates x series), found in one
+    vectorized pass over the whole matrix: one row per issue with the check,
+    the first and last affected date and a value (price, z-score of a
+    spike, log return of a jump, prices in a stale run, missing points).
+    """
+    cal = _calendar(levels, freq)
+    return _issue_frame(cal, _scan(cal, freq))
+
+
+def _repair(cal, masks, policy):
+    """Repaired calendar-aligned levels and the gap points that were filled in."""
+    x = np.ascontiguousarray(cal.to_numpy(dtype='float64').T)
+    # Repaired points are dropped and re-filled log-linearly; for a stale run
+    # its first price is kept and the repeats are re-filled up to the next change
+    blank = np.zeros(x.shape, bool)
+    for check in ('nonpositive', 'spike', 'stale'):
+        if policy[check] == 'repair':
+            blank |= masks[check][3]
+    gaps = masks['gap'][3] if policy['gap'] == 'repair' else np.zeros(x.shape, bool)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logx = np.log(np.where(blank | (x <= 0), np.nan, x))
+    if policy['jump'] == 'repair':
+        # Shift the log history before each jump by the jump, so it returns 0
+        shift = np.where(masks['jump'][3], masks['jump'][1], 0.0)
+        shift = np.cumsum(shift[:, ::-1], axis=1)[:, ::-1] - shift
+        logx = logx + shift
+        blank |= shift != 0
+
+    known = ~np.isnan(logx)
+    prev, nxt = _last_true(known), _next_true(known)
+    lo, hi = _take(logx, prev, np.nan), _take(logx, nxt, np.nan)
+    pos = np.arange(x.shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        interpolated = lo + (hi - lo) * (pos - prev) / (nxt - prev)
+    # Untouched points keep their exact value
+    fixed = np.where(blank | gaps, np.exp(np.where(np.isnan(logx), interpolated, logx)), x)
+    repaired = pd.DataFrame(fixed.T, index=cal.index, columns=cal.columns)
+    return repaired, pd.DataFrame(gaps.T, index=cal.index, columns=cal.columns)
+
+
+def validate(levels, freq="daily", policy=None, source=""):
+    """
+    Scans a level frame and applies `policy` (default POLICY) to what it
+    finds. Returns the cleaned frame on the original dates (plus any gap
+    rows that were filled in), without quarantined series. Issues are kept
+    for write_report.
+    """
+    if levels.empty:
+        return levels
+    policy = {**POLICY, **(policy or {})}
+    unknown = {a for a in policy.values() if a not in ACTIONS}
+    if unknown:
+        raise ValueError(f"Unknown quality actions {sorted(unknown)}; expected one of {ACTIONS}")
+    cal = _calendar(levels, freq)
+    masks = _scan(cal, freq)
+    issues = _issue_frame(cal, masks)
+    if issues.empty:
+        return levels
+
+    issues['action'] = issues['check'].map(policy)
+    issues.insert(0, 'source', source)
+    _ISSUES.append(issues)
+    counts = issues.groupby(['check', 'action']).size()
+    logger.info(f"  Quality ({source}): " +
+                ", ".join(f"{n} {check} ({action})" for (check, action), n in counts.items()))
+
+    out = levels
+    if (issues['action'] == 'repair').any():
+        repaired, gaps = _repair(cal, masks, policy)
+        index = pd.DatetimeIndex(levels.index)
+        keys = resample.month_end(index) if freq == "monthly" else index.normalize()
+        out = pd.DataFrame(repaired.reindex(keys).to_numpy(), index=levels.index, columns=levels.columns)
+        # Only points that had a value, or filled gaps, get one
+        keep = levels.notna().to_numpy() | gaps.reindex(keys).fillna(False).to_numpy(dtype=bool)
+        out = out.where(keep)
+        extra = gaps.any(axis=1) & ~gaps.index.isin(keys)
+        if extra.any():
+            out = pd.concat([out, repaired[extra].where(gaps[extra])]).sort_index()
+    quarantined = sorted(set(issues.loc[issues['action'] == 'quarantine', 'series']))
+    if quarantined:
+        logger.warning(f"  Quality ({source}): quarantined {', '.join(map(str, quarantined))}")
+        out = out.drop(columns=quarantined)
+    return out
+
+
+def scan_splices(pairs=None):
+    """Splice-point jumps larger than SPLICE_JUMP in the registered proxy/actual pairs."""
+    report = splice.splice_report(pairs)
+    if report.empty:
+        return pd.DataFrame()
+    big = report[report['level_jump'].abs() > SPLICE_JUMP]
+    return pd.DataFrame({
+        'source': 'splice',
+        'series': big['asset'] + ': ' + big['proxy'] + ' -> ' + big['actual'],
+        'check': 'splice_jump',
+        'start': pd.to_datetime(big['splice_date']),
+        'end': pd.to_datetime(big['splice_date']),
+        'value': big['level_jump'],
+        'action': POLICY['splice_jump'],
+    })
+
+
+def write_report(output_file, pairs=None):
+    """Writes every issue found this run (plus splice jumps) as CSV and logs a summary."""
+    frames = [f for f in _ISSUES + [scan_splices(pairs)] if not f.empty]
+    if not frames:
+        logger.info("Data-quality scan found no issues.")
+        return pd.DataFrame()
+    # Restored and rebuilt builders sharing a ticker may both report its issues
+    report = pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    report['value'] = report['value'].round(6)
+    report.to_csv(output_file, index=False)
+    counts = report['check'].value_counts()
+    logger.info(f"Data-quality report: {', '.join(f'{n} {c}' for c, n in counts.items())} -> {output_file}")
+    return report
@@ -0,0 +1,115 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class RaggedPanel:
+    """
+    A (dates x columns) panel without the NaN padding before each column's
+    first and after its last observation: every column is a start row on the
+    shared calendar plus a dense run of values (gaps inside it stay NaN).
+    The runs sit back to back in one float64 buffer, column after column,
+    with `offsets[j]:offsets[j + 1]` delimiting column j, so engines can
+    scan all observations in one pass and segment by column.
+    """
+
+    def __init__(self, index, columns, starts, offsets, values):
+        self.index = pd.DatetimeIndex(index)
+        self.columns = pd.Index(columns)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.values = np.asarray(values, dtype='float64')
+
+    @classmethod
+    def from_panel(cls, panel):
+        values = panel.to_numpy(dtype='float64')
+        n_rows = values.shape[0]
+        valid = ~np.isnan(values)
+        has = valid.any(axis=0)
+        first = np.where(has, np.argmax(valid, axis=0), 0)
+        last = np.where(has, n_rows - 1 - np.argmax(valid[::-1], axis=0), -1)
+        rows = np.arange(n_rows)[:, None]
+        keep = (rows >= first) & (rows <= last)
+        lengths = np.maximum(last - first + 1, 0)
+        offsets = np.r_[0, np.cumsum(lengths)]
+        return cls(panel.index, panel.columns, first, offsets, values.T[keep.T])
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def shape(self):
+        return len(self.index), len(self.columns)
+
+    def column_ids(self):
+        """Column of every buffered value."""
+        return np.repeat(np.arange(len(self.columns)), self.lengths)
+
+    def rows(self):
+        """Calendar row of every buffered value."""
+        return np.arange(len(self.values)) - np.repeat(self.offsets[:-1] - self.starts, self.lengths)
+
+    def segment(self, j):
+        """Dense values of column j (a view into the buffer)."""
+        return self.values[self.offsets[j]:self.offsets[j + 1]]
+
+    def column(self, name):
+        """One column as a Series over its own dates only."""
+        j = self.columns.get_loc(name)
+        start = self.starts[j]
+        return pd.Series(self.segment(j), index=self.index[start:start + self.lengths[j]], name=name)
+
+    def positions(self):
+        """Position of every buffered value within its column's run."""
+        return np.arange(len(self.values)) - np.repeat(self.offsets[:-1], self.lengths)
+
+    def accumulate(self, ufunc, buffer=None):
+        """
+        Running `ufunc` (e.g. np.fmax) of a buffer-shaped array (default: the
+        values), restarting at every column. A segmented scan over the buffer:
+        log2(longest run) shifted passes, each combining a value with the one
+        `step` earlier in the same column.
+        """
+        out = np.array(self.values if buffer is None else buffer)
+        positions = self.positions()
+        longest = int(self.lengths.max()) if len(self.lengths) else 0
+        step = 1
+        while step < longest:
+            tail = out[step:]
+            tail[:] = np.where(positions[step:] >= step, ufunc(tail, out[:-step]), tail)
+            step *= 2
+        return out
+
+    def with_values(self, buffer):
+        """The same layout holding another buffer-shaped array (e.g. values derived from these)."""
+        return RaggedPanel(self.index, self.columns, self.starts, self.offsets, buffer)
+
+    def scatter(self, buffer):
+        """A buffer-shaped array (values or anything derived from them) expanded to (dates x columns)."""
+        out = np.full(self.shape, np.nan)
+        out[self.rows(), self.column_ids()] = buffer
+        return out
+
+    def to_panel(self):
+        return pd.DataFrame(self.scatter(self.values), index=self.index, columns=self.columns)
+
+    def padding(self):
+        """Share of the rectangular cells the layout doesn't store."""
+        cells = self.shape[0] * self.shape[1]
+        return 1 - len(self.values) / cells if cells else 0.0
+
+
+def read_json(path):
+    """A RaggedPanel from the ragged JSON layout written by writers.write_ragged."""
+    with open(path) as fh:
+        data = json.load(fh)
+    columns = data['columns']
+    lengths = [len(c['values']) for c in columns]
+    values = np.array([v for c in columns for v in c['values']], dtype='float64')  # null -> NaN
+    return RaggedPanel(pd.to_datetime(data['dates']), [c['name'] for c in columns],
+                       [c['start'] for c in columns], np.r_[0, np.cumsum(lengths)], values)
@@ -0,0 +1,167 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Calendar bucketing shared by every builder. A source calendar (the sorted
+# dates of a series or frame) is mapped once to its buckets -- month ends
+# ('ME') or business days ('B') -- and the bucket boundaries are kept, so
+# every series on the same calendar (a Yahoo batch, the FRED daily series,
+# the MSCI workbooks) is reduced with one reduceat per frame instead of a
+# pandas resample per series.
+FREQS = ('ME', 'B')
+# Calendars kept in memory (the pipeline sees a few dozen distinct ones)
+MAX_CALENDARS = 256
+
+_CALENDARS = {}
+
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def month_end(index):
+    """Month-end label of every date (midnight, like MonthEnd(0) on a normalized index)."""
+    months = pd.DatetimeIndex(index).to_numpy(dtype='datetime64[M]')
+    return pd.DatetimeIndex((months + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')).as_unit('ns')
+
+
+def business_day(index):
+    """Business-day label of every date: weekend dates roll back to Friday."""
+    days = pd.DatetimeIndex(index).as_unit('ns').asi8 // _NS_PER_DAY
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+    days = days - np.clip(weekday - 4, 0, None)
+    return pd.DatetimeIndex(days.astype('datetime64[D]')).as_unit('ns')
+
+
+def _labels(index, freq):
+    if freq == 'ME':
+        return month_end(index)
+    if freq == 'B':
+        return business_day(index)
+    raise ValueError(f"Unsupported bucket frequency {freq!r} (expected one of {FREQS})")
+
+
+def _full_range(labels, freq):
+    if len(labels) == 0:
+        return labels
+    if freq == 'ME':
+        return pd.date_range(labels[0], labels[-1], freq='ME', unit='ns')
+    return pd.bdate_range(labels[0], labels[-1], unit='ns')
+
+
+def calendar(index, freq='ME'):
+    """
+    Buckets of a sorted DatetimeIndex: (labels, starts, full) with the label
+    of every non-empty bucket, the position where each bucket starts (for
+    reduceat) and the complete label range from the first to the last bucket.
+    Cached per (calendar, freq).
+    """
+    index = pd.DatetimeIndex(index)
+    stamps = index.as_unit('ns').asi8
+    key = (freq, len(stamps), stamps.tobytes())
+    cached = _CALENDARS.get(key)
+    if cached is None:
+        if len(stamps) > 1 and np.any(np.diff(stamps) < 0):
+            raise ValueError("resample needs a sorted index")
+        labels = _labels(index, freq).asi8
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(labels) else np.array([], dtype=np.intp)
+        present = pd.DatetimeIndex(labels[starts].astype('datetime64[ns]')).as_unit(index.unit)
+        cached = (present, starts, _full_range(present, freq).as_unit(index.unit))
+        if len(_CALENDARS) >= MAX_CALENDARS:
+            _CALENDARS.pop(next(iter(_CALENDARS)))
+        _CALENDARS[key] = cached
+    return cached
+
+
+def _values(data):
+    x = data.to_numpy(dtype='float64')
+    return x[:, None] if x.ndim == 1 else x
+
+
+def _wrap(data, values, index, fill):
+    index = index.rename(data.index.name)
+    if isinstance(data, pd.Series):
+        out = pd.Series(values[:, 0], index=index, name=data.name)
+    else:
+        out = pd.DataFrame(values, index=index, columns=data.columns)
+    return out.ffill() if fill else out
+
+
+def _expand(values, present, full):
+    """Places the per-bucket rows of the present buckets onto the full label range (NaN elsewhere)."""
+    if len(full) == len(present):
+        return values
+    out = np.full((len(full), values.shape[1]), np.nan)
+    out[full.get_indexer(present)] = values
+    return out
+
+
+def _prepare(data):
+    """Drops undated rows (NaT, like resample does) and sorts by date."""
+    if data.index.hasnans:
+        data = data[data.index.notna()]
+    return data if data.index.is_monotonic_increasing else data.sort_index()
+
+
+def _pick(data, freq, fill, full, reduce, empty, edge):
+    data = _prepare(data)
+    present, starts, full_index = calendar(data.index, freq)
+    x = _values(data)
+    if len(x) == 0:
+        return _wrap(data, x, present, fill)
+    # Most buckets have a value on their edge row; only columns with a gap
+    # there need the position search
+    values = x[edge(starts, len(x))]
+    cols = np.flatnonzero(np.isnan(values).any(axis=0))
+    if len(cols):
+        sub = x[:, cols]
+        positions = np.where(~np.isnan(sub), np.arange(len(x))[:, None], empty)
+        chosen = reduce(positions, starts, axis=0)
+        found = chosen != empty
+        values[:, cols] = np.where(found, np.take_along_axis(sub, np.where(found, chosen, 0), axis=0), np.nan)
+    if full:
+        return _wrap(data, _expand(values, present, full_index), full_index, fill)
+    return _wrap(data, values, present, fill)
+
+
+def _last_rows(starts, n):
+    return np.r_[starts[1:], n] - 1
+
+
+def _first_rows(starts, n):
+    return starts
+
+
+def last(data, freq='ME', fill=False, full=True):
+    """
+    Last valid value of each column in every bucket, like
+    data.resample(freq).last(): with `full` every bucket between the first
+    and last date gets a row (NaN where empty), otherwise only buckets with
+    data do. `fill` forward-fills the result.
+    """
+    return _pick(data, freq, fill, full, np.maximum.reduceat, -1, _last_rows)
+
+
+def first(data, freq='ME', fill=False, full=True):
+    """First valid value of each column in every bucket (see last)."""
+    return _pick(data, freq, fill, full, np.minimum.reduceat, np.iinfo(np.intp).max, _first_rows)
+
+
+def compound(returns, freq='ME', full=False):
+    """
+    Compounded return of each column over every bucket; buckets where a
+    column has no valid return are NaN. By default only buckets with data
+    get a row, like grouping the returns by their bucket label.
+    """
+    returns = _prepare(returns)
+    present, starts, full_index = calendar(returns.index, freq)
+    x = _values(returns)
+    if len(x) == 0:
+        return _wrap(returns, x, present, False)
+    valid = ~np.isnan(x)
+    growth = np.multiply.reduceat(np.where(valid, 1 + x, 1.0), starts, axis=0) - 1
+    values = np.where(np.add.reduceat(valid, starts, axis=0) > 0, growth, np.nan)
+    if full:
+        return _wrap(returns, _expand(values, present, full_index), full_index, False)
+    return _wrap(returns, values, present, False)
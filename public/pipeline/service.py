@@ -0,0 +1,372 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+from pipeline import delta, history
+from pipeline import precision as storage
+
+logger = logging.getLogger(__name__)
+
+# Encoded responses kept in memory (least recently used are dropped first)
+MAX_CACHED = 512
+# Seconds between two checks of the history store for a newer run
+RELOAD_SECONDS = 1.0
+# Binary responses: magic, then a little-endian uint32 header length
+BINARY_MAGIC = b'ATS1'
+# Largest request body read (and discarded) to keep a connection alive
+MAX_BODY = 1 << 20
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 503: 'Service Unavailable'}
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _month(value):
+    """'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' as the published 'YYYY-MM-01'."""
+    try:
+        return pd.Timestamp(value).strftime('%Y-%m-01')
+    except (ValueError, TypeError):
+        raise QueryError(f"Invalid date: {value}")
+
+
+def _split_name(column):
+    """'MSCI World (USD)' -> ('msci world', 'usd')."""
+    if column.endswith(')') and ' (' in column:
+        base, ccy = column[:-1].rsplit(' (', 1)
+        return base.lower(), ccy.lower()
+    return column.lower(), ''
+
+
+class Store:
+    """
+    The latest dataset run from the history store, in published form
+    ('YYYY-MM-01' dates), with per-column versions. Reloaded when a new run
+    is recorded.
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or history.HISTORY_DIR
+        self.run = None
+        self.version = None
+        self.precision = 'float64'
+        self.checked = 0.0
+        self.stamp = None
+        self.reload()
+
+    def _runs_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.store_dir, "runs.jsonl"))
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self):
+        self.stamp = self._runs_stamp()
+        if self.stamp is None:
+            self.frame = pd.DataFrame()
+            self.versions = {}
+            return
+        runs = history.list_runs(self.store_dir)
+        run = runs['run'].iloc[-1]
+        if run == self.run:
+            return
+        frame = delta.to_published(history.as_of(run=run, store=self.store_dir))
+        self.frame = frame
+        self.dates = frame.index.to_numpy()
+        self.values = frame.to_numpy(dtype='float64')
+        self.versions = delta.column_versions(frame)
+        self.positions = {c: j for j, c in enumerate(frame.columns)}
+        self.names = [_split_name(c) for c in frame.columns]
+        self.precision = history.run_precision(run, self.store_dir)
+        self.run = run
+        self.version = delta.dataset_version(self.versions)
+        logger.info(f"Serving run {run}: {frame.shape[0]}x{frame.shape[1]}, version {self.version}")
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self.checked >= RELOAD_SECONDS:
+            self.checked = now
+            if self._runs_stamp() != self.stamp:
+                self.reload()
+
+    def resolve(self, assets=None, ccy=None):
+        """
+        Columns matching `assets` (comma separated; full column names or names
+        without the currency suffix, case-insensitive; default: all) in the
+        currencies `ccy` (comma separated; default: any), in dataset order.
+        """
+        wanted = [a.strip().lower() for a in assets.split(',') if a.strip()] if assets else None
+        currencies = {c.strip().lower() for c in ccy.split(',') if c.strip()} if ccy else None
+        columns = []
+        matched = set()
+        for col, (base, cur) in zip(self.frame.columns, self.names):
+            if currencies is not None and cur not in currencies:
+                continue
+            if wanted is not None:
+                hit = col.lower() if col.lower() in wanted else base if base in wanted else None
+                if hit is None:
+                    continue
+                matched.add(hit)
+            columns.append(col)
+        if wanted is not None:
+            unknown = [a for a in wanted if a not in matched]
+            if unknown:
+                raise QueryError(f"Unknown assets: {', '.join(unknown)}")
+        return columns
+
+    def slice_version(self, columns, start, end, fmt):
+        """Version of one response: the selected column versions plus the range and format."""
+        h = hashlib.sha1(f"{start}|{end}|{fmt}".encode())
+        for c in columns:
+            h.update(f"|{c}={self.versions[c]}".encode())
+        return h.hexdigest()[:20]
+
+    def etag(self, columns, start, end, fmt):
+        """Strong validator: the quoted slice_version, which the body carries as its version."""
+        return f'"{self.slice_version(columns, start, end, fmt)}"'
+
+    def slice(self, columns, start, end):
+        """(dates, values) of `columns` between start and end, rows without any value dropped."""
+        lo = np.searchsorted(self.dates, start, 'left') if start else 0
+        hi = np.searchsorted(self.dates, end, 'right') if end else len(self.dates)
+        values = self.values[lo:hi, [self.positions[c] for c in columns]]
+        keep = ~np.isnan(values).all(axis=1) if columns else np.zeros(len(values), bool)
+        return self.dates[lo:hi][keep], values[keep]
+
+
+def encode_json(version, columns, dates, values, precision='float64'):
+    """
+    Columnar JSON: {"version", "dates": [...], "columns": {name: [values]}},
+    NaN -> null; `version` is the slice's (Store.slice_version), so the bytes
+    only change with the selected columns. Values are already at the run's
+    precision, and written as text outputs carry them (precision.text_values).
+    """
+    values = storage.text_values(values, precision)
+    body = {
+        'version': version,
+        'dates': list(dates),
+        'columns': {c: [None if np.isnan(v) else float(v) for v in values[:, j]]
+                    for j, c in enumerate(columns)},
+    }
+    return json.dumps(body, separators=(',', ':')).encode()
+
+
+def encode_binary(version, columns, dates, values, precision='float64'):
+    """
+    BINARY_MAGIC, uint32 header length, JSON header {version (the slice's),
+    columns, rows, precision}, int32 YYYYMM dates, then the values column by
+    column at the run's storage precision (see precision.encode_block:
+    float64 or float32 with NaN if missing, or 'bp' anchors and int32
+    codes); everything little-endian.
+    """
+    header = json.dumps({'version': version, 'columns': columns, 'rows': len(dates),
+                         'precision': precision}).encode()
+    months = np.array([int(d[:4]) * 100 + int(d[5:7]) for d in dates], dtype='<i4')
+    return (BINARY_MAGIC + struct.pack('<I', len(header)) + header
+            + months.tobytes() + storage.encode_block(values, precision))
+
+
+ENCODERS = {
+    'json': ('application/json', encode_json),
+    'bin': ('application/octet-stream', encode_binary),
+}
+
+
+class QueryService:
+    """Answers /series, /columns and /health requests from a Store, with an LRU of encoded responses."""
+
+    def __init__(self, store, max_cached=MAX_CACHED):
+        self.store = store
+        self.cache = OrderedDict()
+        self.max_cached = max_cached
+        self.stats = {'requests': 0, 'hits': 0, 'not_modified': 0, 'errors': 0}
+
+    def _lookup(self, key):
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            self.stats['hits'] += 1
+        return entry
+
+    def _remember(self, key, entry):
+        self.cache[key] = entry
+        if len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+
+    def _series(self, query, accept):
+        params = {k: v[-1] for k, v in parse_qs(query).items()}
+        fmt = params.get('format') or ('bin' if 'application/octet-stream' in accept else 'json')
+        if fmt not in ENCODERS:
+            raise QueryError(f"Unknown format: {fmt}")
+        start = _month(params['from']) if params.get('from') else None
+        end = _month(params['to']) if params.get('to') else None
+        columns = self.store.resolve(params.get('assets'), params.get('ccy'))
+        etag = self.store.etag(columns, start, end, fmt)
+        return fmt, columns, start, end, etag
+
+    def handle(self, method, target, headers):
+        """(status, content type, body, etag) for one request."""
+        self.stats['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return 405, 'application/json', b'{"error":"method not allowed"}', None
+        self.store.maybe_reload()
+        path, _, query = target.partition('?')
+        if path == '/health':
+            return 200, 'application/json', json.dumps({'ok': True, 'version': self.store.version}).encode(), None
+        if self.store.run is None:
+            return 503, 'application/json', b'{"error":"no dataset run recorded yet"}', None
+        if path == '/columns':
+            return 200, 'application/json', json.dumps(
+                {'version': self.store.version, 'run': self.store.run, 'columns': self.store.versions}).encode(), None
+        if path != '/series':
+            return 404, 'application/json', b'{"error":"not found"}', None
+
+        accept = headers.get('accept', '')
+        key = (self.store.version, query, 'bin' if 'application/octet-stream' in accept else '')
+        entry = self._lookup(key)
+        if entry is None:
+            try:
+                fmt, columns, start, end, etag = self._series(query, accept)
+            except QueryError as e:
+                self.stats['errors'] += 1
+                return 400, 'application/json', json.dumps({'error': str(e)}).encode(), None
+            content_type, encode = ENCODERS[fmt]
+            dates, values = self.store.slice(columns, start, end)
+            body = encode(etag.strip('"'), columns, dates, values, self.store.precision)
+            entry = (content_type, body, etag)
+            self._remember(key, entry)
+        content_type, body, etag = entry
+        if etag in headers.get('if-none-match', ''):
+            self.stats['not_modified'] += 1
+            return 304, content_type, b'', etag
+        return 200, content_type, body, etag
+
+
+def _response(status, content_type, body, etag, head, keep_alive):
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if etag:
+        lines += [f"ETag: {etag}", "Cache-Control: no-cache"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + (b'' if head or status == 304 else body)
+
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                raw = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = raw.decode('latin-1').split('\r\n')
+            try:
+                method, target, version = lines[0].split(' ', 2)
+            except ValueError:
+                break
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+            # Nothing takes a body; skip it so the next request starts where
+            # expected, or close the connection if it can't be skipped
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                length = -1
+            if 'transfer-encoding' in headers or not 0 <= length <= MAX_BODY:
+                keep_alive = False
+            elif length:
+                try:
+                    await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+            status, content_type, body, etag = service.handle(method, target, headers)
+            writer.write(_response(status, content_type, body, etag, method == 'HEAD', keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve_async(service, host='127.0.0.1', port=8766):
+    server = await asyncio.start_server(
+        lambda r, w: _serve_connection(service, r, w), host, port, reuse_address=True)
+    logger.info(f"Query service on http://{host}:{port}/series")
+    async with server:
+        await server.serve_forever()
+
+
+def serve(store_dir=None, host='127.0.0.1', port=8766, max_cached=MAX_CACHED):
+    """Serves the latest recorded run until interrupted."""
+    service = QueryService(Store(store_dir), max_cached)
+    try:
+        asyncio.run(serve_async(service, host, port))
+    except KeyboardInterrupt:
+        logger.info(f"Query service stopped: {service.stats}")
+
+
+async def _client(host, port, paths, count, latencies, etag_ratio):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for i in range(count):
+            path = paths[i % len(paths)]
+            extra = f"If-None-Match: {etags[path]}\r\n" if path in etags and (i % 100) < etag_ratio * 100 else ""
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode())
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            length = 0
+            for line in head.split('\r\n'):
+                name, _, value = line.partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+                elif name.lower() == 'etag':
+                    etags[path] = value.strip()
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def load_test(paths, requests=10000, concurrency=32, host='127.0.0.1', port=8766, etag_ratio=0.0):
+    """
+    Local load generator: `concurrency` keep-alive connections issue
+    `requests` GETs in total, cycling through `paths`; a share `etag_ratio`
+    of repeat requests are conditional. Returns throughput and latency
+    percentiles.
+    """
+    latencies = []
+    per_client = max(requests // concurrency, 1)
+
+    async def run():
+        await asyncio.gather(*[_client(host, port, paths, per_client, latencies, etag_ratio)
+                               for _ in range(concurrency)])
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1e3
+    result = {
+        'requests': len(latencies), 'seconds': elapsed, 'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99)),
+    }
+    logger.info(f"{result['requests']} requests in {elapsed:.2f}s: {result['rps']:,.0f} req/s, "
+                f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    return result
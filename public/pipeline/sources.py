@@ -0,0 +1,173 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pandas as pd
+import pandas_datareader.data as web
+import requests
+import yfinance as yf
+
+from pipeline import bars, freshness, fx, resample, throttle
+
+logger = logging.getLogger(__name__)
+
+# Data access shared by process.py and the backtest scripts in code/. Every
+# download goes through the freshness catalog and the local store under
+# bars.CACHE_DIR (and the per-process memos), so a series fetched by one of
+# them is reused by all the others until it is due again.
+
+# Daily adjusted closes of several tickers from the append-only bar store
+get_daily_closes = bars.get_daily_closes
+
+# Threads refreshing due FRED series in the background while the builders run
+# (Yahoo calls stay one at a time, see pipeline/throttle.py)
+PREFETCH_WORKERS = 4
+
+_WORKBOOKS = {}
+
+
+def get_fred_series_raw(series_id, name):
+    """
+    FRED series as a one-column frame. Refetched only once a new observation
+    is due (pipeline/freshness.py); otherwise served from the local copy.
+    """
+    series = freshness.cached_series(f"fred:{series_id}", lambda: download_fred_series(series_id), "fred")
+    return series.rename(name).to_frame() if not series.empty else pd.DataFrame()
+
+
+def prefetch_due(workers=PREFETCH_WORKERS):
+    """
+    Starts refreshing every due FRED series of the freshness catalog in
+    background threads and returns the executor (use it as a context manager
+    to wait for them). A builder asking for one of them meanwhile waits on
+    the series' lock and reads what was fetched.
+    """
+    catalog = freshness.load_catalog()
+    due = [k.split(':', 1)[1] for k in sorted(catalog) if k.startswith('fred:') and freshness.is_due(k)]
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+    if due:
+        logger.info(f"Prefetching {len(due)} due FRED series...")
+    for series_id in due:
+        pool.submit(get_fred_series_raw, series_id, series_id)
+    return pool
+
+
+def download_fred_series(series_id):
+    """
+    Fetch series from St. Louis Fed (FRED). Tries pandas_datareader first, then direct CSV.
+    Returns None while FRED's circuit is open (pipeline/throttle.py).
+    """
+    # Method 1: pandas_datareader
+    try:
+        # Defaults to last 30 years if not specified
+        df = throttle.call('fred', lambda: web.DataReader(series_id, 'fred', start="1990-01-01"),
+                           failed=lambda df: df.empty)
+        if not df.empty:
+            return df.iloc[:, 0]
+    except throttle.CircuitOpen as e:
+        logger.warning(f"Skipping {series_id}: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"pandas_datareader failed for {series_id}: {e}. Retrying with direct CSV download.")
+
+    # Method 2: Direct CSV
+    url = f"https://fred.stlouisfed.org/graph/fredgraph.csv?id={series_id}"
+    try:
+        response = throttle.call('fred', lambda: requests.get(url, timeout=60), retries=0,
+                                 failed=lambda r: r.status_code >= 500 or r.status_code == 429)
+        if response.status_code == 200:
+            df = pd.read_csv(StringIO(response.text), index_col=0, parse_dates=True)
+            df = df.apply(pd.to_numeric, errors='coerce').dropna()
+            return df.iloc[:, 0]
+        else:
+            logger.error(f"Failed to fetch {series_id} via CSV. Status: {response.status_code}")
+    except throttle.CircuitOpen as e:
+        logger.warning(f"Skipping {series_id}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching {series_id} via CSV: {e}")
+
+    return pd.Series(dtype='float64')
+
+
+def get_yf_closes(ticker, **kwargs):
+    """
+    Close prices of one yf.download(ticker, **kwargs) call, refetched at most
+    once per trading day (pipeline/freshness.py); otherwise (or when the
+    download fails, or Yahoo's circuit is open) served from the local copy.
+    """
+    key = f"yf:{ticker}:" + ",".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+
+    def fetch():
+        logger.info(f"Downloading {ticker} ({', '.join(f'{k}={v}' for k, v in kwargs.items())})...")
+        try:
+            # yfinance reports failures as an empty frame
+            data = throttle.call('yahoo', lambda: yf.download(ticker, progress=False, **kwargs),
+                                 failed=lambda df: df is None or df.empty)
+            closes = bars.extract_closes(data, [ticker])
+            return closes.iloc[:, 0].dropna() if not closes.empty else pd.Series(dtype='float64')
+        except throttle.CircuitOpen as e:
+            logger.warning(f"Skipping {ticker}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error downloading {ticker}: {e}")
+            return pd.Series(dtype='float64')
+
+    # Monthly bars are labelled by month start but keep moving all month
+    daily = kwargs.get('interval', '1d') == '1d'
+    return freshness.cached_series(key, fetch, "yahoo", cadence="daily", track_obs=daily)
+
+
+def get_monthly_yf_data(ticker, start_date="1970-01-01"):
+    """Downloads and formats yfinance monthly data."""
+    try:
+        series = get_yf_closes(ticker, start=start_date, interval="1mo", auto_adjust=True)
+        if series.empty:
+            return pd.Series(dtype='float64')
+        series = resample.last(series, fill=True)  # Ensure no internal gaps after resampling
+        return series.dropna()  # Remove leading/trailing NaNs
+    except Exception as e:
+        logger.error(f"Error downloading {ticker}: {e}")
+        return pd.Series(dtype='float64')
+
+
+def usd_per_unit(index, ccy='eur'):
+    """USD per unit of `ccy` from the shared month-end FX matrix (pipeline/fx.py), aligned onto `index`."""
+    matrix = fx.get_fx_matrix(['usd', ccy], get_fred_series_raw, get_monthly_yf_data)
+    return fx.align_fx(matrix, pd.DatetimeIndex(index))[ccy]
+
+
+def to_currency(levels, ccy='eur', base=None):
+    """USD levels expressed in `ccy`, rebased to `base` at the first value if given."""
+    out = levels / usd_per_unit(levels.index, ccy)
+    first = out.first_valid_index()
+    if base is not None and first is not None:
+        out = out / out.loc[first] * base
+    return out
+
+
+def read_msci_workbook(file_path):
+    """
+    One MSCI workbook as a one-column frame (Date index). Parsed workbooks are
+    kept in memory, keyed by modification time, so a long-running process only
+    re-parses files that changed.
+    """
+    stat = os.stat(file_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _WORKBOOKS.get(file_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    logger.info(f"Reading {os.path.basename(file_path)}...")
+    df = pd.read_excel(file_path, skiprows=5)
+    df = df.iloc[:, [0, 1]]
+    df.columns = ['Date', 'Value']
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date', 'Value'])
+    asset_name = os.path.splitext(os.path.basename(file_path))[0]
+    df = df.set_index('Date')
+    df.columns = [asset_name]
+    freshness.track_local(f"msci:{asset_name}", df[asset_name], "msci")
+    _WORKBOOKS[file_path] = (key, df)
+    return df
@@ -0,0 +1,306 @@
+import base64
+import json
+import logging
+import os
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from pipeline import resample
+
+logger = logging.getLogger(__name__)
+
+# Proxy/actual pairs registered by the builders during a run (see splice_report)
+_PAIRS = []
+
+# Source kinds in the lineage legend: id 0 is always 'none' (no value);
+# 'proxy' is backfilled or synthetic history, 'live' the asset's own
+# fetched series, 'manual' series read from local files (MSCI workbooks, gold)
+LINEAGE_KINDS = ('none', 'proxy', 'live', 'manual')
+
+
+def daily_returns(closes):
+    """Simple returns per column; gaps inside a series are carried, not zeroed."""
+    return closes.ffill(limit_area='inside').pct_change(fill_method=None)
+
+
+def date_splice(returns, schedule):
+    """
+    Chains return columns by date. `schedule` is [(column, switch_date), ...]
+    in chronological order; the first entry's switch_date is ignored. Missing
+    columns or days contribute a zero return.
+    """
+    idx = returns.index
+    cols = [returns[c] if c in returns.columns else pd.Series(0.0, index=idx) for c, _ in schedule]
+    conditions = []
+    for i, (_, switch) in enumerate(schedule):
+        lower = idx >= pd.Timestamp(switch) if i > 0 else np.ones(len(idx), dtype=bool)
+        nxt = schedule[i + 1][1] if i + 1 < len(schedule) else None
+        upper = idx < pd.Timestamp(nxt) if nxt is not None else np.ones(len(idx), dtype=bool)
+        conditions.append(lower & upper)
+    spliced = np.select(conditions, cols, default=0)
+    return pd.Series(spliced, index=idx).fillna(0)
+
+
+def priority_splice(returns, priority):
+    """
+    Overlays return columns by priority (lowest first): wherever a
+    higher-priority column has a return, it replaces the ones below it.
+    """
+    present = [c for c in priority if c in returns.columns]
+    if not present:
+        return pd.Series(dtype='float64')
+    combined = returns[present[0]].copy()
+    for c in present[1:]:
+        combined = returns[c].combine_first(combined)
+    return combined.fillna(0)
+
+
+def monthly_returns(daily):
+    """
+    Compounds daily returns into month-end returns in one reduction over
+    the shared calendar. Months without a single return (e.g. before
+    inception) stay NaN.
+    """
+    return resample.compound(daily)
+
+
+def to_index(returns, base=100.0):
+    """Level index from periodic returns, starting from `base`."""
+    return base * (1 + returns).cumprod()
+
+
+def level_splice(proxy, actual, splice_date=None):
+    """
+    Proxy levels before `splice_date` (default: the actual's first
+    observation), scaled to meet the actual level on that date, followed by
+    the actual levels. The proxy is returned as-is if it has no level on
+    the splice date.
+    """
+    if splice_date is None:
+        splice_date = actual.first_valid_index()
+    if splice_date is None or splice_date not in proxy.index:
+        return proxy
+    scale = actual.loc[splice_date] / proxy.loc[splice_date]
+    return pd.concat([proxy[proxy.index < splice_date] * scale, actual.loc[splice_date:]])
+
+
+def clear_pairs():
+    """Forgets the pairs registered by a previous run."""
+    _PAIRS.clear()
+
+
+def record_pair(asset, proxy, actual, splice_date, proxy_name='proxy', actual_name='actual'):
+    """
+    Registers a proxy/actual pair of level series for the splice-quality
+    report. Levels are bucketed to month ends; only their returns are used.
+    Registering the same pair again (a rebuilt asset) replaces it.
+    """
+    def monthly(levels):
+        levels = levels.dropna()
+        if levels.empty:
+            return levels
+        return resample.last(levels, full=False)
+
+    if splice_date is None:
+        return
+    _PAIRS[:] = [p for p in _PAIRS if (p['asset'], p['proxy'], p['actual']) != (asset, proxy_name, actual_name)]
+    _PAIRS.append({
+        'asset': asset,
+        'proxy': proxy_name,
+        'actual': actual_name,
+        'splice_date': pd.Timestamp(splice_date) + pd.offsets.MonthEnd(0),
+        'proxy_levels': monthly(proxy),
+        'actual_levels': monthly(actual),
+    })
+
+
+@contextmanager
+def recording_pairs():
+    """Yields a list that receives the pairs registered within the block."""
+    before = {id(p) for p in _PAIRS}
+    pairs = []
+    try:
+        yield pairs
+    finally:
+        pairs.extend(p for p in _PAIRS if id(p) not in before)
+
+
+def add_pairs(pairs):
+    """Re-registers pairs captured by recording_pairs (e.g. from a checkpoint)."""
+    for pair in pairs:
+        key = (pair['asset'], pair['proxy'], pair['actual'])
+        _PAIRS[:] = [p for p in _PAIRS if (p['asset'], p['proxy'], p['actual']) != key]
+        _PAIRS.append(pair)
+
+
+def inceptions(pairs=None):
+    """
+    {asset: month its live series starts}: the splice date of each asset's
+    last registered pair, where the lineage turns 'live'.
+    """
+    pairs = _PAIRS if pairs is None else pairs
+    return {p['asset']: p['splice_date'] for p in pairs}
+
+
+def record_chain(asset, daily, schedule):
+    """
+    Registers every consecutive leg of a daily-return splice. `schedule` is
+    [(column, switch_date), ...] as for date_splice / priority_splice; a None
+    switch date means "from the column's first observation".
+    """
+    monthly = to_index(monthly_returns(daily))
+    for (prev_col, _), (col, switch) in zip(schedule[:-1], schedule[1:]):
+        if prev_col not in monthly.columns or col not in monthly.columns:
+            continue
+        if switch is None:
+            switch = daily[col].first_valid_index()
+        record_pair(asset, monthly[prev_col], monthly[col], switch, prev_col, col)
+
+
+def splice_report(pairs=None):
+    """
+    Splice-quality metrics for every registered pair in one vectorized pass
+    over a (months x pairs) return matrix, using the months both series
+    cover: annualised tracking error, correlation, beta of actual on proxy,
+    annualised return gap (proxy - actual) and the level jump at the splice,
+    i.e. (1 + actual) / (1 + proxy) - 1 in the first common month on or
+    after the splice date.
+    """
+    pairs = _PAIRS if pairs is None else pairs
+    if not pairs:
+        return pd.DataFrame()
+
+    proxy = pd.concat([p['proxy_levels'].pct_change(fill_method=None) for p in pairs], axis=1,
+                      keys=range(len(pairs)), sort=True)
+    actual = pd.concat([p['actual_levels'].pct_change(fill_method=None) for p in pairs], axis=1,
+                       keys=range(len(pairs)), sort=True)
+    index = proxy.index.union(actual.index)
+    P = proxy.reindex(index).to_numpy(dtype='float64')
+    A = actual.reindex(index).to_numpy(dtype='float64')
+
+    both = ~np.isnan(P) & ~np.isnan(A)
+    n = both.sum(axis=0)
+    P = np.where(both, P, np.nan)
+    A = np.where(both, A, np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_p = np.nanmean(P, axis=0)
+        mean_a = np.nanmean(A, axis=0)
+        dp = P - mean_p
+        da = A - mean_a
+        cov = np.nansum(dp * da, axis=0) / (n - 1)
+        var_p = np.nansum(dp * dp, axis=0) / (n - 1)
+        var_a = np.nansum(da * da, axis=0) / (n - 1)
+        diff = P - A
+        te = np.sqrt(np.nansum((diff - np.nanmean(diff, axis=0)) ** 2, axis=0) / (n - 1)) * np.sqrt(12)
+        corr = cov / np.sqrt(var_p * var_a)
+        beta = cov / var_p
+        gap = (mean_p - mean_a) * 12
+
+    splice_dates = np.array([p['splice_date'] for p in pairs], dtype='datetime64[ns]')
+    after = both & (index.values[:, None] >= splice_dates[None, :])
+    rows = after.argmax(axis=0)
+    cols = np.arange(len(pairs))
+    jump = np.where(after.any(axis=0), (1 + A[rows, cols]) / (1 + P[rows, cols]) - 1, np.nan)
+
+    small = n < 2
+    report = pd.DataFrame({
+        'asset': [p['asset'] for p in pairs],
+        'proxy': [p['proxy'] for p in pairs],
+        'actual': [p['actual'] for p in pairs],
+        'splice_date': [p['splice_date'].strftime('%Y-%m-%d') for p in pairs],
+        'months': n,
+        'tracking_error': np.where(small, np.nan, te),
+        'correlation': np.where(small, np.nan, corr),
+        'beta': np.where(small, np.nan, beta),
+        'return_gap': np.where(small, np.nan, gap),
+        'level_jump': jump,
+    })
+    return report
+
+
+def write_splice_report(output_file, pairs=None):
+    """Writes the splice-quality report as CSV and logs the worst fits."""
+    report = splice_report(pairs)
+    if report.empty:
+        logger.info("No spliced assets registered; splice report skipped.")
+        return report
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    report.round(6).to_csv(output_file, index=False)
+    for row in report.sort_values('tracking_error', ascending=False).head(3).itertuples():
+        logger.info(f"  Splice {row.asset} ({row.proxy} -> {row.actual}): TE {row.tracking_error:.2%}, "
+                    f"corr {row.correlation:.2f}, jump {row.level_jump:+.2%} over {row.months} months")
+    logger.info(f"Splice report for {len(report)} proxy/actual pairs -> {output_file}")
+    return report
+
+
+def lineage(panel, assets, kinds):
+    """
+    Per-cell source ids of a month-end panel: an int8 (months x columns)
+    frame plus its legend [(name, kind), ...] indexed by id. `assets` maps
+    each column to the asset whose pairs describe it (e.g. 'dbmf' for
+    'dbmf_eur'), `kinds` maps it to the kind of its own series. Months
+    before a pair's splice date come from its proxy, later ones from its
+    actual; chained pairs are applied in the order they were registered.
+    """
+    legend = [('no data', 'none')]
+    ids = {}
+
+    def source_id(name, kind):
+        if (name, kind) not in ids:
+            if len(legend) > np.iinfo(np.int8).max:
+                raise ValueError(f"More than {np.iinfo(np.int8).max} lineage sources")
+            ids[(name, kind)] = len(legend)
+            legend.append((name, kind))
+        return ids[(name, kind)]
+
+    by_asset = {}
+    for p in _PAIRS:
+        by_asset.setdefault(p['asset'], []).append(p)
+
+    dates = panel.index.to_numpy(dtype='datetime64[ns]')
+    sources = {}
+    out = np.zeros(panel.shape, dtype=np.int8)
+    for j, col in enumerate(panel.columns):
+        asset = assets[col]
+        key = (asset, kinds[col])
+        if key not in sources:
+            pairs = by_asset.get(asset)
+            if not pairs:
+                sources[key] = np.full(len(dates), source_id(asset, kinds[col]), dtype=np.int8)
+            else:
+                row = np.full(len(dates), source_id(pairs[0]['proxy'], 'proxy'), dtype=np.int8)
+                for p in pairs:
+                    kind = 'live' if p is pairs[-1] else 'proxy'
+                    row[dates >= np.datetime64(p['splice_date'], 'ns')] = source_id(p['actual'], kind)
+                sources[key] = row
+        out[:, j] = np.where(panel[col].notna().to_numpy(), sources[key], 0)
+    return pd.DataFrame(out, index=panel.index, columns=panel.columns), legend
+
+
+def write_lineage(ids, legend, output_file):
+    """
+    Writes the lineage matrix next to the main dataset: the int8 ids in
+    row-major (months x assets) order as base64, so a client can load them
+    into an Int8Array and mask e.g. proxy history in one pass. Dates use the
+    month keys of alphatrace_data.json (YYYY-MM-01).
+    """
+    values = np.ascontiguousarray(ids.to_numpy(dtype=np.int8))
+    table = {
+        'assets': list(ids.columns),
+        'dates': list(ids.index.strftime('%Y-%m-01')),
+        'legend': [{'id': i, 'name': name, 'kind': kind} for i, (name, kind) in enumerate(legend)],
+        'dtype': 'int8',
+        'ids': base64.b64encode(values.tobytes()).decode('ascii'),
+    }
+    with open(output_file, 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+    counts = np.bincount(values.ravel(), minlength=len(legend))
+    proxy = sum(int(counts[i]) for i, (_, kind) in enumerate(legend) if kind == 'proxy')
+    logger.info(f"Lineage: {len(legend) - 1} sources, {proxy} of {int(counts[1:].sum())} values "
+                f"from proxies -> {output_file}")
+    return table
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Per upstream host: starting / lowest / highest request rate (per second),
+# bucket size, calls in flight at once, and the latency (seconds) above which
+# a response counts as a sign of overload. Yahoo gets one call at a time:
+# yf.download keeps module-global state and isn't safe to run concurrently.
+HOSTS = {
+    "yahoo": {"rate": 2.0, "min_rate": 0.2, "max_rate": 8.0, "burst": 3, "concurrency": 1, "slow": 8.0},
+    "fred": {"rate": 4.0, "min_rate": 0.5, "max_rate": 16.0, "burst": 4, "concurrency": 4, "slow": 8.0},
+}
+DEFAULT_HOST = {"rate": 2.0, "min_rate": 0.2, "max_rate": 8.0, "burst": 2, "concurrency": 2, "slow": 8.0}
+
+# AIMD: every good response adds RATE_STEP req/s, a failure or slow response
+# multiplies the rate by BACKOFF_FACTOR
+RATE_STEP = 0.25
+BACKOFF_FACTOR = 0.5
+# Attempts after the first failed one (each waits for the slowed-down bucket)
+RETRIES = 2
+# Consecutive failures that open a host's circuit, and how long it stays
+# open (doubling on every failed trial call, up to MAX_COOLDOWN)
+FAILURE_THRESHOLD = 5
+COOLDOWN = 60.0
+MAX_COOLDOWN = 900.0
+
+_HOSTS = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class Host:
+    """Token bucket with AIMD rate control and a circuit breaker for one upstream host."""
+
+    def __init__(self, name, rate, min_rate, max_rate, burst, concurrency, slow):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.slow = slow
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.open_until = None
+        self.cooldown = COOLDOWN
+        self.trial = False
+        self.stats = {'calls': 0, 'failures': 0, 'slow': 0, 'rejected': 0, 'trips': 0, 'waited': 0.0}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def acquire(self):
+        """
+        Waits for a token; raises CircuitOpen while the breaker is open. Once
+        its cooldown is over, one caller at a time gets through as the trial
+        call (whose record() closes or reopens the circuit).
+        """
+        trial, granted = False, False
+        try:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    if self.open_until is not None and not trial:
+                        if now < self.open_until or self.trial:
+                            self.stats['rejected'] += 1
+                            raise CircuitOpen(f"{self.name} circuit open for another "
+                                              f"{max(self.open_until - now, 0):.0f}s")
+                        # Half-open: let one trial call through
+                        self.trial = trial = True
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        granted = True
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self.stats['waited'] += wait
+                time.sleep(wait)
+        finally:
+            # A trial caller that never got its token (interrupted while
+            # waiting) hands the trial on to the next caller
+            if trial and not granted:
+                with self.lock:
+                    self.trial = False
+
+    def record(self, ok, latency):
+        with self.lock:
+            self.stats['calls'] += 1
+            slow = latency > self.slow
+            if ok:
+                self.failures = 0
+                if self.open_until is not None:
+                    logger.info(f"  > {self.name}: circuit closed again")
+                self.open_until, self.trial, self.cooldown = None, False, COOLDOWN
+            else:
+                self.stats['failures'] += 1
+                self.failures += 1
+            if ok and not slow:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+            else:
+                self.stats['slow'] += int(ok and slow)
+                self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+                self.tokens = min(self.tokens, 0.0)
+            if not ok and (self.trial or self.failures >= FAILURE_THRESHOLD):
+                if self.trial:
+                    self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+                self.open_until = time.monotonic() + self.cooldown
+                self.trial = False
+                self.stats['trips'] += 1
+                logger.warning(f"  > {self.name}: {self.failures} failures in a row, pausing requests "
+                               f"for {self.cooldown:.0f}s (cached data is used meanwhile)")
+
+
+def host(name):
+    with _REGISTRY_LOCK:
+        if name not in _HOSTS:
+            _HOSTS[name] = Host(name, **HOSTS.get(name, DEFAULT_HOST))
+        return _HOSTS[name]
+
+
+def call(name, fn, failed=None, retries=RETRIES):
+    """
+    Runs fn() against host `name` within its rate and concurrency limits.
+    A raised exception, or a result for which failed(result) is true (e.g.
+    the empty frame yfinance returns instead of raising), is a failure: the
+    rate is cut and the call retried up to `retries` times; the last failure
+    is raised / returned. Raises CircuitOpen without calling fn while the
+    host's breaker is open.
+    """
+    h = host(name)
+    for attempt in range(retries + 1):
+        h.acquire()
+        started = time.perf_counter()
+        with h.slots:
+            try:
+                result = fn()
+                error = None
+            except Exception as e:
+                result, error = None, e
+        bad = error is not None or (failed is not None and failed(result))
+        h.record(not bad, time.perf_counter() - started)
+        if not bad:
+            return result
+        if attempt == retries or h.open_until is not None:
+            if error is not None:
+                raise error
+            return result
+        logger.warning(f"  > {name}: request failed ({error or 'empty response'}), retrying "
+                       f"at {h.rate:.2f} req/s...")
+
+
+def report():
+    """Logs per-host request counts, failures, breaker trips and the rate reached."""
+    for name, h in sorted(_HOSTS.items()):
+        s = h.stats
+        logger.info(f"  {name}: {s['calls']} calls, {s['failures']} failed, {s['slow']} slow, "
+                    f"{s['trips']} circuit trips, {s['rejected']} skipped while open, "
+                    f"{s['waited']:.1f}s throttled, rate now {h.rate:.2f} req/s")
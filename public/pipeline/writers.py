@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from pipeline import precision as storage
+from pipeline import ragged
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Rows converted and written per step; bounds the writers' working memory
+CHUNK_ROWS = 10_000
+
+# Same look as the pandas header row (bold, thin border, centered)
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def iter_chunks(panel, chunk_rows=CHUNK_ROWS, columns=None):
+    """Yields consecutive row slices of the panel (restricted to `columns`)."""
+    for start in range(0, len(panel), chunk_rows):
+        chunk = panel.iloc[start:start + chunk_rows]
+        yield chunk if columns is None else chunk[columns]
+
+
+def _date_strings(index, date_format):
+    return np.asarray(pd.DatetimeIndex(index).strftime(date_format), dtype=object)
+
+
+def _report(fmt, path, rows, cols, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    size = os.path.getsize(path)
+    stats = {
+        'format': fmt, 'path': path, 'rows': rows, 'columns': cols, 'bytes': size,
+        'seconds': elapsed, 'rows_per_s': rows / elapsed, 'mb_per_s': size / elapsed / 1e6,
+    }
+    logger.info(f"  Wrote {fmt} {os.path.basename(path)}: {rows}x{cols}, {size / 1e6:.2f} MB "
+                f"in {elapsed:.2f}s ({stats['rows_per_s']:,.0f} rows/s, {stats['mb_per_s']:.1f} MB/s)")
+    return stats
+
+
+def _quantizer(precision, columns, quantized):
+    """
+    Chunk quantizer to the values text outputs carry at `precision`
+    (precision.text_values); skips the encoding when they are already stored ones.
+    """
+    quantize = storage.quantizer('float64' if quantized else precision, columns)
+    return lambda values: storage.text_values(quantize(values), precision)
+
+
+def write_xlsx(panel, output_file, sheets=None, date_format='%Y-%m-%d', chunk_rows=CHUNK_ROWS, precision=None,
+               quantized=False):
+    """
+    Writes the panel to one workbook, one sheet per {sheet_name: columns}
+    entry of `sheets` (default: a single 'Data' sheet), in xlsxwriter's
+    constant_memory mode: rows are flushed to disk as they are written, so
+    the writer itself holds one chunk of converted rows on top of the panel
+    (which the caller still holds in memory). Each sheet gets a 'Date'
+    column with the index formatted as text, a bold header and frozen
+    panes; NaN cells are left empty. Values are written at the storage
+    `precision` (default: precision.STORAGE), 'bp' levels at its text digits;
+    pass `quantized` when the panel already holds the stored values
+    (precision.quantize), so they aren't re-encoded.
+    """
+    started = time.perf_counter()
+    workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    header = workbook.add_format(HEADER_FORMAT)
+    sheets = {'Data': list(panel.columns)} if sheets is None else sheets
+    for name, columns in sheets.items():
+        ws = workbook.add_worksheet(name)
+        ws.write_row(0, 0, ['Date'] + [str(c) for c in columns], header)
+        ws.freeze_panes(1, 1)
+        r = 1
+        quantize = _quantizer(precision, len(columns), quantized)
+        for chunk in iter_chunks(panel, chunk_rows, columns):
+            dates = _date_strings(chunk.index, date_format)
+            values = quantize(chunk.to_numpy(dtype='float64'))
+            # Rows of [date, value or None]; None leaves the cell empty
+            rows = np.empty((len(chunk), len(columns) + 1), dtype=object)
+            rows[:, 0] = dates
+            rows[:, 1:] = values
+            rows[:, 1:][np.isnan(values)] = None
+            for row in rows.tolist():
+                ws.write_row(r, 0, row)
+                r += 1
+    workbook.close()
+    return _report('xlsx', output_file, len(panel), sum(len(c) + 1 for c in sheets.values()), started)
+
+
+def write_csv(panel, output_file, columns=None, date_format='%Y-%m-%d', chunk_rows=CHUNK_ROWS, precision=None,
+              quantized=False):
+    """Streams the panel to CSV one chunk at a time (Date column first), at the storage `precision`."""
+    started = time.perf_counter()
+    columns = list(panel.columns) if columns is None else columns
+    quantize = _quantizer(precision, len(columns), quantized)
+    with open(output_file, 'w', newline='') as fh:
+        for i, chunk in enumerate(iter_chunks(panel, chunk_rows, columns)):
+            chunk = pd.DataFrame(quantize(chunk.to_numpy(dtype='float64')), columns=chunk.columns,
+                                 index=pd.Index(_date_strings(chunk.index, date_format), name='Date'))
+            chunk.to_csv(fh, header=(i == 0))
+    return _report('csv', output_file, len(panel), len(columns) + 1, started)
+
+
+def write_parquet(panel, output_file, columns=None, chunk_rows=CHUNK_ROWS, compression='zstd', precision=None,
+                  quantized=False):
+    """
+    Streams the panel to Parquet with one row group per chunk. Needs pyarrow;
+    without it nothing is written and None is returned. Columns are float64
+    or float32 by storage `precision`; for 'bp' they hold the int32 codes
+    (null where missing) and the schema metadata the precision, scale and
+    each column's anchor level (see precision.ReturnCodec). The values are
+    encoded once either way, so `quantized` changes nothing here.
+    """
+    if pq is None:
+        logger.warning(f"  pyarrow is not installed; skipping {os.path.basename(output_file)}")
+        return None
+    started = time.perf_counter()
+    precision = storage.STORAGE if precision is None else precision
+    columns = list(panel.columns) if columns is None else columns
+    value_type = {'float64': pa.float64(), 'float32': pa.float32(), 'bp': pa.int32()}[precision]
+    metadata = {'precision': precision}
+    if precision == 'bp':
+        first = panel[columns].apply(lambda s: s.loc[s.first_valid_index()] if s.notna().any() else np.nan)
+        metadata['return_scale'] = str(storage.RETURN_SCALE)
+        metadata['anchors'] = json.dumps([None if np.isnan(v) else float(v) for v in first])
+        codec = storage.ReturnCodec(len(columns))
+    schema = pa.schema([('Date', pa.timestamp('ns'))] + [(str(c), value_type) for c in columns],
+                       metadata=metadata)
+    with pq.ParquetWriter(output_file, schema, compression=compression) as writer:
+        for chunk in iter_chunks(panel, chunk_rows, columns):
+            values = chunk.to_numpy(dtype='float64')
+            if precision == 'bp':
+                codes = codec.encode(values)
+                arrays = [pa.array(codes[:, j], mask=codes[:, j] == storage.MISSING) for j in range(len(columns))]
+            else:
+                values = values.astype('float32') if precision == 'float32' else values
+                arrays = [pa.array(values[:, j], from_pandas=True) for j in range(len(columns))]
+            arrays.insert(0, pa.array(pd.DatetimeIndex(chunk.index).values))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    return _report('parquet', output_file, len(panel), len(columns) + 1, started)
+
+
+def write_ragged(panel, output_file, columns=None, date_format='%Y-%m-%d', chunk_rows=CHUNK_ROWS, precision=None,
+                 quantized=False):
+    """
+    Writes the panel in the ragged columnar layout (see pipeline/ragged.py)
+    as JSON: {"dates": [...], "columns": [{"name", "start", "values"}]},
+    where `start` indexes `dates` and `values` runs from the column's first
+    to its last observation (gaps inside as null). The padding before and
+    after each column isn't stored. Columns are streamed out one at a time.
+    """
+    started = time.perf_counter()
+    columns = list(panel.columns) if columns is None else columns
+    values = panel[columns] if quantized else storage.quantize(panel[columns], precision)
+    values = storage.as_text(values, precision)
+    layout = ragged.RaggedPanel.from_panel(values)
+    with open(output_file, 'w') as fh:
+        fh.write('{"dates":' + json.dumps(list(_date_strings(layout.index, date_format))) + ',"columns":[')
+        for j, name in enumerate(layout.columns):
+            values = layout.segment(j)
+            fh.write((',' if j else '') + json.dumps({
+                'name': str(name), 'start': int(layout.starts[j]),
+                'values': [None if np.isnan(v) else float(v) for v in values],
+            }, separators=(',', ':')))
+        fh.write(']}')
+    logger.info(f"  Ragged layout skips {layout.padding():.0%} of {layout.shape[0]}x{layout.shape[1]} cells")
+    return _report('ragged', output_file, len(panel), len(columns) + 1, started)
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'ragged': write_ragged}
+# File extension per format, where it isn't the format name
+EXTENSIONS = {'ragged': 'ragged.json'}
+
+
+def export_panel(panel, base_path, formats, columns=None, chunk_rows=CHUNK_ROWS, precision=None, quantized=False):
+    """Writes the panel as `<base_path>.<fmt>` for each of `formats` (csv / parquet / ragged)."""
+    stats = []
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        result = WRITERS[fmt](panel, f"{base_path}.{EXTENSIONS.get(fmt, fmt)}", columns=columns, chunk_rows=chunk_rows,
+                              precision=precision, quantized=quantized)
+        if result is not None:
+            stats.append(result)
+    return stats
@@ -1,16 +1,19 @@
+import argparse
+import contextlib
 import pandas as pd
 import glob
 import os
-import pandas_datareader as pdr
-import pandas_datareader.data as web
-import yfinance as yf
 import numpy as np
-import requests
+import json
+import urllib.parse
+import urllib.request
 import logging
 import sys
-from io import StringIO
 from datetime import datetime
 
+from pipeline import accrual, bars, bonds, calibrate, checkpoint, correlation, daemon, delta, drawdowns, fees, freshness, fx, history, precision, proxies, quality, ragged, resample, service, sources, splice, throttle, writers
+from pipeline.sources import get_fred_series_raw, get_monthly_yf_data, get_yf_closes, read_msci_workbook
+
 # ---------------------------------------------------------
 # Logging Configuration
 # ---------------------------------------------------------
@@ -37,38 +40,78 @@ YF_ASSETS = {
     "commodity_usd": "^BCOM",     # Bloomberg Commodity Index
 }
 
-# Annual TER for MSCI Indexes (deducted from monthly returns)
-TER_MAPPING = {
-    "japan": 0.0058,
-    "pacific": 0.0020,
-    "switzerland": 0.0020,
-    "uk": 0.0033,
-    "us_small_cap_value": 0.0030,
-    "world_acwi": 0.0020,
-    "world_acwi_imi": 0.0017,
-    "world_imi": 0.0017,
-    "world_min_vol": 0.0025,
-    "world_momentum": 0.0025,
-    "world_quality": 0.0025,
-    "world_small_cap_value": 0.0039,
-    "world_value": 0.0025,
-    "world": 0.0020,
-    "emerging_market_imi": 0.0018,
-    "dbmf": 0.0075,
-    "dgeix": 0.0026,
-    "dfemx": 0.0036,
-    "degc": 0.0026,
-    "xeon": 0.0010,
-    "eur_government_bonds_10y": 0.0015,
-    "ntsg": 0.0025,
-    "gold": 0.0012,
-    "nasdaq_tr": 0.0030,
-    "sp500_tr": 0.0007,
-    "commodity": 0.0030,
-    "commodity_enhanced": 0.0070,
-    "lg_commodity": 0.0030,
-    "roll_select_commodity": 0.0028,
-    "ubs_commodity": 0.0034,
+# Currencies every asset is expressed in (see pipeline/fx.py for sources).
+# Only PUBLISHED_CURRENCIES go to the 'Data' sheet read by the app; the others
+# are written to their own sheet (GBP, CHF, JPY).
+FX_CURRENCIES = ["usd", "eur", "gbp", "chf", "jpy"]
+PUBLISHED_CURRENCIES = ["usd", "eur"]
+
+# Annual TER schedules, deducted from monthly returns (pipeline/fees.py).
+# Each asset is a dated step function [(since, ter), ...]: a fee change is a new
+# step, e.g. [(None, 0.0030), ("2021-06-01", 0.0025)]. `since` None means from the
+# start of history; with a dated first step, earlier (proxy) history pays no fee.
+# Assets with a registered splice pair (dbmf, dgeix, xeon, ...) are charged from
+# their live series on (splice.inceptions); DEGC has no live series yet, so its
+# DFA fund blend pays nothing until the ETF (0.26%) is spliced in.
+TER_SCHEDULES = {
+    "japan": [(None, 0.0058)],
+    "pacific": [(None, 0.0020)],
+    "switzerland": [(None, 0.0020)],
+    "uk": [(None, 0.0033)],
+    "us_small_cap_value": [(None, 0.0030)],
+    "world_acwi": [(None, 0.0020)],
+    "world_acwi_imi": [(None, 0.0017)],
+    "world_imi": [(None, 0.0017)],
+    "world_min_vol": [(None, 0.0025)],
+    "world_momentum": [(None, 0.0025)],
+    "world_quality": [(None, 0.0025)],
+    "world_small_cap_value": [(None, 0.0039)],
+    "world_value": [(None, 0.0025)],
+    "world": [(None, 0.0020)],
+    "emerging_market_imi": [(None, 0.0018)],
+    "dbmf": [(None, 0.0075)],
+    "dgeix": [(None, 0.0026)],
+    "dfemx": [(None, 0.0036)],
+    "degc": [],
+    "xeon": [(None, 0.0010)],
+    "eur_government_bonds_10y": [(None, 0.0015)],
+    "ntsg": [(None, 0.0025)],
+    "gold": [(None, 0.0012)],
+    "nasdaq_tr": [(None, 0.0030)],
+    "sp500_tr": [(None, 0.0007)],
+    "commodity": [(None, 0.0030)],
+    "commodity_enhanced": [(None, 0.0070)],
+    "lg_commodity": [(None, 0.0030)],
+    "roll_select_commodity": [(None, 0.0028)],
+    "ubs_commodity": [(None, 0.0034)],
+}
+
+# NTSG proxy parameters: equity / bond-future exposure, bond duration and the
+# currency weights of MSCI World used for the yield and cash-rate composites.
+# Run `python process.py --calibrate-ntsg` to check them against the live ETF.
+NTSG_PARAMS = {
+    "equity": 0.90,
+    "bond": 0.60,
+    "duration": 7.0,
+    "weights": {"US": 0.68, "EU": 0.16, "JP": 0.09, "UK": 0.07},
+}
+NTSG_ETF_TICKER = "NTSG.L"
+
+# Proxy search (`python process.py --search-proxies`): spliced assets and the
+# live (USD) series their backfill is fitted against, plus the candidate pool
+# besides the MSCI workbooks in source/. EUR-listed targets are left out since
+# the candidates are all USD.
+PROXY_SEARCH_TARGETS = {
+    "dgeix": "DGEIX",
+    "lg_commodity": "DBC",
+    "roll_select_commodity": "CMDY",
+    "ubs_commodity": "UC14.L",
+    "commodity_enhanced": "WCOA.L",
+}
+PROXY_YF_CANDIDATES = ["^SPGSCI", "^BCOM", "^CMCIER", "^SP500TR", "GSG", "DJP", "DBC"]
+PROXY_FRED_CANDIDATES = {
+    "FRED All Commodities": "PALLFNFINDEXM",
+    "FRED PPI Commodities": "PPIACO",
 }
 
 # Embedded SG CTA Index Data (Proxy for DBMF)
@@ -309,55 +352,6 @@ SG_CTA_INDEX_DATA = [
     {"date": "2019-04-30", "value": 220320.0}
 ]
 
-def get_fred_series_raw(series_id, name):
-    """Fetch series from St. Louis Fed (FRED). Tries pandas_datareader first, then direct CSV."""
-    # Method 1: pandas_datareader
-    try:
-        # Defaults to last 30 years if not specified
-        df = web.DataReader(series_id, 'fred', start="1990-01-01")
-        df.columns = [name]
-        return df
-    except Exception as e:
-        logger.warning(f"pandas_datareader failed for {series_id}: {e}. Retrying with direct CSV download.")
-
-    # Method 2: Direct CSV
-    url = f"https://fred.stlouisfed.org/graph/fredgraph.csv?id={series_id}"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            df = pd.read_csv(StringIO(response.text), index_col=0, parse_dates=True)
-            df = df.apply(pd.to_numeric, errors='coerce').dropna()
-            df.columns = [name]
-            return df
-        else:
-             logger.error(f"Failed to fetch {series_id} via CSV. Status: {response.status_code}")
-    except Exception as e:
-        logger.error(f"Error fetching {series_id} via CSV: {e}")
-    
-    return pd.DataFrame()
-
-def get_monthly_yf_data(ticker, start_date="1970-01-01"):
-    """Downloads and formats yfinance monthly data."""
-    logger.info(f"Downloading {ticker} from {start_date}...")
-    try:
-        df = yf.download(ticker, start=start_date, interval="1mo", auto_adjust=True, progress=False)
-        if df.empty:
-            return pd.Series(dtype='float64')
-        if isinstance(df.columns, pd.MultiIndex):
-            if 'Close' in df.columns.get_level_values(0):
-                series = df['Close'][ticker]
-            else:
-                series = df.iloc[:, 0]
-        else:
-            series = df['Close'] if 'Close' in df.columns else df.iloc[:, 0]
-        if series.index.tz is not None:
-            series.index = series.index.tz_localize(None)
-        series = series.resample("ME").last().ffill()  # Ensure no internal gaps after resampling
-        return series.dropna()  # Remove leading/trailing NaNs
-    except Exception as e:
-        logger.error(f"Error downloading {ticker}: {e}")
-        return pd.Series(dtype='float64')
-
 def get_degc_portfolio(start_date="1999-01-01"):
     """
     Dimensional Global Core Equity (DEGC) Proxy:
@@ -396,13 +390,11 @@ def get_degc_portfolio(start_date="1999-01-01"):
     
     return port_val.rename('degc_usd')
 
-def get_ntsg_portfolio(start_date="1999-01-01"):
+def load_ntsg_inputs():
     """
-    NTSG Proxy: 90% MSCI World + 60% Global Bond Futures (implied financing).
-    Global Basket: ~70% US, 15% EUR, 8% JPY, 7% GBP.
+    Monthly inputs of the NTSG proxy: MSCI World returns ('equity_ret') plus
+    FRED 10Y yields ('<region>_Yield') and cash rates ('<region>_Rate') in percent.
     """
-    logger.info("Calculating NTSG (Global Efficient Core) portfolio with Global Data...")
-
     # ---------------------------------------------------------
     # 1. Load MSCI World (Equity Component)
     # ---------------------------------------------------------
@@ -416,25 +408,14 @@ def get_ntsg_portfolio(start_date="1999-01-01"):
         msci_world['Date'] = pd.to_datetime(msci_world['Date'])
         msci_world.set_index('Date', inplace=True)
         # Resample to monthly end
-        world_m = msci_world['Index'].resample('ME').last().ffill()
+        world_m = resample.last(msci_world['Index'], fill=True)
         equity_ret = world_m.pct_change().fillna(0)
     except Exception as e:
         logger.error(f"Error loading World data: {e}")
-        return pd.Series(dtype='float64')
-
-    # ---------------------------------------------------------
-    # 2. Define Global Weights (Approx. Currency Weights)
-    # ---------------------------------------------------------
-    # NTSG targets currency weights of MSCI World. Approx historical averages:
-    w = {
-        'US': 0.68,  # USD
-        'EU': 0.16,  # EUR (Germany Proxy)
-        'JP': 0.09,  # JPY
-        'UK': 0.07   # GBP
-    }
+        return pd.DataFrame()
 
     # ---------------------------------------------------------
-    # 3. Fetch Global Data (Yields & Rates) from FRED
+    # 2. Fetch Global Data (Yields & Rates) from FRED
     # ---------------------------------------------------------
     # Tickers: 10Y Govt Yields (Monthly) & Immediate Rates (Monthly)
     tickers = {
@@ -448,49 +429,43 @@ def get_ntsg_portfolio(start_date="1999-01-01"):
         'UK_Yield': 'IRLTLT01GBM156N', 'UK_Rate': 'IRSTCI01GBM156N',
     }
     
-    data_frames = []
-    for name, ticker in tickers.items():
-        df = get_fred_series_raw(ticker, name)
-        # Resample to monthly end to match equity dates
-        df = df.resample('ME').last() 
-        data_frames.append(df)
-        
-    if not data_frames:
+    # Shared month-end FRED panel (IRLTLT01DEM156N is reused by the EUR bond builder)
+    macro_raw = bonds.get_monthly_fred(tickers, get_fred_series_raw)
+    if macro_raw.empty:
+        return pd.DataFrame()
+
+    # Combine and Forward Fill missing data, then align with Equity Data
+    macro_data = macro_raw.ffill().dropna()
+    return pd.concat([equity_ret.rename('equity_ret'), macro_data], axis=1).dropna()
+
+def get_ntsg_portfolio(start_date="1999-01-01", params=None):
+    """
+    NTSG Proxy: 90% MSCI World + 60% Global Bond Futures (implied financing).
+    Global Basket: ~70% US, 15% EUR, 8% JPY, 7% GBP.
+    Parameters default to NTSG_PARAMS (see calibrate_ntsg).
+    """
+    logger.info("Calculating NTSG (Global Efficient Core) portfolio with Global Data...")
+    p = NTSG_PARAMS if params is None else params
+
+    combined = load_ntsg_inputs()
+    if combined.empty:
         return pd.Series(dtype='float64')
 
-    # Combine and Forward Fill missing data
-    macro_data = pd.concat(data_frames, axis=1).ffill().dropna()
-    
     # ---------------------------------------------------------
-    # 4. Construct Composite Yield & Borrowing Cost
+    # 3. Construct Composite Yield & Borrowing Cost
     # ---------------------------------------------------------
+    w = p['weights']
     # Global 10Y Yield Composite
-    macro_data['Global_Yield'] = (
-        w['US'] * macro_data['US_Yield'] +
-        w['EU'] * macro_data['EU_Yield'] +
-        w['JP'] * macro_data['JP_Yield'] +
-        w['UK'] * macro_data['UK_Yield']
-    ) / 100  # Convert to decimal
-
+    combined['Global_Yield'] = sum(w[r] * combined[f'{r}_Yield'] for r in w) / 100  # Convert to decimal
     # Global Cash Rate Composite (Cost of Leverage)
-    macro_data['Global_Rate'] = (
-        w['US'] * macro_data['US_Rate'] +
-        w['EU'] * macro_data['EU_Rate'] +
-        w['JP'] * macro_data['JP_Rate'] +
-        w['UK'] * macro_data['UK_Rate']
-    ) / 100  # Convert to decimal
-
-    # Align with Equity Data
-    combined = pd.concat([equity_ret, macro_data], axis=1).dropna()
-    combined.rename(columns={'Index': 'equity_ret'}, inplace=True)
+    combined['Global_Rate'] = sum(w[r] * combined[f'{r}_Rate'] for r in w) / 100  # Convert to decimal
 
     # ---------------------------------------------------------
-    # 5. Calculate Returns
+    # 4. Calculate Returns
     # ---------------------------------------------------------
     # Global Bond Return (Target Duration ~7.0)
     # Bond Ret ~= Yield / 12 - Duration * Change_in_Yield
-    yield_chg = combined['Global_Yield'].diff().fillna(0)
-    bond_ret = (combined['Global_Yield'].shift(1).fillna(combined['Global_Yield']) / 12) - (7.0 * yield_chg)
+    bond_ret = bonds.bond_returns(combined[['Global_Yield']], {'bond': p['duration']})[('Global_Yield', 'bond')]
     
     # Cash/Borrowing Cost (Weighted average of local risk-free rates)
     cash_cost = combined['Global_Rate'] / 12
@@ -498,41 +473,182 @@ def get_ntsg_portfolio(start_date="1999-01-01"):
     # NTSG Formula: 90% Equity + 60% Bond Futures (Excess Return)
     # Excess Return = (Bond_Ret - Cash_Cost)
     # Portfolio = 0.90 * Equity + 0.10 * Cash + 0.60 * Excess_Bond
-    # Mathematically simplifies to:
-    ntsg_ret = (0.90 * combined['equity_ret'] + 
-                0.60 * bond_ret - 
-                0.50 * cash_cost)
+    # Mathematically simplifies to (financing 0.50 of cash):
+    e, b = p['equity'], p['bond']
+    ntsg_ret = (e * combined['equity_ret'] + 
+                b * bond_ret - 
+                (e + b - 1) * cash_cost)
     
     ntsg_index = 100 * (1 + ntsg_ret).cumprod()
     return ntsg_index.rename('ntsg_usd')
 
+def calibrate_ntsg(output_file=None, workers=None):
+    """
+    Calibration mode: ranks (equity %, bond %, duration, region weights)
+    combinations of the NTSG proxy by tracking error against the live ETF.
+    """
+    logger.info(f"Calibrating NTSG proxy against {NTSG_ETF_TICKER}...")
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    output_file = output_file or os.path.join(base_path, "reports", "ntsg_calibration.csv")
+
+    inputs = load_ntsg_inputs()
+    etf = get_monthly_yf_data(NTSG_ETF_TICKER)
+    if inputs.empty or etf.empty:
+        logger.error("Missing NTSG inputs or ETF prices; calibration skipped.")
+        return pd.DataFrame()
+
+    # Make sure the current parameters are part of the search space
+    grid = {k: np.union1d(v, [NTSG_PARAMS[k]]) for k, v in calibrate.DEFAULT_GRID.items()}
+    weights = pd.concat([calibrate.weight_grid(), pd.DataFrame([NTSG_PARAMS['weights']])], ignore_index=True)
+    results = calibrate.calibrate_ntsg(inputs, etf.pct_change(), grid=grid, weights=weights.drop_duplicates(),
+                                       ter=fees.current_ter(TER_SCHEDULES['ntsg']), workers=workers)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    results.to_csv(output_file, index=False)
+
+    current = results[
+        np.isclose(results['equity'], NTSG_PARAMS['equity']) &
+        np.isclose(results['bond'], NTSG_PARAMS['bond']) &
+        np.isclose(results['duration'], NTSG_PARAMS['duration']) &
+        np.logical_and.reduce([np.isclose(results[r], v) for r, v in NTSG_PARAMS['weights'].items()])
+    ]
+    best = results.iloc[0]
+    logger.info(f"  Best fit: {best.drop(['months']).round(4).to_dict()}")
+    if not current.empty:
+        logger.info(f"  Current NTSG_PARAMS rank {current.index[0] + 1}/{len(results)}, "
+                    f"tracking error {current['tracking_error'].iloc[0]:.4%}")
+    logger.info(f"  Wrote {len(results)} ranked combinations to {output_file}")
+    return results
+
+def load_msci_levels(source_dir):
+    """Month-end levels of every MSCI workbook in source_dir, one column per file."""
+    levels = {}
+    for file_path in sorted(glob.glob(os.path.join(source_dir, "*.xlsx"))):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        if name.startswith('~$'):
+            continue
+        try:
+            df = pd.read_excel(file_path, skiprows=5).iloc[:, [0, 1]]
+            df.columns = ['Date', 'Value']
+            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+            df = df.dropna(subset=['Date', 'Value']).set_index('Date')
+            levels[name] = resample.last(pd.to_numeric(df['Value'], errors='coerce'))
+        except Exception as e:
+            logger.error(f"Error reading {os.path.basename(file_path)}: {e}")
+    return pd.DataFrame(levels)
+
+def search_proxies(output_file=None, workers=None, top=25):
+    """
+    Proxy search mode: ranks every candidate backfill source (MSCI workbooks,
+    Yahoo indexes, FRED series) and two-source blend for each spliced asset
+    by tracking error against its live series, and proposes a backfill chain.
+    """
+    logger.info("Searching backfill proxies...")
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    output_file = output_file or os.path.join(base_path, "reports", "proxy_search.csv")
+
+    msci = load_msci_levels(os.path.join(base_path, "source"))
+    msci.columns = [f"MSCI {c}" for c in msci.columns]
+    daily = bars.get_daily_closes(sorted(set(PROXY_YF_CANDIDATES) | set(PROXY_SEARCH_TARGETS.values())))
+    monthly = splice.monthly_returns(splice.daily_returns(daily)) if not daily.empty else pd.DataFrame()
+    fred = bonds.get_monthly_fred(PROXY_FRED_CANDIDATES, get_fred_series_raw)
+
+    candidates = pd.concat([
+        msci.pct_change(fill_method=None),
+        monthly[[c for c in PROXY_YF_CANDIDATES if c in monthly.columns]],
+        fred.pct_change(fill_method=None),
+    ], axis=1, sort=True)
+    logger.info(f"  {candidates.shape[1]} candidate series, "
+                f"{candidates.shape[1] * (candidates.shape[1] + 1) // 2} candidates/blends per target")
+
+    reports = []
+    for asset, ticker in PROXY_SEARCH_TARGETS.items():
+        if ticker not in monthly.columns or monthly[ticker].dropna().empty:
+            logger.warning(f"  No live history for {ticker}; {asset} skipped.")
+            continue
+        target = monthly[ticker].dropna()
+        results = proxies.search_proxies(target, candidates, workers=workers)
+        if results.empty:
+            logger.warning(f"  No candidate overlaps {ticker} enough; {asset} skipped.")
+            continue
+        chain = proxies.propose_chain(results, ticker, target.index[0])
+        best = results.iloc[0]
+        logger.info(f"  {asset}: best {best['proxy']} (w={best['weight']:.2f}) "
+                    f"TE {best['tracking_error']:.2%}, corr {best['correlation']:.2f}")
+        logger.info(f"  {asset}: proposed chain " +
+                    " -> ".join(f"{name} from {start:%Y-%m}" for name, start in chain))
+        reports.append(results.head(top).assign(asset=asset, target=ticker))
+
+    if not reports:
+        return pd.DataFrame()
+    report = pd.concat(reports, ignore_index=True)
+    report = report[['asset', 'target'] + [c for c in report.columns if c not in ('asset', 'target')]]
+    report['start'] = report['start'].dt.strftime('%Y-%m-%d')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    report.round(6).to_csv(output_file, index=False)
+    logger.info(f"  Wrote {len(report)} ranked proxies to {output_file}")
+    return report
+
+def export_as_of(when=None, run=None, export_formats=()):
+    """
+    Writes the dataset as a previous run produced it (see pipeline/history.py)
+    to reports/alphatrace_data_<run>.xlsx, one sheet per currency like the
+    published workbook, plus any extra export formats.
+    """
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    runs = history.list_runs()
+    if run is None:
+        if when is not None:
+            runs = runs[runs['created'] <= pd.Timestamp(when)]
+        if runs.empty:
+            logger.error(f"No dataset run recorded as of {when}.")
+            return pd.DataFrame()
+        run = runs['run'].iloc[-1]
+    panel = history.as_of(run=run)
+    panel.index = resample.month_end(panel.index)
+
+    sheet_of = {}
+    for col in panel.columns:
+        ccy = col[-4:-1].lower() if col.endswith(')') else 'usd'
+        sheet_of[col] = 'Data' if ccy in PUBLISHED_CURRENCIES else ccy.upper()
+        if _is_ladder(col):
+            sheet_of[col] = 'Bonds'
+    sheets = {sheet: [c for c in panel.columns if sheet_of[c] == sheet]
+              for sheet in dict.fromkeys(['Data'] + list(sheet_of.values()))}
+
+    out_dir = os.path.join(base_path, "reports")
+    os.makedirs(out_dir, exist_ok=True)
+    stored_as = history.run_precision(run)
+    writers.write_xlsx(panel, os.path.join(out_dir, f"alphatrace_data_{run}.xlsx"), sheets, precision=stored_as,
+                       quantized=True)
+    if export_formats:
+        writers.export_panel(panel, os.path.join(out_dir, f"alphatrace_data_{run}"), export_formats,
+                             precision=stored_as, quantized=True)
+    logger.info(f"Exported dataset run {run}: {panel.shape}")
+    return panel
+
 def get_eur_bonds_10y_portfolio(start_date="1980-01-01"):
     """Backtests the EUR Government Bonds 10y portfolio."""
     logger.info("Calculating EUR Government Bonds 10y portfolio...")
     etf_ticker = "SXRQ.DE"
     duration = 7.45
     
-    # 1. Synthetic Bond (Yield-Derived)
-    yields = get_fred_series_raw("IRLTLT01DEM156N", "Yield")
+    # 1. Synthetic Bond (Yield-Derived, German 10Y from the shared yield matrix)
+    yields = bonds.get_yield_matrix(['DE'], get_fred_series_raw).dropna()
     if yields.empty:
         return pd.Series(dtype='float64')
     
-    yields = yields[yields.index >= start_date] / 100
-    yields_m = yields.resample('ME').last()
-    total_return = (yields_m.shift(1) / 12) + (-duration * yields_m.diff())
-    total_return.iloc[0] = 0
-    syn_index = 100 * (1 + total_return).cumprod()
-    syn_index.columns = ['Synthetic_TR']
+    yields_m = yields[yields.index >= start_date]
+    syn_index = bonds.total_return_indexes(yields_m, {'Synthetic_TR': duration})['DE']
     
     # 2. Actual ETF Data
     try:
-        etf_data = yf.download(etf_ticker, period="max", auto_adjust=True, progress=False)
-        etf_close = etf_data['Close']
-        if isinstance(etf_close, pd.DataFrame): etf_close = etf_close.iloc[:, 0]
-        etf_m = etf_close.resample('ME').last()
+        etf_close = get_yf_closes(etf_ticker, period="max", auto_adjust=True)
+        etf_m = resample.last(etf_close)
         etf_m.name = 'ETF_TR'
         
         splice_date = etf_m.first_valid_index()
+        splice.record_pair('eur_government_bonds_10y', syn_index['Synthetic_TR'], etf_m, splice_date,
+                           'Synthetic 10Y Bund', etf_ticker)
         if splice_date:
             ratio = etf_m.loc[splice_date] / syn_index.loc[splice_date, 'Synthetic_TR']
             history_eur = syn_index['Synthetic_TR'] * ratio
@@ -546,9 +662,10 @@ def get_eur_bonds_10y_portfolio(start_date="1980-01-01"):
 
 def get_xeon_portfolio(start_date="1999-01-04"):
     """
-    Backtests LU0290358497 (XEON) in EUR and USD.
-    EUR Synthetic (1999-2007): EONIA/€STR+8.5bps minus 0.10% fees.
+    Backtests LU0290358497 (XEON) in EUR.
+    EUR Synthetic (1999-2007): EONIA/€STR+8.5bps, no fee before the ETF launch.
     EUR Actual (2007-Present): XEON.DE Adjusted Close.
+    The USD view is derived from the run's shared FX matrix (pipeline/fx.py).
     """
     logger.info("Calculating Xtrackers II EUR Overnight Rate Swap (XEON) portfolio...")
     
@@ -566,44 +683,29 @@ def get_xeon_portfolio(start_date="1999-01-04"):
     estr_curr['Rate'] = estr_curr['Rate'] + 0.085
     rates = eonia_hist.loc[:'2019-09-30'].combine_first(estr_curr).ffill()
     
-    # 2. Calculate Synthetic EUR NAV
-    daily_rates = rates.resample('D').ffill().loc[start_date:]
-    TER = 0.0010  # 0.10% Expense Ratio
-    daily_rates['Daily_Ret'] = (daily_rates['Rate'] / 100 - TER) / 360
-    synthetic_eur = 100 * (1 + daily_rates['Daily_Ret'].fillna(0)).cumprod()
-
-    # 3. Splice with Actual ETF Data (XEON.DE)
-    xeon_eur = synthetic_eur
+    # 2. Fetch Actual ETF Data (XEON.DE)
+    etf_close = pd.Series(dtype='float64')
     try:
         etf_ticker = "XEON.DE"
-        etf_data = yf.download(etf_ticker, start="2007-01-01", progress=False, auto_adjust=True)
-        if not etf_data.empty:
-            if isinstance(etf_data.columns, pd.MultiIndex):
-                etf_close = etf_data['Close'].iloc[:, 0]
-            else:
-                etf_close = etf_data['Close']
-            
-            splice_date = etf_close.first_valid_index()
-            if splice_date and splice_date in synthetic_eur.index:
-                scale_factor = etf_close.loc[splice_date] / synthetic_eur.loc[splice_date]
-                synthetic_scaled = synthetic_eur.loc[:splice_date] * scale_factor
-                xeon_eur = pd.concat([synthetic_scaled[:-1], etf_close.loc[splice_date:]])
+        etf_close = get_yf_closes(etf_ticker, start="2007-01-01", auto_adjust=True)
     except Exception as e:
         logger.error(f"Error fetching XEON ETF data: {e}")
+    splice_date = etf_close.first_valid_index()
 
-    # 4. Fetch USD Exchange Rate for unhedged USD version
-    fx_rates = get_fred_series_raw("DEXUSEU", "Rate")
-    if not fx_rates.empty:
-        aligned_fx = fx_rates['Rate'].reindex(xeon_eur.index).ffill()
-        xeon_usd = xeon_eur * aligned_fx
-    else:
-        xeon_usd = pd.Series(dtype=float)
+    # 3. Synthetic EUR NAV: Act/360 accrual in closed form at month ends (+ splice day),
+    # gross of fees: it only stands in for the ETF (net of its TER) before inception
+    eval_dates = accrual.month_end_dates(start_date, rates.index[-1])
+    if splice_date is not None:
+        eval_dates = eval_dates.union(pd.DatetimeIndex([splice_date]))
+    synthetic_eur = accrual.accrual_index(rates, start_date, dates=eval_dates)['Rate']
+
+    # 4. Splice with Actual ETF Data
+    synthetic_m = synthetic_eur.reindex(accrual.month_end_dates(start_date, rates.index[-1]))
+    splice.record_pair('xeon', synthetic_m, etf_close, splice_date, 'EONIA/€STR accrual', 'XEON.DE')
+    xeon_eur = splice.level_splice(synthetic_eur, etf_close, splice_date)
 
     res = pd.DataFrame()
-    res['xeon_eur'] = xeon_eur.resample('ME').last()
-    if not xeon_usd.empty:
-        res['xeon_usd'] = xeon_usd.resample('ME').last()
-        
+    res['xeon_eur'] = resample.last(xeon_eur)
     return res
 
 def get_dbmf_portfolio():
@@ -621,6 +723,7 @@ def get_dbmf_portfolio():
     
     # 2. Fetch DBMF data
     dbmf_actual = get_monthly_yf_data("DBMF", start_date="2019-05-08")
+    splice.record_pair('dbmf', df_proxy, dbmf_actual, dbmf_launch, 'SG CTA Index', 'DBMF')
     
     if dbmf_actual.empty:
         return df_proxy.rename('dbmf_usd')
@@ -673,15 +776,10 @@ def get_enhanced_commodity_portfolio(start_year=1991):
     proxy_rets = pd.Series(dtype='float64')
     try:
         # Try downloading first
-        df = yf.download("^BCOM", start=f"{start_year}-01-01", interval="1mo", progress=False)
-        if not df.empty:
-            if isinstance(df.columns, pd.MultiIndex):
-                prices = df['Close'].iloc[:, 0]
-            else:
-                prices = df['Close']
-            
+        prices = get_yf_closes("^BCOM", start=f"{start_year}-01-01", interval="1mo")
+        if not prices.empty:
             # Resample to month end to match other data
-            prices = prices.resample('ME').last()
+            prices = resample.last(prices)
             monthly_rets = prices.pct_change().dropna()
             
             # Use synthetic if download is too short (e.g. starts after 1992)
@@ -702,14 +800,9 @@ def get_enhanced_commodity_portfolio(start_year=1991):
     # 2. Get ETF Data (WCOA.L)
     etf_rets = pd.Series(dtype='float64')
     try:
-        df_etf = yf.download("WCOA.L", start="2016-05-01", interval="1mo", progress=False)
-        if not df_etf.empty:
-            if isinstance(df_etf.columns, pd.MultiIndex):
-                prices_etf = df_etf['Close'].iloc[:, 0]
-            else:
-                prices_etf = df_etf['Close']
-            
-            prices_etf = prices_etf.resample('ME').last()
+        prices_etf = get_yf_closes("WCOA.L", start="2016-05-01", interval="1mo")
+        if not prices_etf.empty:
+            prices_etf = resample.last(prices_etf)
             etf_rets = prices_etf.pct_change().dropna()
     except Exception as e:
         logger.error(f"  > WCOA.L download failed: {e}")
@@ -718,6 +811,9 @@ def get_enhanced_commodity_portfolio(start_year=1991):
     # 1.5% Annual Alpha -> ~0.124% Monthly
     monthly_alpha = (1.015)**(1/12) - 1
     proxy_rets_enhanced = proxy_rets + monthly_alpha
+    if not etf_rets.empty:
+        splice.record_pair('commodity_enhanced', splice.to_index(proxy_rets_enhanced), splice.to_index(etf_rets),
+                           etf_rets.index[0], 'BCOM + 1.5% alpha', 'WCOA.L')
     
     # 4. Stitch Returns
     if not etf_rets.empty:
@@ -736,49 +832,25 @@ def get_lg_multistrategy_portfolio(start_date='1991-01-01'):
     """
     Constructs the L&G Multi-Strategy Enhanced Commodities portfolio.
     Uses ^SPGSCI (S&P GSCI) before 2006-02-06, and DBC (Invesco DB Commodity Index) afterwards.
-    Calculates on daily data then resamples to monthly.
+    Splices daily returns from the cached bar store, then compounds them to monthly.
     """
     logger.info("Calculating L&G Multi-Strategy Enhanced Commodities portfolio...")
     tickers = ['^SPGSCI', 'DBC']
     switch_date = '2006-02-06'
     
     try:
-        # Download daily data
-        data = yf.download(tickers, start=start_date, interval="1d", auto_adjust=True, progress=False)
-        
-        # Handle MultiIndex columns
-        if isinstance(data.columns, pd.MultiIndex):
-            if 'Close' in data.columns.get_level_values(0):
-                df = data['Close']
-            else:
-                df = data.iloc[:, 0] # Fallback
-        else:
-            df = data['Close'] if 'Close' in data.columns else data
+        closes = bars.get_daily_closes(tickers, start_date)
 
         # Check if we have both columns
-        if '^SPGSCI' not in df.columns or 'DBC' not in df.columns:
+        if '^SPGSCI' not in closes.columns or 'DBC' not in closes.columns:
             logger.warning("  > Missing ticker data for LG Strategy.")
             return pd.Series(dtype='float64')
 
-        # Calculate daily returns
-        returns = df.pct_change()
-        
-        # Splicing Logic
-        cond_early = returns.index < switch_date
-        strat_ret = np.where(
-            cond_early,
-            returns['^SPGSCI'],
-            returns['DBC']
-        )
-        
-        strat_series = pd.Series(strat_ret, index=returns.index).fillna(0)
-        
-        # Build Index (Base 100)
-        usd_index = 100 * (1 + strat_series).cumprod()
-        
-        # Resample to Monthly End
-        usd_index_m = usd_index.resample('ME').last()
-        
+        returns = splice.daily_returns(closes)
+        schedule = [('^SPGSCI', None), ('DBC', switch_date)]
+        splice.record_chain('lg_commodity', returns, schedule)
+        strat_series = splice.date_splice(returns, schedule)
+        usd_index_m = splice.to_index(splice.monthly_returns(strat_series))
         return usd_index_m.rename('lg_commodity_usd')
 
     except Exception as e:
@@ -805,42 +877,21 @@ def get_bloomberg_roll_select_portfolio(start_date='1991-01-01'):
     tickers = [ticker_early, ticker_mid, ticker_modern]
     
     try:
-        data = yf.download(tickers, start=start_date, interval="1d", auto_adjust=True, progress=False)
-        
-        # Handle columns
-        if isinstance(data.columns, pd.MultiIndex):
-            if 'Close' in data.columns.get_level_values(0):
-                df = data['Close']
-            else:
-                df = data.iloc[:, 0]
-        else:
-            df = data['Close'] if 'Close' in data.columns else data
+        closes = bars.get_daily_closes(tickers, start_date)
+        if closes.empty:
+            logger.warning("  > Missing ticker data for Bloomberg Roll Select.")
+            return pd.Series(dtype='float64')
 
-        # Calculate returns
-        returns = df.pct_change()
-        
-        # Splicing Logic
-        conditions = [
-            returns.index < switch_date_1,
-            (returns.index >= switch_date_1) & (returns.index < switch_date_2),
-            returns.index >= switch_date_2
+        # Missing tickers contribute zero returns for their phase
+        returns = splice.daily_returns(closes)
+        schedule = [
+            (ticker_early, None),
+            (ticker_mid, switch_date_1),
+            (ticker_modern, switch_date_2),
         ]
-        
-        # Ensure we have the columns
-        c1 = returns[ticker_early] if ticker_early in returns.columns else pd.Series(0, index=returns.index)
-        c2 = returns[ticker_mid] if ticker_mid in returns.columns else pd.Series(0, index=returns.index)
-        c3 = returns[ticker_modern] if ticker_modern in returns.columns else pd.Series(0, index=returns.index)
-        
-        choices = [c1, c2, c3]
-        
-        synthetic_returns = np.select(conditions, choices, default=0)
-        strat_series = pd.Series(synthetic_returns, index=returns.index).fillna(0)
-        
-        # Build Index
-        usd_index = 100 * (1 + strat_series).cumprod()
-        
-        # Resample
-        usd_index_m = usd_index.resample('ME').last()
+        splice.record_chain('roll_select_commodity', returns, schedule)
+        strat_series = splice.date_splice(returns, schedule)
+        usd_index_m = splice.to_index(splice.monthly_returns(strat_series))
         return usd_index_m.rename('roll_select_commodity_usd')
 
     except Exception as e:
@@ -863,108 +914,60 @@ def get_ubs_cmci_portfolio(start_date='1991-01-01'):
     ticker_proxy = "^SPGSCI"
     
     try:
-        # Download all at once
-        tickers = [ticker_etf, ticker_index, ticker_proxy]
-        data = yf.download(tickers, start=start_date, interval="1d", auto_adjust=True, progress=False)
-        
-        # Handle columns
-        if isinstance(data.columns, pd.MultiIndex):
-            if 'Close' in data.columns.get_level_values(0):
-                df = data['Close']
-            else:
-                df = data.iloc[:, 0]
-        else:
-            df = data['Close'] if 'Close' in data.columns else data
-
-        # Calculate daily returns
-        returns = df.pct_change()
-        
-        # Ensure we have the columns
-        c_etf = returns[ticker_etf] if ticker_etf in returns.columns else pd.Series(dtype='float64')
-        c_index = returns[ticker_index] if ticker_index in returns.columns else pd.Series(dtype='float64')
-        c_proxy = returns[ticker_proxy] if ticker_proxy in returns.columns else pd.Series(dtype='float64')
+        closes = bars.get_daily_closes([ticker_etf, ticker_index, ticker_proxy], start_date)
 
-        if c_proxy.empty:
+        if ticker_proxy not in closes.columns:
             logger.warning("  > Missing proxy ^SPGSCI for UBS CMCI.")
             return pd.Series(dtype='float64')
 
         # Splicing: Start with Proxy, overwrite with Index, then ETF
-        combined_returns = c_proxy.copy()
-        
-        if not c_index.empty:
-            common = combined_returns.index.intersection(c_index.dropna().index)
-            combined_returns.loc[common] = c_index.loc[common]
-            
-        if not c_etf.empty:
-            common = combined_returns.index.intersection(c_etf.dropna().index)
-            combined_returns.loc[common] = c_etf.loc[common]
-            
-        combined_returns = combined_returns.fillna(0) # Handle remaining NaNs
-        
-        # Build Index
-        usd_index = 100 * (1 + combined_returns).cumprod()
-        
-        # Resample to Monthly
-        usd_index_m = usd_index.resample('ME').last()
+        returns = splice.daily_returns(closes)
+        priority = [ticker_proxy, ticker_index, ticker_etf]
+        splice.record_chain('ubs_commodity', returns, [(t, None) for t in priority])
+        combined_returns = splice.priority_splice(returns, priority)
+        usd_index_m = splice.to_index(splice.monthly_returns(combined_returns))
         return usd_index_m.rename('ubs_commodity_usd')
 
     except Exception as e:
         logger.error(f"  > Error calculating UBS CMCI: {e}")
         return pd.Series(dtype='float64')
 
-def process_files():
-    logger.info("Starting Data Processing...")
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(base_path)
-    
-    source_dir = os.path.join(base_path, "source")
+def msci_workbooks(source_dir):
+    """MSCI workbooks in source_dir (Excel lock files excluded)."""
     files = glob.glob(os.path.join(source_dir, "*.xlsx"))
-    output_file = 'alphatrace_data.xlsx'
-    files = [f for f in files if not os.path.basename(f).startswith('~$')]
+    return [f for f in files if not os.path.basename(f).startswith('~$')]
+
+def load_msci_sources(source_dir):
+    """Gross month-end MSCI index levels, one column per workbook in source_dir."""
+    files = msci_workbooks(source_dir)
     
     if not files:
         logger.warning(f"No Excel files found in {source_dir}.")
-        return
+        return pd.DataFrame()
 
     logger.info(f"Found {len(files)} MSCI files.")
     
     all_data = []
     for file_path in sorted(files):
-        logger.info(f"Reading {os.path.basename(file_path)}...")
         try:
-            df = pd.read_excel(file_path, skiprows=5)
-            df = df.iloc[:, [0, 1]]
-            df.columns = ['Date', 'Value']
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-            df = df.dropna(subset=['Date', 'Value'])
-            asset_name = os.path.splitext(os.path.basename(file_path))[0]
-            df = df.set_index('Date')
-            df.columns = [asset_name]
-            
-            # Apply TER deduction if mapping exists
-            if asset_name in TER_MAPPING:
-                ter = TER_MAPPING[asset_name]
-                monthly_ter = ter / 12
-                # Calculate returns, deduct TER from second month onwards
-                rets = df[asset_name].pct_change()
-                adj_rets = rets - monthly_ter
-                adj_rets.iloc[0] = 0  # No change for the very first data point
-                # Reconstruct the index starting from first_val
-                first_val = df[asset_name].iloc[0]
-                df[asset_name] = first_val * (1 + adj_rets).cumprod()
-                logger.info(f"  Applied TER of {ter*100:.2f}% to {asset_name}")
-
-            all_data.append(df)
+            all_data.append(read_msci_workbook(file_path))
         except Exception as e:
             logger.error(f"Error processing {os.path.basename(file_path)}: {e}")
 
-    if not all_data: return
+    if not all_data:
+        return pd.DataFrame()
+
+    # Workbooks end their months on the last business day; bucket them to
+    # month ends like every builder's output, so the panel has one row a month
+    return resample.last(pd.concat(all_data, axis=1, join='outer'), full=False)
 
-    combined = pd.concat(all_data, axis=1, join='outer')
-    combined.sort_index(inplace=True)
-    
-    # 2. Add Additional YFinance Assets
+def _as_columns(series):
+    return {series.name: series} if not series.empty else {}
+
+def build_yf_assets(source_dir):
+    """Additional YFinance assets (DGEIX backfilled with World ACWI IMI)."""
     logger.info("Fetching additional YFinance assets...")
+    columns = {}
     for name, ticker in YF_ASSETS.items():
         series = get_monthly_yf_data(ticker)
         
@@ -979,9 +982,10 @@ def process_files():
                     pdf['Date'] = pd.to_datetime(pdf['Date'], errors='coerce')
                     pdf.set_index('Date', inplace=True)
                     # Resample to monthly end
-                    p_series = pdf['Value'].resample('ME').last().ffill()
+                    p_series = resample.last(pdf['Value'], fill=True)
                     
                     start_date = series.first_valid_index()
+                    splice.record_pair('dgeix', p_series, series, start_date, 'MSCI ACWI IMI', 'DGEIX')
                     if start_date:
                         # Calculate returns
                         p_rets = p_series.pct_change().dropna()
@@ -998,75 +1002,11 @@ def process_files():
                 logger.error(f"Error backfilling DGEIX: {e}")
 
         if series.empty: continue
-        
-        # Apply TER if mapping exists
-        asset_key = name.replace('_usd', '')
-        if asset_key in TER_MAPPING:
-            ter = TER_MAPPING[asset_key]
-            monthly_ter = ter / 12
-            # Compute returns on valid data
-            rets = series.pct_change().fillna(0)
-            adj_rets = rets - monthly_ter
-            adj_rets.iloc[0] = 0
-            # Reconstruct series
-            series = series.iloc[0] * (1 + adj_rets).cumprod()
-            logger.info(f"  Applied TER of {ter*100:.2f}% to {name}")
-            
-        combined = combined.join(series.rename(name), how='outer')
-        # Standardize joining: ffill from start of asset to end of combined index if needed
-        # but only for these tracked indices/assets
-        combined[name] = combined[name].ffill()
-
-    # 3. Add DBMF Portfolio
-    df_dbmf = get_dbmf_portfolio()
-    if not df_dbmf.empty:
-        col = 'dbmf_usd'
-        ter = TER_MAPPING['dbmf']
-        monthly_ter = ter / 12
-        rets = df_dbmf.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_dbmf = df_dbmf.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to dbmf")
-        combined = combined.join(df_dbmf, how='outer')
-
-    # 4. Add NTSG Portfolio
-    df_ntsg = get_ntsg_portfolio()
-    if not df_ntsg.empty:
-        ter = TER_MAPPING['ntsg']
-        monthly_ter = ter / 12
-        rets = df_ntsg.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_ntsg = df_ntsg.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to ntsg")
-        combined = combined.join(df_ntsg, how='outer')
-
-    # 4.5 Add DEGC Portfolio
-    df_degc = get_degc_portfolio()
-    if not df_degc.empty:
-        ter = TER_MAPPING['degc']
-        monthly_ter = ter / 12
-        rets = df_degc.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_degc = df_degc.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to degc")
-        combined = combined.join(df_degc, how='outer')
-
-    # 6. Add EUR Government Bonds 10y
-    df_bonds = get_eur_bonds_10y_portfolio()
-    if not df_bonds.empty:
-        ter = TER_MAPPING['eur_government_bonds_10y']
-        monthly_ter = ter / 12
-        rets = df_bonds.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_bonds = df_bonds.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to eur_government_bonds_10y")
-        combined = combined.join(df_bonds.to_frame(), how='outer')
-
-    # 5. Add Gold Portfolio from CSV
+        columns[name] = series
+    return columns
+
+def build_gold(source_dir):
+    """Gold from the local CSV."""
     # https://www.macrotrends.net/1333/historical-gold-prices-100-year-chart
     logger.info("Reading gold.csv...")
     gold_csv_path = os.path.join(source_dir, "gold.csv")
@@ -1079,116 +1019,162 @@ def process_files():
             df_gold['Date'] = pd.to_datetime(df_gold['Date'])
             df_gold.set_index('Date', inplace=True)
             # Resample to month end
-            df_gold = df_gold['Value'].resample('ME').last().ffill()
-            
-            ter = TER_MAPPING['gold']
-            monthly_ter = ter / 12
-            rets = df_gold.pct_change().fillna(0)
-            adj_rets = rets - monthly_ter
-            adj_rets.iloc[0] = 0
-            df_gold = df_gold.iloc[0] * (1 + adj_rets).cumprod()
-            logger.info(f"  Applied TER of {ter*100:.2f}% to gold_usd")
-            combined = combined.join(df_gold.rename('gold_usd'), how='outer')
-            combined['gold_usd'] = combined['gold_usd'].ffill()
+            df_gold = resample.last(df_gold['Value'], fill=True)
+            return {'gold_usd': df_gold}
         except Exception as e:
             logger.error(f"Error processing gold.csv: {e}")
+    return {}
+
+def _ladder_name(country, bucket, ccy):
+    buckets = {"1_3y": "1-3y", "3_7y": "3-7y", "7_10y": "7-10y", "20y_plus": "20y+"}
+    return f"Synthetic {country.upper()} Government Bonds {buckets.get(bucket, bucket)} ({ccy.upper()})"
+
+def _is_ladder(name):
+    return name.startswith("Synthetic ") and " Government Bonds " in name
 
-    # 7. Add XEON Portfolio
+def build_bond_ladders(source_dir, start_date="1980-01-01"):
+    """
+    Synthetic government bond ladders of every curve, each bucket priced off
+    its own point of a curve from the short rate to the 10Y yield (shared
+    FRED downloads).
+    """
+    logger.info("Calculating synthetic bond ladders...")
+    countries = list(bonds.YIELD_SERIES)
+    yields = bonds.get_yield_matrix(countries, get_fred_series_raw)
+    yields = yields[yields.index >= start_date].dropna(how='all')
+    if yields.empty:
+        return {}
+    short_rates = bonds.get_short_rates(countries, get_fred_series_raw)
+    levels = bonds.ladder_indexes(yields, short_rates)
+    return {f"bond_ladder_{col.lower()}_{bonds.YIELD_CURRENCY[col.split('_')[0]]}": levels[col].dropna()
+            for col in levels.columns}
+
+def build_xeon(source_dir):
+    """XEON (EUR); its TER is already included in get_xeon_portfolio."""
     df_xeon = get_xeon_portfolio()
-    if not df_xeon.empty:
-        # Note: TER is already included in get_xeon_portfolio logic
-        combined = combined.join(df_xeon, how='outer')
-
-    # 8. Add Enhanced Commodity Portfolio
-    df_comm_enh = get_enhanced_commodity_portfolio()
-    if not df_comm_enh.empty:
-        ter = TER_MAPPING['commodity_enhanced']
-        monthly_ter = ter / 12
-        rets = df_comm_enh.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_comm_enh = df_comm_enh.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to commodity_enhanced_usd")
-        combined = combined.join(df_comm_enh, how='outer')
-
-    # 9. Add L&G Multi-Strategy Enhanced Commodities
-    df_lg = get_lg_multistrategy_portfolio()
-    if not df_lg.empty:
-        ter = TER_MAPPING['lg_commodity']
-        monthly_ter = ter / 12
-        rets = df_lg.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_lg = df_lg.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to lg_commodity_usd")
-        combined = combined.join(df_lg, how='outer')
-
-    # 10. Add Bloomberg Roll Select Commodity
-    df_roll = get_bloomberg_roll_select_portfolio()
-    if not df_roll.empty:
-        ter = TER_MAPPING['roll_select_commodity']
-        monthly_ter = ter / 12
-        rets = df_roll.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_roll = df_roll.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to roll_select_commodity_usd")
-        combined = combined.join(df_roll, how='outer')
-
-    # 12. Add UBS CMCI Composite Commodity
-    df_ubs = get_ubs_cmci_portfolio()
-    if not df_ubs.empty:
-        ter = TER_MAPPING['ubs_commodity']
-        monthly_ter = ter / 12
-        rets = df_ubs.pct_change()
-        adj_rets = rets - monthly_ter
-        adj_rets.iloc[0] = 0
-        df_ubs = df_ubs.iloc[0] * (1 + adj_rets).cumprod()
-        logger.info(f"  Applied TER of {ter*100:.2f}% to ubs_commodity_usd")
-        combined = combined.join(df_ubs, how='outer')
+    return {'xeon_eur': df_xeon['xeon_eur']} if not df_xeon.empty else {}
+
+# Builders of the non-MSCI columns, in column order. Each returns
+# {column: gross level series}; columns of FFILL_BUILDERS are carried forward
+# once joined. SOURCE_DEPENDENTS lists the builders that read a file in
+# source/, so a changed file only reruns those (see run_daemon).
+SERIES_BUILDERS = {
+    "yf_assets": build_yf_assets,
+    "dbmf": lambda source_dir: _as_columns(get_dbmf_portfolio()),
+    "ntsg": lambda source_dir: _as_columns(get_ntsg_portfolio()),
+    "degc": lambda source_dir: _as_columns(get_degc_portfolio()),
+    "eur_government_bonds_10y": lambda source_dir: _as_columns(get_eur_bonds_10y_portfolio()),
+    "gold": build_gold,
+    "xeon": build_xeon,
+    "commodity_enhanced": lambda source_dir: _as_columns(get_enhanced_commodity_portfolio()),
+    "lg_commodity": lambda source_dir: _as_columns(get_lg_multistrategy_portfolio()),
+    "roll_select_commodity": lambda source_dir: _as_columns(get_bloomberg_roll_select_portfolio()),
+    "ubs_commodity": lambda source_dir: _as_columns(get_ubs_cmci_portfolio()),
+    "bond_ladders": build_bond_ladders,
+}
+FFILL_BUILDERS = {"yf_assets", "gold"}
+# Builders published in their own currency on a sheet of their own, rather
+# than converted into every currency
+NATIVE_BUILDERS = {"bond_ladders"}
+# Builders that read local files in source/ rather than fetching (lineage kind 'manual')
+LOCAL_BUILDERS = {"gold"}
+SOURCE_DEPENDENTS = {
+    "world_acwi_imi.xlsx": ["yf_assets"],
+    "world.xlsx": ["ntsg"],
+    "gold.csv": ["gold"],
+}
+
+def build_series(source_dir, names=None):
+    """
+    Runs the given builders (default: all) -> {builder: {column: series}}.
+    A builder whose checkpoint still matches its code, source files and
+    fetched series is restored instead (pipeline/checkpoint.py), together
+    with the splice pairs and data-quality issues it registered. Failed or empty builds are not
+    checkpointed, so the next run retries them.
+    """
+    built = {}
+    for name, builder in SERIES_BUILDERS.items():
+        if names is not None and name not in names:
+            continue
+        node = f"build_{name}"
+        files = [os.path.join(source_dir, f) for f, deps in SOURCE_DEPENDENTS.items() if name in deps]
+        saved = checkpoint.restore(node, files)
+        if saved is not None:
+            built[name] = saved['columns']
+            splice.add_pairs(saved['pairs'])
+            quality.add_issues(saved['issues'])
+            continue
+        try:
+            with freshness.recording() as reads, splice.recording_pairs() as pairs, quality.recording_issues() as issues:
+                built[name] = builder(source_dir)
+        except Exception as e:
+            logger.error(f"Error building {name}: {e}")
+            built[name] = {}
+        if built[name]:
+            checkpoint.store(node, {'columns': built[name], 'pairs': pairs, 'issues': issues}, reads, files)
+        else:
+            checkpoint.discard(node)
+    return built
+
+def validate_built(built):
+    """Scans every builder column as one monthly matrix and applies the quality policy (pipeline/quality.py)."""
+    columns = {col: series for cols in built.values() for col, series in cols.items()}
+    if not columns:
+        return built
+    clean = quality.validate(pd.DataFrame(columns), 'monthly', source='monthly series')
+    return {name: {col: clean[col].dropna() for col in cols if col in clean.columns}
+            for name, cols in built.items()}
+
+def assemble_dataset(msci, built):
+    """
+    Net-of-fee, multi-currency, renamed month-end panel from the gross MSCI
+    levels and the builders' output. Returns (panel, sheet_of, data_cols,
+    lineage), lineage being the per-cell source ids and their legend.
+    """
+    combined = msci
+    gross = {col: series for name in SERIES_BUILDERS if name not in NATIVE_BUILDERS
+             for col, series in built.get(name, {}).items()}
+    local_cols = list(msci.columns) + [col for name in LOCAL_BUILDERS for col in built.get(name, {})]
+    ffill_cols = {col for name in FFILL_BUILDERS for col in built.get(name, {})}
+
+    # 12.2 Deduct TER schedules from every asset in one broadcast, from each
+    # fund's inception on, then join the net series in order (XEON is net of
+    # its fee from its ETF prices)
+    panel = pd.concat([combined] + [series.rename(name) for name, series in gross.items()], axis=1, sort=True)
+    fee_assets = [fx.split_currency(c, FX_CURRENCIES)[0] for c in panel.columns]
+    fee_assets = [a if a != 'xeon' else None for a in fee_assets]
+    schedules = fees.with_inceptions(TER_SCHEDULES, splice.inceptions())
+    panel = fees.net_of_fees(panel, fees.fee_matrix(schedules, panel.index, fee_assets))
+    charged = sorted({a for a in fee_assets if schedules.get(a)})
+    logger.info(f"Applied TER schedules to {len(charged)} assets")
+
+    combined = panel[combined.columns].dropna(how='all')
+    for name in gross:
+        combined = combined.join(panel[name].dropna(), how='outer')
+        if name in ffill_cols:
+            combined[name] = combined[name].ffill()
 
     # 13. Fetch Exchange Rates and convert columns
     logger.info("Fetching exchange rates (FRED + YFinance fallback)...")
     try:
-        fx_fred = pdr.get_data_fred('DEXUSEU', start="1999-01-01")['DEXUSEU']
-        dem_usd = get_fred_series_raw("EXGEUS", "Rate")
-        if not dem_usd.empty:
-            synthetic_eur_usd = 1.95583 / dem_usd['Rate']
-            fx_fred = fx_fred.combine_first(synthetic_eur_usd)
-            
-        fx_yf = get_monthly_yf_data("EURUSD=X", start_date="2025-01-01")
-        fx_rates = fx_fred.combine_first(fx_yf).ffill()
-        full_idx = combined.index.union(fx_rates.index).sort_values()
-        fx_rates = fx_rates.reindex(full_idx).ffill().reindex(combined.index)
-        
+        fx_matrix = fx.get_fx_matrix(FX_CURRENCIES, get_fred_series_raw, get_monthly_yf_data)
         logger.info("Calculating cross-currency columns...")
-        for col in list(combined.columns):
-            if col in ['xeon_usd', 'xeon_eur']: continue # Skip local versions
-            if col.endswith('_usd'):
-                combined[col.replace('_usd', '_eur')] = combined[col] / fx_rates
-            elif col.endswith('_eur'):
-                combined[col.replace('_eur', '_usd')] = combined[col] * fx_rates
-            else:
-                combined[f"{col}_eur"] = combined[col] / fx_rates
+        combined = fx.convert_panel(combined, fx_matrix)
     except Exception as e: logger.warning(f"Warning FX: {e}")
 
-    norm_targets = ['eur_government_bonds_10y_usd', 'eur_government_bonds_10y_eur',
-                    'xeon_usd', 'xeon_eur',
-                    'dbmf_usd', 'dbmf_eur',
-                    'ntsg_usd', 'ntsg_eur',
-                    'degc_usd', 'degc_eur',
-                    'dgeix_usd', 'dgeix_eur',
-                    'dfemx_usd', 'dfemx_eur']
-    for col in norm_targets:
-        if col in combined.columns:
+    norm_assets = ['eur_government_bonds_10y', 'xeon', 'dbmf', 'ntsg', 'degc', 'dgeix', 'dfemx']
+    for col in combined.columns:
+        base, ccy = fx.split_currency(col, FX_CURRENCIES)
+        if base in norm_assets and col != base:
             f_idx = combined[col].first_valid_index()
             if f_idx is not None:
                 fv = combined.loc[f_idx, col]
                 if fv != 0: combined[col] = (combined[col] / fv) * 100
 
     # 9. Exclude component columns
-    to_drop = ['japan', 'uk', 'pacific', 'switzerland', 'japan_eur', 'uk_eur', 'pacific_eur', 'switzerland_eur']
-    combined = combined.drop(columns=[c for c in to_drop if c in combined.columns])
+    components = ['japan', 'uk', 'pacific', 'switzerland']
+    combined = combined.drop(columns=[c for c in combined.columns
+                                      if fx.split_currency(c, FX_CURRENCIES)[0] in components])
 
     # 10. Header Renaming
     base_mapping = {
@@ -1222,29 +1208,296 @@ def process_files():
     }
     
     rena = {}
+    sheet_of = {}
     for col in combined.columns:
         if col == 'Date': continue
-        found = False
-        for k, v in base_mapping.items():
-            if col == k or col == f"{k}_usd":
-                rena[col] = f"{v} (USD)"; found = True; break
-            elif col == f"{k}_eur":
-                rena[col] = f"{v} (EUR)"; found = True; break
-        if not found: rena[col] = col.replace('_', ' ').title()
+        base, ccy = fx.split_currency(col, FX_CURRENCIES)
+        if base in base_mapping:
+            rena[col] = f"{base_mapping[base]} ({ccy.upper()})"
+        else:
+            rena[col] = col.replace('_', ' ').title()
+        # Currencies the app understands go to the main sheet, the rest get their own
+        sheet_of[rena[col]] = 'Data' if ccy in PUBLISHED_CURRENCIES else ccy.upper()
+    # Which source (proxy, live series or local file) every value comes from
+    assets = {col: fx.split_currency(col, FX_CURRENCIES)[0] for col in combined.columns}
+    local = {fx.split_currency(col, FX_CURRENCIES)[0] for col in local_cols}
+    kinds = {col: 'manual' if asset in local else 'live' for col, asset in assets.items()}
+    ids, legend = splice.lineage(combined, assets, kinds)
+
+    # Bond ladders (1-3y ... 20y+ per curve) go on the Bonds sheet as they are
+    native = {col: series for name in NATIVE_BUILDERS for col, series in built.get(name, {}).items()}
+    if native:
+        combined = combined.join(pd.DataFrame(native), how='left')
+        for col in native:
+            base, ccy = fx.split_currency(col, FX_CURRENCIES)
+            country, bucket = base[len('bond_ladder_'):].split('_', 1)
+            rena[col] = _ladder_name(country, bucket, ccy)
+            sheet_of[rena[col]] = 'Bonds'
+
     combined.rename(columns=rena, inplace=True)
+    ids.rename(columns=rena, inplace=True)
+    data_cols = [c for c in combined.columns if sheet_of.get(c) == 'Data']
 
-    # 11. Final Formatting
-    combined.index = combined.index + pd.offsets.MonthEnd(0)
-    combined = combined.sort_index().groupby(combined.index).last()
-    combined.reset_index(inplace=True)
-    combined.rename(columns={'index': 'Date'}, inplace=True)
-    combined['Date'] = combined['Date'].dt.strftime('%Y-%m-%d')
-    
-    writer = pd.ExcelWriter(output_file, engine='xlsxwriter')
-    combined.to_excel(writer, index=False, sheet_name='Data')
-    writer.sheets['Data'].freeze_panes(1, 1)
-    writer.close()
-    logger.info(f"Success! Final Shape: {combined.shape}")
+    return combined, sheet_of, data_cols, (ids, legend)
+
+def _sheets(columns, sheet_of):
+    """Columns of each output sheet, Data first."""
+    return {sheet: [c for c in columns if sheet_of.get(c) == sheet]
+            for sheet in dict.fromkeys(['Data'] + list(sheet_of.values()))}
+
+def _export_base(sheet):
+    name = 'alphatrace_data' if sheet == 'Data' else f"alphatrace_data_{sheet.lower()}"
+    return os.path.join('reports', name)
+
+def output_files(sheet_of, export_formats=(), lineage=None):
+    """Every file write_outputs publishes (the reports under reports/ are only written when non-empty)."""
+    files = ['alphatrace_data.xlsx', 'alphatrace_data.ragged.json', 'alphatrace_manifest.json',
+             'alphatrace_delta.json', 'alphatrace_drawdowns.json', 'alphatrace_correlations.json']
+    if lineage is not None:
+        files.append('alphatrace_lineage.json')
+    for sheet in _sheets((), sheet_of):
+        files += [f"{_export_base(sheet)}.{writers.EXTENSIONS.get(fmt, fmt)}" for fmt in export_formats]
+    return files
+
+def write_outputs(combined, sheet_of, data_cols, export_formats=(), lineage=None):
+    """Side tables, splice report, delta, history and the workbook (cwd = public/)."""
+    output_file = 'alphatrace_data.xlsx'
+
+    # 12.5 Splice-quality report (proxy vs actual over their overlap)
+    try:
+        splice.write_splice_report(os.path.join("reports", "splice_quality.csv"))
+    except Exception as e:
+        logger.error(f"Error writing splice report: {e}")
+
+    # 12.6 Data-quality issues found in this run's daily and monthly series
+    try:
+        quality.write_report(os.path.join("reports", "data_quality.csv"))
+    except Exception as e:
+        logger.error(f"Error writing data-quality report: {e}")
+
+    # 12.7 Per-cell source ids (proxy / live / local file) of the published columns
+    if lineage is not None:
+        try:
+            ids, legend = lineage
+            splice.write_lineage(ids[data_cols], legend, 'alphatrace_lineage.json')
+        except Exception as e:
+            logger.error(f"Error writing lineage: {e}")
+
+    # 12. Drawdown / recovery side table (precomputed for the client charts),
+    # computed on the ragged layout so pre-inception padding isn't scanned
+    try:
+        drawdowns.write_drawdown_table(ragged.RaggedPanel.from_panel(combined[data_cols]), 'alphatrace_drawdowns.json')
+    except Exception as e:
+        logger.error(f"Error writing drawdown table: {e}")
+
+    # 13. Standard-window correlation matrices (3y/5y/10y/max)
+    try:
+        correlation.write_correlation_windows(combined[data_cols], 'alphatrace_correlations.json')
+    except Exception as e:
+        logger.error(f"Error writing correlation windows: {e}")
+
+    # 13.4 The published values at the storage precision (--precision),
+    # quantized once here and written as they are (quantized=True); the side
+    # tables above are analytics and keep full precision
+    stored = precision.quantize(combined)
+
+    # 13.5 Per-column versions and a delta against the published dataset
+    # (alphatrace_data.json is rebuilt from the workbook at build time, so
+    # the values are compared as the workbook carries them)
+    try:
+        delta.publish_delta(precision.as_text(stored[data_cols]), 'alphatrace_data.json',
+                            'alphatrace_manifest.json', 'alphatrace_delta.json')
+    except Exception as e:
+        logger.error(f"Error writing dataset delta: {e}")
+
+    # 13.6 Append this run's columns to the versioned history store
+    try:
+        history.record_run(stored)
+    except Exception as e:
+        logger.error(f"Error recording dataset history: {e}")
+
+    # 14. Stream the sheets out in row chunks (xlsxwriter constant_memory),
+    # plus optional CSV / Parquet exports of each sheet under reports/
+    sheets = _sheets(combined.columns, sheet_of)
+    writers.write_xlsx(stored, output_file, sheets, quantized=True)
+    # The published columns without their NaN padding (pipeline/ragged.py)
+    writers.write_ragged(stored, 'alphatrace_data.ragged.json', data_cols, quantized=True)
+    if export_formats:
+        os.makedirs('reports', exist_ok=True)
+        for sheet, cols in sheets.items():
+            writers.export_panel(stored, _export_base(sheet), export_formats, cols, quantized=True)
+    logger.info(f"Success! Final Shape: {(len(combined), len(data_cols) + 1)}")
+
+def process_files(export_formats=()):
+    """
+    Builders, then the assembled panel, then the outputs; each step is
+    checkpointed (pipeline/checkpoint.py), so a rerun after an interrupted or
+    unchanged run only recomputes the steps whose inputs changed.
+    """
+    logger.info("Starting Data Processing...")
+    splice.clear_pairs()
+    quality.clear_issues()
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(base_path)
+    source_dir = os.path.join(base_path, "source")
+
+    workbooks = msci_workbooks(source_dir)
+    if not workbooks:
+        logger.warning(f"No Excel files found in {source_dir}.")
+        return
+
+    # Due FRED series download in the background while the builders run
+    with sources.prefetch_due():
+        built = validate_built(build_series(source_dir))
+    throttle.report()
+
+    inputs = {name: checkpoint.digest(f"build_{name}") for name in SERIES_BUILDERS}
+    assembled = checkpoint.restore("assemble", workbooks, inputs)
+    if assembled is None:
+        msci = load_msci_sources(source_dir)
+        if msci.empty: return
+        with freshness.recording() as reads:
+            assembled = assemble_dataset(msci, built)
+        checkpoint.store("assemble", assembled, reads, workbooks, inputs)
+    combined, sheet_of, data_cols, lineage = assembled
+
+    outputs = output_files(sheet_of, export_formats, lineage)
+    inputs = {'assemble': checkpoint.digest("assemble"), 'export': sorted(export_formats),
+              'precision': precision.STORAGE}
+    if checkpoint.restore("outputs", outputs, inputs) is None:
+        write_outputs(combined, sheet_of, data_cols, export_formats, lineage)
+        # A side table that failed to write gets retried on the next run
+        if all(os.path.exists(f) for f in outputs):
+            checkpoint.store("outputs", True, (), outputs, inputs)
+        else:
+            checkpoint.discard("outputs")
+    else:
+        logger.info(f"Outputs are up to date. Final Shape: {(len(combined), len(data_cols) + 1)}")
+
+def run_daemon(interval=3600, port=8765, export_formats=()):
+    """
+    Keeps the dataset fresh from one long-running process. Workbooks, built
+    series and download memos stay in memory between builds: a scheduled
+    build (every `interval` seconds) clears the download memos and reruns
+    every builder, with the freshness catalog deciding what actually goes to
+    the network; a changed file in source/ only re-reads that file and reruns
+    the builders in SOURCE_DEPENDENTS. Status is served on
+    http://127.0.0.1:<port>/status.
+    """
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(base_path)
+    source_dir = os.path.join(base_path, "source")
+    state = {'built': {}}
+
+    def publish(msci, names):
+        if msci.empty:
+            raise RuntimeError(f"No MSCI workbooks in {source_dir}")
+        with sources.prefetch_due() if names is None else contextlib.nullcontext():
+            state['built'].update(build_series(source_dir, names))
+        throttle.report()
+        quality.clear_issues('monthly series')  # rescanned below
+        combined, sheet_of, data_cols, lineage = assemble_dataset(msci, validate_built(state['built']))
+        write_outputs(combined, sheet_of, data_cols, export_formats, lineage)
+        return {'rows': len(combined), 'columns': len(data_cols),
+                'builders': sorted(names) if names is not None else 'all'}
+
+    def full_build():
+        splice.clear_pairs()
+        quality.clear_issues()
+        bars._MEMO.clear()
+        bonds._SERIES_CACHE.clear()
+        fx._FX_CACHE.clear()
+        return publish(load_msci_sources(source_dir), None)
+
+    def incremental_build(changed):
+        names = {b for f in changed for b in SOURCE_DEPENDENTS.get(f, [])}
+        stats = publish(load_msci_sources(source_dir), names)
+        stats['changed'] = changed
+        return stats
+
+    daemon.run(full_build, incremental_build, source_dir, interval=interval, port=port)
+
+def bench_service(port=8766, requests=20000, concurrency=32):
+    """Load-tests a running query service with a mix of slice queries."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/columns") as response:
+        columns = list(json.load(response)['columns'])
+    assets = sorted({c.rsplit(' (', 1)[0] for c in columns})
+    paths = ['/series?ccy=usd', '/series?ccy=eur&from=2000-01', '/series?format=bin']
+    for i, asset in enumerate(assets):
+        query = urllib.parse.urlencode({'assets': asset, 'from': f"{1990 + i % 20}-01", 'to': '2024-12'})
+        paths.append(f"/series?{query}")
+    logger.info(f"Benchmarking {len(paths)} distinct queries, {concurrency} connections...")
+    service.load_test(paths, requests, concurrency, port=port)
+    service.load_test(paths, requests, concurrency, port=port, etag_ratio=1.0)
+
+def bench_storage(run=None):
+    """Size, load time and error of every storage precision on a recorded dataset run."""
+    runs = history.list_runs()
+    if runs.empty:
+        logger.error("No dataset run recorded yet; run process.py first.")
+        return pd.DataFrame()
+    run = run or runs['run'].iloc[-1]
+    stored_as = history.run_precision(run)
+    if stored_as != 'float64':
+        logger.warning(f"Run {run} was stored at {stored_as}; errors are measured against that, not float64.")
+    panel = history.as_of(run=run)
+    logger.info(f"Storage precisions on run {run} ({panel.shape[0]}x{panel.shape[1]}):")
+    return precision.benchmark(panel)
 
 if __name__ == "__main__":
-    process_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the AlphaTrace dataset.")
+    parser.add_argument("--calibrate-ntsg", action="store_true",
+                        help="rank NTSG proxy parameters by tracking error against the live ETF")
+    parser.add_argument("--search-proxies", action="store_true",
+                        help="rank candidate backfill proxies for the spliced assets")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for large grids")
+    parser.add_argument("--as-of", metavar="WHEN", default=None,
+                        help="export the dataset as the last run at or before WHEN (UTC) produced it")
+    parser.add_argument("--run", default=None, help="with --as-of, pick this run id instead")
+    parser.add_argument("--refresh", action="store_true",
+                        help="refetch every series, even those not due yet")
+    parser.add_argument("--freshness", action="store_true",
+                        help="show the freshness catalog (last observation, last check, next due)")
+    parser.add_argument("--export", nargs="+", default=[], choices=sorted(writers.WRITERS),
+                        help="also write each sheet to reports/ in these formats")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running: rebuild on source/ changes and every --interval seconds")
+    parser.add_argument("--interval", type=float, default=3600, metavar="SECONDS",
+                        help="with --daemon, seconds between scheduled full builds")
+    parser.add_argument("--port", type=int, default=8765, help="port of the --daemon status endpoint or the --serve query service")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="ignore checkpoints of earlier runs and recompute every step")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve dataset slices (/series?assets=&from=&to=&ccy=) from the history store")
+    parser.add_argument("--bench", type=int, metavar="REQUESTS", default=None,
+                        help="load-test a running --serve instance on --port")
+    parser.add_argument("--precision", choices=precision.PRECISIONS, default=precision.STORAGE,
+                        help="storage precision of the published values: float64, float32 or "
+                             "bp (int32 returns in bp x 100, rebuilt exactly)")
+    parser.add_argument("--bench-storage", action="store_true",
+                        help="compare size, load time and error of every --precision on the latest run (or --run)")
+    args = parser.parse_args()
+    freshness.FORCE_REFRESH = args.refresh
+    checkpoint.ENABLED = not args.no_resume
+    precision.STORAGE = args.precision
+
+    if args.freshness:
+        catalog = freshness.report()
+        print(catalog[['cadence', 'last_obs', 'last_check', 'misses', 'next_due', 'due']].to_string()
+              if not catalog.empty else "Freshness catalog is empty.")
+    elif args.bench_storage:
+        bench_storage(run=args.run)
+    elif args.calibrate_ntsg:
+        calibrate_ntsg(workers=args.workers)
+    elif args.as_of or args.run:
+        export_as_of(when=args.as_of, run=args.run, export_formats=args.export)
+    elif args.search_proxies:
+        search_proxies(workers=args.workers)
+    elif args.serve:
+        service.serve(port=args.port)
+    elif args.bench:
+        bench_service(port=args.port, requests=args.bench)
+    elif args.daemon:
+        run_daemon(interval=args.interval, port=args.port, export_formats=args.export)
+    else:
+        process_files(export_formats=args.export)
\ No newline at end of file
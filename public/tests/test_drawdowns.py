@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import drawdowns, ragged  # noqa: E402
+
+DATES = pd.date_range('2000-01-31', periods=12, freq='ME')
+
+
+def reference(panel):
+    """Column-by-column pandas version of compute_drawdowns."""
+    drawdown = panel / panel.cummax() - 1
+    episodes, underwater = [], {}
+    for asset in panel.columns:
+        s = panel[asset].dropna()
+        peak, start, trough, ep = None, None, None, None
+        streak = longest = n_under = 0
+        for date, v in s.items():
+            if peak is None or v > peak:
+                if ep is not None:
+                    episodes.append(dict(ep, recovery=date, ongoing=False))
+                peak, start, ep, streak = v, date, None, 0
+            elif v < peak:
+                n_under += 1
+                streak += 1
+                longest = max(longest, streak)
+                if ep is None or v < ep['low']:
+                    ep = {'asset': asset, 'start': start, 'trough': date, 'low': v, 'depth': 1 - v / peak}
+            else:
+                streak = 0
+        if ep is not None:
+            episodes.append(dict(ep, recovery=s.index[-1], ongoing=True))
+        underwater[asset] = {'pct_months': n_under / (len(s) - 1) if len(s) > 1 else 0.0,
+                             'longest_streak_months': longest}
+    episodes = pd.DataFrame(episodes, columns=['asset', 'start', 'trough', 'recovery', 'depth', 'ongoing'])
+    start, recovery = episodes['start'].dt.to_period('M'), episodes['recovery'].dt.to_period('M')
+    episodes.insert(5, 'months', (recovery.dt.year - start.dt.year) * 12 + recovery.dt.month - start.dt.month)
+    return drawdown, episodes, pd.DataFrame(underwater).T.astype({'longest_streak_months': 'int64'})
+
+
+def check(panel):
+    expected = reference(panel)
+    for data in (panel, ragged.RaggedPanel.from_panel(panel)):
+        dd, episodes, underwater = drawdowns.compute_drawdowns(data)
+        pd.testing.assert_frame_equal(dd.to_panel(), expected[0], check_freq=False)
+        pd.testing.assert_frame_equal(episodes, expected[1], check_dtype=False)
+        pd.testing.assert_frame_equal(underwater, expected[2], check_dtype=False)
+
+
+@pytest.mark.parametrize('columns', [
+    # empty leading and trailing columns
+    {'lead': [np.nan] * 12, 'a': [1, 2, 1.5, 2.5, 2, 3, 3, 2, 3.5, 3, 4, 4], 'trail': [np.nan] * 12},
+    # a late start, a gap inside the column and an early end
+    {'late': [np.nan] * 5 + [10, 9, np.nan, 8, 11, np.nan, np.nan], 'a': list(range(1, 13))},
+    # never recovers after its first peak
+    {'down': [5, 4, 3, 4, 4.5, 2, 2.5, 3, 3, 4, 4.9, 4.8], 'flat': [1.0] * 12},
+])
+def test_matches_pandas(columns):
+    check(pd.DataFrame(columns, index=DATES, dtype='float64'))
+
+
+def test_random_panels():
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('1990-01-31', periods=240, freq='ME')
+    for _ in range(20):
+        v = 100 * np.cumprod(1 + rng.normal(0.002, 0.05, (240, 12)), axis=0)
+        for j in range(12):
+            lo, hi = sorted(rng.integers(0, 240, 2))
+            v[:lo, j] = np.nan
+            if rng.random() < 0.3:
+                v[hi:, j] = np.nan
+            v[rng.integers(0, 240, 8), j] = np.nan
+        v[:, rng.integers(0, 12)] = np.nan
+        check(pd.DataFrame(v, index=dates))
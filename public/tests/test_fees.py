@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import fees  # noqa: E402
+
+DATES = pd.date_range('2018-10-31', periods=12, freq='ME')
+
+
+def test_no_fee_before_first_step():
+    schedules = {'fund': [('2019-05-31', 0.0075), ('2019-08-31', 0.0060)], 'old': [(None, 0.0012)]}
+    matrix = fees.fee_matrix(schedules, DATES, ['fund', 'old', None, 'unknown'])
+    expected = np.zeros((12, 4))
+    expected[7:10, 0] = 0.0075 / 12
+    expected[10:, 0] = 0.0060 / 12
+    expected[:, 1] = 0.0012 / 12
+    np.testing.assert_allclose(matrix, expected)
+
+
+def test_with_inceptions():
+    schedules = {'proxied': [(None, 0.0075)], 'cut': [(None, 0.0030), ('2019-01-31', 0.0025), ('2019-06-30', 0.0020)],
+                 'dated': [('2019-09-30', 0.0040)], 'plain': [(None, 0.0012)]}
+    inceptions = {'proxied': pd.Timestamp('2019-05-31'), 'cut': pd.Timestamp('2019-03-31'),
+                  'dated': pd.Timestamp('2019-02-28'), 'absent': pd.Timestamp('2019-02-28')}
+    out = fees.with_inceptions(schedules, inceptions)
+    assert out['proxied'] == [(pd.Timestamp('2019-05-31'), 0.0075)]
+    assert out['cut'] == [(pd.Timestamp('2019-03-31'), 0.0025), (pd.Timestamp('2019-06-30'), 0.0020)]
+    assert out['dated'] == [(pd.Timestamp('2019-09-30'), 0.0040)]
+    assert out['plain'] == schedules['plain'] and 'absent' not in out
+    matrix = fees.fee_matrix(out, DATES, ['proxied', 'cut'])
+    assert (matrix[:7, 0] == 0).all() and (matrix[7:, 0] == 0.0075 / 12).all()
+    assert (matrix[:5, 1] == 0).all() and (matrix[5:8, 1] == 0.0025 / 12).all() and (matrix[8:, 1] == 0.0020 / 12).all()
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import bars, freshness, locks  # noqa: E402
+
+pytestmark = pytest.mark.skipif(locks.fcntl is None, reason="no advisory locks on this platform")
+fork = multiprocessing.get_context('fork')
+
+
+def increment(path, times):
+    for _ in range(times):
+        with locks.file_lock(path):
+            with open(path) as fh:
+                value = int(fh.read())
+            time.sleep(0.002)
+            with locks.atomic_write(path) as fh:
+                fh.write(str(value + 1))
+
+
+def test_lock_serializes_processes(tmp_path):
+    path = str(tmp_path / 'counter')
+    with open(path, 'w') as fh:
+        fh.write('0')
+    workers = [fork.Process(target=increment, args=(path, 25)) for _ in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(30)
+        assert w.exitcode == 0
+    with open(path) as fh:
+        assert fh.read() == '50'
+
+
+def test_lock_timeout_and_shared(tmp_path):
+    path = str(tmp_path / 'data')
+    with locks.file_lock(path, shared=True), locks.file_lock(path, shared=True, timeout=0.1):
+        with pytest.raises(TimeoutError):
+            with locks.file_lock(path, timeout=0.1):
+                pass
+    with locks.file_lock(path, timeout=0.1):
+        pass
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / 'data.json')
+    with locks.atomic_write(path) as fh:
+        fh.write('old')
+    with pytest.raises(RuntimeError):
+        with locks.atomic_write(path) as fh:
+            fh.write('partial')
+            raise RuntimeError("interrupted")
+    with open(path) as fh:
+        assert fh.read() == 'old'
+    assert os.listdir(tmp_path) == ['data.json']
+
+
+def fetch_shared_key(cache_dir, log, start, results):
+    bars.CACHE_DIR = cache_dir
+    freshness._CATALOG = None
+
+    def fetch():
+        with open(log, 'a') as fh:
+            fh.write(f"{os.getpid()}\n")
+        time.sleep(0.3)
+        return pd.Series([1.0, 2.0, 3.0], index=pd.date_range('2024-01-31', periods=3, freq='ME'))
+
+    start.wait()
+    series = freshness.cached_series('test:KEY', fetch, cadence='monthly')
+    results.put(series.tolist())
+
+
+def test_two_processes_fetch_same_key_once(tmp_path, monkeypatch):
+    cache_dir, log = str(tmp_path / 'cache'), str(tmp_path / 'fetches')
+    start, results = fork.Barrier(2), fork.Queue()
+    workers = [fork.Process(target=fetch_shared_key, args=(cache_dir, log, start, results)) for _ in range(2)]
+    for w in workers:
+        w.start()
+    got = [results.get(timeout=30) for _ in workers]
+    for w in workers:
+        w.join(30)
+        assert w.exitcode == 0
+    assert got == [[1.0, 2.0, 3.0]] * 2
+    with open(log) as fh:
+        assert len(fh.read().split()) == 1
+    series_dir = os.path.join(cache_dir, 'series')
+    assert sorted(os.listdir(series_dir)) == ['test_KEY.csv', 'test_KEY.csv.lock']
+    monkeypatch.setattr(bars, 'CACHE_DIR', cache_dir)
+    monkeypatch.setattr(freshness, '_CATALOG', None)
+    assert 'test:KEY' in freshness.load_catalog()
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import precision  # noqa: E402
+
+
+def reference(values):
+    """Cell-by-cell 'bp' codes and rebuilt levels of a (rows x columns) block."""
+    codes = np.full(values.shape, precision.MISSING, dtype=np.int32)
+    levels = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        prev = None
+        for i, v in enumerate(values[:, j]):
+            if np.isnan(v):
+                continue
+            if prev is None:
+                codes[i, j], prev = 0, v
+            else:
+                codes[i, j] = round((v / prev - 1) * precision.RETURN_SCALE)
+                prev = prev * (1 + int(codes[i, j]) / precision.RETURN_SCALE)
+            levels[i, j] = prev
+    return codes, levels
+
+
+def panel(seed, rows=180, columns=8):
+    rng = np.random.default_rng(seed)
+    values = 100 * np.cumprod(1 + rng.normal(0.004, 0.05, (rows, columns)), axis=0)
+    for j in range(columns):
+        lo, hi = sorted(rng.integers(0, rows, 2))
+        values[:lo, j] = np.nan
+        values[hi:, j] = np.nan if rng.random() < 0.3 else values[hi:, j]
+        values[rng.integers(0, rows, 5), j] = np.nan
+    values[:, rng.integers(0, columns)] = np.nan
+    return values
+
+
+def test_codec_matches_cell_by_cell_rebuild():
+    for seed in range(10):
+        values = panel(seed)
+        codes, levels = reference(values)
+        encoder = precision.ReturnCodec(values.shape[1])
+        chunks = np.split(np.arange(len(values)), [1, 40, 41, 120])
+        got = np.vstack([encoder.encode(values[rows]) for rows in chunks])
+        np.testing.assert_array_equal(got, codes)
+        decoder = precision.ReturnCodec(values.shape[1], encoder.anchors.copy())
+        rebuilt = np.vstack([decoder.decode(codes[rows]) for rows in chunks])
+        np.testing.assert_array_equal(rebuilt, levels)
+        # Within half a step (of the previous rebuilt level) of every value
+        previous = pd.DataFrame(levels).ffill().shift().to_numpy()
+        error = np.abs(rebuilt - values) / previous
+        assert np.nanmax(error) <= 0.5 / precision.RETURN_SCALE * (1 + 1e-9)
+
+
+def test_block_round_trip():
+    values = panel(42)
+    stored = precision.quantize(pd.DataFrame(values), 'bp').to_numpy()
+    raw = precision.encode_block(stored, 'bp')
+    np.testing.assert_array_equal(precision.decode_block(raw, *values.shape, 'bp'), stored)
+
+
+def test_text_digits():
+    values = np.array([[123.456789012, np.nan], [0.000123456789, 98765432.1], [-7.0, 0.0]])
+    text = precision.text_values(values, 'bp')
+    assert [str(v) for v in text.ravel()] == ['123.4568', 'nan', '0.0001234568', '98765430.0', '-7.0', '0.0']
+    np.testing.assert_array_equal(precision.text_values(values, 'float64'), values)
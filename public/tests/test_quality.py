@@ -0,0 +1,40 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import quality  # noqa: E402
+
+
+def daily_bars():
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    rng = np.random.default_rng(3)
+    levels = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 2)), axis=0))
+    levels[150, 0] *= 1.8  # bad tick
+    return pd.DataFrame(levels, index=dates, columns=['AAA', 'BBB'])
+
+
+def test_recorded_issues_survive_a_checkpoint(tmp_path):
+    quality.clear_issues()
+    quality.validate(daily_bars()[['AAA']], 'daily', source='earlier')
+    with quality.recording_issues() as issues:
+        quality.validate(daily_bars(), 'daily', source='daily bars')
+    assert len(issues) == 1 and set(issues[0]['source']) == {'daily bars'}
+    assert ('AAA', 'spike') in set(zip(issues[0]['series'], issues[0]['check']))
+    found = quality.write_report(str(tmp_path / 'first.csv'))
+
+    # A rerun restores the builder from its checkpoint instead of validating again
+    saved = pickle.loads(pickle.dumps({'issues': issues}))
+    quality.clear_issues()
+    quality.validate(daily_bars()[['AAA']], 'daily', source='earlier')
+    quality.add_issues(saved['issues'])
+    pd.testing.assert_frame_equal(quality.write_report(str(tmp_path / 'restored.csv')), found)
+
+    # A rebuilt builder reporting the same issues doesn't duplicate them
+    quality.validate(daily_bars(), 'daily', source='daily bars')
+    pd.testing.assert_frame_equal(quality.write_report(str(tmp_path / 'both.csv')), found)
+    quality.clear_issues()
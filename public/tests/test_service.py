@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import history, service  # noqa: E402
+
+DATES = pd.date_range('2020-01-31', periods=6, freq='ME')
+
+
+def panel(b_last=6.0):
+    return pd.DataFrame({'A (USD)': [1.0, 2, 3, 4, 5, 6],
+                         'B (USD)': [np.nan, 2, 3, 4, 5, b_last]}, index=DATES)
+
+
+def make_service(tmp_path, max_cached=service.MAX_CACHED):
+    store_dir = str(tmp_path)
+    history.record_run(panel(), store=store_dir, precision='float64')
+    return service.QueryService(service.Store(store_dir), max_cached)
+
+
+def test_not_modified(tmp_path):
+    svc = make_service(tmp_path)
+    status, _, body, etag = svc.handle('GET', '/series?assets=a', {})
+    assert status == 200 and json.loads(body)['version'] == etag.strip('"')
+    status, _, body, again = svc.handle('GET', '/series?assets=a', {'if-none-match': etag})
+    assert (status, body, again) == (304, b'', etag)
+    assert svc.stats['not_modified'] == 1
+
+
+def test_unselected_column_keeps_etag_and_bytes(tmp_path):
+    svc = make_service(tmp_path)
+    _, _, body_a, etag_a = svc.handle('GET', '/series?assets=a', {})
+    _, _, body_b, etag_b = svc.handle('GET', '/series?assets=b', {})
+    history.record_run(panel(b_last=7.0), store=str(tmp_path), precision='float64')
+    svc.store.reload()
+    _, _, body, etag = svc.handle('GET', '/series?assets=a', {})
+    assert (body, etag) == (body_a, etag_a)
+    _, _, body, etag = svc.handle('GET', '/series?assets=b', {})
+    assert etag != etag_b and body != body_b
+
+
+def test_lru_drops_least_recent(tmp_path):
+    svc = make_service(tmp_path, max_cached=2)
+    for query in ('assets=a', 'assets=b', 'assets=a', 'ccy=usd'):
+        svc.handle('GET', f'/series?{query}', {})
+    assert svc.stats['hits'] == 1
+    assert [key[1] for key in svc.cache] == ['assets=a', 'ccy=usd']
+    svc.handle('GET', '/series?assets=b', {})
+    assert svc.stats['hits'] == 1
+
+
+def test_request_body_is_skipped_on_keep_alive(tmp_path):
+    svc = make_service(tmp_path)
+
+    async def exchange():
+        server = await asyncio.start_server(
+            lambda r, w: service._serve_connection(svc, r, w), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"POST /series HTTP/1.1\r\nContent-Length: 11\r\n\r\nhello world"
+                     b"GET /health HTTP/1.1\r\n\r\n")
+        statuses = []
+        for _ in range(2):
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            statuses.append(int(head.split(' ', 2)[1]))
+            length = int(head.lower().split('content-length:')[1].split('\r\n')[0])
+            await reader.readexactly(length)
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return statuses
+
+    assert asyncio.run(exchange()) == [405, 200]
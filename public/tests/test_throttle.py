@@ -0,0 +1,103 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import throttle  # noqa: E402
+
+
+class Clock:
+    """Stands in for the time module: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, 'time', clock)
+    monkeypatch.setattr(throttle, '_HOSTS', {})
+    monkeypatch.setitem(throttle.HOSTS, 'test', {"rate": 2.0, "min_rate": 0.5, "max_rate": 8.0, "burst": 2,
+                                                  "concurrency": 1, "slow": 8.0})
+    return clock
+
+
+def fail():
+    raise IOError("upstream down")
+
+
+def test_token_bucket(clock):
+    h = throttle.host('test')
+    h.acquire()
+    h.acquire()
+    assert clock.sleeps == []
+    h.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+    clock.now += 10
+    h.acquire()
+    h.acquire()
+    assert len(clock.sleeps) == 1
+
+
+def test_breaker_open_half_open_closed(clock):
+    h = throttle.host('test')
+    for _ in range(throttle.FAILURE_THRESHOLD):
+        with pytest.raises(IOError):
+            throttle.call('test', fail, retries=0)
+    assert h.open_until == pytest.approx(clock.now + throttle.COOLDOWN)
+
+    # Open: rejected without calling upstream
+    calls = []
+    with pytest.raises(throttle.CircuitOpen):
+        throttle.call('test', lambda: calls.append(1))
+    assert calls == [] and h.stats['rejected'] == 1
+
+    # Half-open after the cooldown: a failed trial reopens for twice as long
+    clock.now = h.open_until
+    with pytest.raises(IOError):
+        throttle.call('test', fail)
+    assert h.stats['trips'] == 2 and not h.trial
+    assert h.open_until == pytest.approx(clock.now + 2 * throttle.COOLDOWN)
+
+    # A successful trial closes it and resets the cooldown
+    clock.now = h.open_until
+    assert throttle.call('test', lambda: 'ok') == 'ok'
+    assert h.open_until is None and not h.trial and h.failures == 0
+    assert h.cooldown == throttle.COOLDOWN
+    assert throttle.call('test', lambda: 'again') == 'again'
+
+
+def test_trial_waits_for_token(clock):
+    h = throttle.host('test')
+    h.open_until, h.tokens = clock.now, 0.0
+    assert throttle.call('test', lambda: 'ok') == 'ok'
+    assert clock.sleeps and h.open_until is None and not h.trial
+
+
+def test_interrupted_trial_is_handed_on(clock):
+    h = throttle.host('test')
+    h.open_until, h.tokens = clock.now, 0.0
+
+    def interrupted(seconds):
+        raise KeyboardInterrupt
+
+    clock.sleep = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        h.acquire()
+    assert not h.trial
+    del clock.sleep
+    assert throttle.call('test', lambda: 'ok') == 'ok'
+    assert h.open_until is None